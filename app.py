@@ -1,24 +1,85 @@
-import gradio as gr
-from tabs.settings_tab import create_settings_window
-from tabs.chat_tab import create_chat_window
-from tabs.log_viewer_tab import create_log_viewer_window
+import importlib
+import logging
+import os
+from utils.startup import StartupReport, start_warmup
+
+# Configured before the background warmup below can log its summary
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+# Created first so the report covers the imports below
+startup_report = StartupReport()
+
+with startup_report.phase("imports"):
+    import gradio as gr
+    from tabs.settings_tab import create_settings_window, env_handler
+    from tabs.chat_tab import create_chat_window
+    from tabs.log_viewer_tab import create_log_viewer_window
+    from tabs.resources_tab import create_resources_window
+    from utils.k8s_cache import get_cluster_cache
+    from utils.metrics import CONTENT_TYPE, REGISTRY
+
+# Seconds the warmup waits for the initial cluster LIST
+WARMUP_SYNC_TIMEOUT = env_handler.get_number("WARMUP_SYNC_TIMEOUT", 30.0)
+# Serve Prometheus metrics on /metrics next to the UI
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+def warm_cluster_cache():
+    """Load the kube config and wait for the cluster cache to sync."""
+    if not get_cluster_cache().wait_for_sync(WARMUP_SYNC_TIMEOUT):
+        raise RuntimeError("Timed out waiting for cluster state")
 
 # Create the main application
-demo = gr.Blocks(title="K8s Buddy")
+with startup_report.phase("build UI"):
+    demo = gr.Blocks(title="K8s Buddy")
+
+    with demo:
+        gr.Markdown("# AI Application with Settings")
+        
+        # Create tabs for main window and settings
+        with gr.Tabs():
+            with gr.TabItem("Chat"):
+                chat_window, chat_context = create_chat_window()
+
+            with gr.TabItem("Log Viewer"):
+                # Summarized logs can be sent to the chat's Additional Context
+                log_window = create_log_viewer_window(chat_context)
+
+            with gr.TabItem("Resources"):
+                resources_window = create_resources_window()
+
+            with gr.TabItem("Settings"):
+                settings_window = create_settings_window()
+
+    # Chat handlers are async, so one worker can serve many concurrent LLM calls
+    demo.queue(default_concurrency_limit=env_handler.get_number("GRADIO_CONCURRENCY_LIMIT", 16))
 
-with demo:
-    gr.Markdown("# AI Application with Settings")
-    
-    # Create tabs for main window and settings
-    with gr.Tabs():
-        with gr.TabItem("Chat"):
-            chat_window = create_chat_window()
+# The UI serves right away; cluster state and LLM SDKs load in the background
+startup_report.mark_serving()
+start_warmup(
+    [
+        ("cluster cache", warm_cluster_cache),
+        ("LLM clients", lambda: importlib.import_module("openai")),
+    ],
+    startup_report,
+    on_ready=lambda report: logger.info("%s", report.summary())
+)
 
-        with gr.TabItem("Log Viewer"):
-            log_window = create_log_viewer_window()
+def create_app():
+    """Mount the UI and the /metrics endpoint on one FastAPI app."""
+    from fastapi import FastAPI, Response
 
-        with gr.TabItem("Settings"):
-            settings_window = create_settings_window()
+    app = FastAPI()
+    app.add_api_route("/metrics", lambda: Response(REGISTRY.render(), media_type=CONTENT_TYPE))
+    return gr.mount_gradio_app(app, demo, path="")
 
 if __name__ == "__main__":
-    demo.launch() 
\ No newline at end of file
+    if METRICS_ENABLED:
+        import uvicorn
+        uvicorn.run(
+            create_app(),
+            host=os.getenv("GRADIO_SERVER_NAME", "127.0.0.1"),
+            port=env_handler.get_number("GRADIO_SERVER_PORT", 7860)
+        )
+    else:
+        demo.launch()
@@ -0,0 +1,368 @@
+"""Local stand-ins for the Kubernetes API server and an OpenAI-compatible endpoint."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+PHASES = ["Running"] * 17 + ["Pending", "Failed", "Succeeded"]
+
+
+def synthetic_cluster(namespaces: int = 20, nodes: int = 10, pods: int = 2000) -> Dict[str, List[Dict]]:
+    """Build raw namespace, node and pod objects for a synthetic cluster.
+
+    Args:
+        namespaces (int): Number of namespaces
+        nodes (int): Number of nodes
+        pods (int): Number of pods, spread over the namespaces
+
+    Returns:
+        Dict[str, List[Dict]]: Raw objects by kind (``namespaces``, ``nodes``, ``pods``, ``events``, ``deployments``)
+    """
+    namespace_names = [f"team-{i}" for i in range(namespaces)]
+    cluster = {
+        "namespaces": [
+            {"metadata": {"name": name, "resourceVersion": "1"}, "status": {"phase": "Active"}}
+            for name in namespace_names
+        ],
+        "nodes": [
+            {
+                "metadata": {"name": f"node-{i}", "resourceVersion": "1"},
+                "status": {
+                    "conditions": [{"type": "Ready", "status": "False" if i % 7 == 6 else "True"}],
+                    "allocatable": {"cpu": "8", "memory": "32Gi"},
+                }
+            }
+            for i in range(nodes)
+        ],
+        "pods": [],
+        "events": [],
+        "deployments": [],
+    }
+    deployments = set()
+    now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    for i in range(pods):
+        namespace = namespace_names[i % namespaces]
+        workload = f"app-{i % 50}"
+        phase = PHASES[i % len(PHASES)]
+        if (namespace, workload) not in deployments:
+            deployments.add((namespace, workload))
+            cluster["deployments"].append({
+                "metadata": {"name": workload, "namespace": namespace, "resourceVersion": "1"},
+                "spec": {
+                    "replicas": 3,
+                    "selector": {"matchLabels": {"app": workload}},
+                    "strategy": {"type": "RollingUpdate"},
+                    "template": {"spec": {"containers": [{"name": "app", "image": f"registry.local/{workload}:1.0"}]}},
+                },
+                "status": {
+                    "replicas": 3, "readyReplicas": 2, "updatedReplicas": 3, "availableReplicas": 2,
+                    "unavailableReplicas": 1,
+                    "conditions": [
+                        {"type": "Available", "status": "False", "reason": "MinimumReplicasUnavailable",
+                         "message": "Deployment does not have minimum availability."},
+                        {"type": "Progressing", "status": "True", "reason": "NewReplicaSetAvailable"},
+                    ],
+                },
+            })
+        cluster["pods"].append({
+            "metadata": {
+                "name": f"{workload}-{i:06d}",
+                "namespace": namespace,
+                "resourceVersion": "1",
+                "ownerReferences": [{"kind": "ReplicaSet", "name": f"{workload}-7d9f8"}],
+            },
+            "spec": {
+                "nodeName": f"node-{i % nodes}",
+                "containers": [
+                    {"name": "app", "resources": {"requests": {"cpu": "100m", "memory": "128Mi"},
+                                                  "limits": {"cpu": "500m", "memory": "256Mi"}}},
+                    {"name": "sidecar"},
+                ],
+            },
+            "status": {
+                "phase": phase,
+                "containerStatuses": [
+                    {"name": "app", "restartCount": i % 13, "ready": phase == "Running", "state": {}},
+                    {"name": "sidecar", "restartCount": 0, "ready": True, "state": {}},
+                ],
+            },
+        })
+        if phase in ("Pending", "Failed"):
+            # Warning events like the scheduler and kubelet would report
+            reason = "FailedScheduling" if phase == "Pending" else "BackOff"
+            cluster["events"].append({
+                "metadata": {"name": f"{workload}-{i:06d}.{i:x}", "namespace": namespace,
+                             "uid": f"event-{i}", "resourceVersion": "1"},
+                "involvedObject": {"kind": "Pod", "namespace": namespace, "name": f"{workload}-{i:06d}"},
+                "reason": reason,
+                "message": f"{reason} for pod {workload}-{i:06d}",
+                "type": "Warning",
+                "count": 1 + i % 5,
+                "firstTimestamp": now,
+                "lastTimestamp": now,
+            })
+    return cluster
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _FakeServer:
+    """Runs a request handler on a free local port in a background thread."""
+
+    def __init__(self, handler):
+        self.stopped = threading.Event()
+        self.httpd = _Server(("127.0.0.1", 0), handler)
+        self.httpd.fake = self
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def start(self) -> "_FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _KubernetesHandler(BaseHTTPRequestHandler):
+    # Streams use chunked encoding like the real API server, so clients read lines as they arrive
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _start_stream(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        if parts[-1] == "log":
+            return self._stream_logs(fake, parts[5], query)
+        if parts[:2] == ["apis", "metrics.k8s.io"]:
+            return self._send_json(fake.usage(parts[-1]))
+        kinds = {"namespaces", "nodes", "pods", "events", "deployments"}
+        if len(parts) >= 2 and parts[-2] in kinds:
+            # Read of a single object, e.g. /api/v1/namespaces/<namespace>/pods/<name>
+            namespace = parts[-3] if parts[-4] == "namespaces" else None
+            for obj in fake.cluster.get(parts[-2], []):
+                if obj["metadata"]["name"] == parts[-1] and obj["metadata"].get("namespace") == namespace:
+                    return self._send_json(obj)
+            return self.send_error(404)
+        kind = parts[-1] if parts[-1] in kinds else None
+        if kind is None:
+            return self.send_error(404)
+        if query.get("watch") in ("true", "True", "1"):
+            return self._watch(fake, float(query.get("timeoutSeconds", 300)))
+        self._list(fake.cluster[kind], int(query.get("limit", 0)), int(query.get("continue") or 0))
+
+    def _list(self, items, limit, start):
+        end = start + limit if limit else len(items)
+        metadata = {"resourceVersion": "1"}
+        if end < len(items):
+            metadata["continue"] = str(end)
+        self._send_json({"items": items[start:end], "metadata": metadata})
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _watch(self, fake, timeout):
+        # No changes happen in the synthetic cluster, hold the stream open like an idle watch
+        self._start_stream("application/json")
+        fake.stopped.wait(timeout)
+        try:
+            self._write_chunk(b"")
+        except OSError:
+            pass
+        self.close_connection = True
+
+    def _stream_logs(self, fake, pod, query):
+        self._start_stream("text/plain")
+        interval = 1.0 / fake.log_rate if fake.log_rate else 0.0
+        batch = max(1, int(fake.log_rate * 0.01)) if fake.log_rate else 100
+        sequence = 0
+        next_at = time.perf_counter()
+        # Without follow the API server returns the tail and ends the response
+        limit = fake.log_lines if query.get("follow") in ("true", "True", "1") else int(query.get("tailLines", 10))
+        try:
+            while not fake.stopped.is_set() and (limit is None or sequence < limit):
+                lines = []
+                for _ in range(batch if limit is None else min(batch, limit - sequence)):
+                    # The send time lets clients measure delivery latency
+                    lines.append(
+                        f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime())}.000000Z "
+                        f'{{"level": "{"error" if sequence % 50 == 0 else "info"}", "msg": "request handled", '
+                        f'"pod": "{pod}", "seq": {sequence}, "sent": {time.perf_counter():.6f}}}\n'
+                    )
+                    sequence += 1
+                self._write_chunk("".join(lines).encode())
+                if interval:
+                    next_at += interval * batch
+                    time.sleep(max(0.0, next_at - time.perf_counter()))
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+
+class FakeKubernetesAPI(_FakeServer):
+    """Minimal Kubernetes API serving a synthetic cluster.
+
+    Supports paginated LIST and idle WATCH requests for namespaces, nodes,
+    pods and events, reads of single pods and deployments, node and pod
+    usage of the metrics API that changes on every request, log tails and
+    followed pod logs emitting JSON lines at ``log_rate`` lines per second
+    (0 for as fast as possible).
+    """
+
+    def __init__(self, cluster: Dict[str, List[Dict]], log_rate: float = 1000.0,
+                 log_lines: Optional[int] = None):
+        """Initialize the server.
+
+        Args:
+            cluster (Dict[str, List[Dict]]): Raw objects from ``synthetic_cluster``
+            log_rate (float): Log lines per second per stream, 0 for unthrottled
+            log_lines (Optional[int]): Lines per log stream before it ends, None for endless
+        """
+        super().__init__(_KubernetesHandler)
+        self.cluster = cluster
+        self.log_rate = log_rate
+        self.log_lines = log_lines
+        self._usage_requests = 0
+
+    def usage(self, plural: str) -> Dict:
+        """Build a metrics.k8s.io NodeMetricsList or PodMetricsList, a little different on every call."""
+        self._usage_requests += 1
+        tick = self._usage_requests
+        if plural == "nodes":
+            return {"items": [
+                {"metadata": {"name": node["metadata"]["name"]},
+                 "usage": {"cpu": f"{(i * 700 + tick * 37) % 8000}m", "memory": f"{8 + (i + tick) % 20}Gi"}}
+                for i, node in enumerate(self.cluster["nodes"])
+            ]}
+        return {"items": [
+            {"metadata": {"name": pod["metadata"]["name"], "namespace": pod["metadata"]["namespace"]},
+             "containers": [
+                 {"name": "app", "usage": {"cpu": f"{(i * 13 + tick * 7) % 600}m",
+                                           "memory": f"{(i * 7 + tick) % 260}Mi"}},
+                 {"name": "sidecar", "usage": {"cpu": "1m", "memory": "4Mi"}},
+             ]}
+            for i, pod in enumerate(self.cluster["pods"]) if pod["status"]["phase"] == "Running"
+        ]}
+
+
+class _OpenAIHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        fake = self.server.fake
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        fake.requests.append(request)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        time.sleep(fake.first_token_delay)
+        answered = any(message.get("role") == "tool" for message in request.get("messages", []))
+        if fake.tool_call and request.get("tools") and not answered:
+            return self._stream_tool_call(fake, request)
+        try:
+            for i in range(fake.tokens):
+                chunk = {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": request.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": {"content": f"token{i} "}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(fake.token_interval)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+    def _stream_tool_call(self, fake, request):
+        arguments = json.dumps(fake.tool_call.get("arguments", {}))
+        middle = len(arguments) // 2
+        deltas = [
+            {"tool_calls": [{"index": 0, "id": "call_1", "type": "function",
+                             "function": {"name": fake.tool_call["name"], "arguments": arguments[:middle]}}]},
+            {"tool_calls": [{"index": 0, "function": {"arguments": arguments[middle:]}}]},
+        ]
+        try:
+            for delta in deltas:
+                chunk = {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": request.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class FakeOpenAI(_FakeServer):
+    """OpenAI-compatible endpoint streaming a fixed chat completion.
+
+    With ``tool_call`` set, requests that offer tools and do not yet contain
+    a tool result are answered with that function call instead, streamed in
+    fragments like the real API. Every request body is kept in ``requests``.
+    """
+
+    def __init__(self, first_token_delay: float = 0.05, tokens: int = 50, token_interval: float = 0.001,
+                 tool_call: Optional[Dict] = None):
+        """Initialize the server.
+
+        Args:
+            first_token_delay (float): Seconds before the first token is sent
+            tokens (int): Number of tokens in each response
+            token_interval (float): Seconds between tokens
+            tool_call (Optional[Dict]): ``name`` and ``arguments`` of the function to call first
+        """
+        super().__init__(_OpenAIHandler)
+        self.first_token_delay = first_token_delay
+        self.tokens = tokens
+        self.token_interval = token_interval
+        self.tool_call = tool_call
+        self.requests: List[Dict] = []
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to configure as the provider's ``base_url``."""
+        return f"{self.url}/v1"
@@ -0,0 +1,247 @@
+"""Benchmarks of the chat context, resource usage, log viewer and chat hot paths against local fakes.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--pods 5000] [--baseline benchmarks/results/baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+from kubernetes import client
+
+from benchmarks.fake_servers import FakeKubernetesAPI, FakeOpenAI, synthetic_cluster
+from utils import k8s_cache, k8s_usage
+from utils.k8s_cache import ClusterCache
+from utils.k8s_usage import UsageSampler, fetch_metrics
+from utils.llm_providers import OpenAIProvider, ProviderRouter
+from utils.log_sessions import LogSessionManager
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "latest.json")
+# Metrics where a larger value is better, all others are better when smaller
+HIGHER_IS_BETTER = ("_per_second",)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+def kubernetes_client(api: FakeKubernetesAPI) -> client.CoreV1Api:
+    """Create a CoreV1Api client talking to the fake API server."""
+    configuration = client.Configuration()
+    configuration.host = api.url
+    return client.CoreV1Api(client.ApiClient(configuration))
+
+
+def bench_context(cache: ClusterCache, iterations: int) -> Dict:
+    """Measure ``get_k8s_context`` latency and the memory of the cluster state."""
+    from tabs.chat_tab import get_k8s_context
+
+    message = "Why is app-3 crash looping in team-3?"
+    get_k8s_context(message)
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        get_k8s_context(message)
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    get_k8s_context(message)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        **percentiles(samples),
+        "snapshot_bytes": cache.snapshot().memory_usage(),
+        "peak_alloc_bytes": peak,
+    }
+
+
+def bench_usage(sampler: UsageSampler, samples: int) -> Dict:
+    """Measure sampling the metrics API and computing the usage hotspots."""
+    sample_times, hotspot_times = [], []
+    for index in range(samples):
+        started = time.perf_counter()
+        sampler.sample(now=index * sampler.interval)
+        sample_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        sampler.facts()
+        hotspot_times.append(time.perf_counter() - started)
+    return {
+        "sample_p50_ms": percentiles(sample_times)["p50_ms"],
+        **percentiles(hotspot_times),
+        "ring_buffer_bytes": sampler.pods.cpu.nbytes + sampler.pods.memory.nbytes,
+    }
+
+
+def bench_logs(core_v1: client.CoreV1Api, duration: float) -> Dict:
+    """Measure Log Viewer throughput and the latency from the API server to a UI render."""
+    manager = LogSessionManager(core_v1, None, max_lines=2000)
+    session = manager.start("bench")
+    session.follow_container("team-0", "app-0-000000", "app")
+    version, latencies = -1, []
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        if session.buffer.wait_for_update(version, timeout=1):
+            text, version, _ = session.buffer.snapshot()
+            last = text.rsplit("\n", 1)[-1]
+            if '"sent": ' in last:
+                latencies.append(time.perf_counter() - float(last.rsplit('"sent": ', 1)[1].rstrip("}")))
+            # Same cadence as the UI refresh
+            time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    lines = session.buffer.dropped + len(session.buffer)
+    manager.stop_all()
+    return {
+        "lines_per_second": lines / elapsed,
+        "renders_per_second": len(latencies) / elapsed,
+        **{f"ui_update_{key}": value for key, value in percentiles(latencies or [0.0]).items()},
+    }
+
+
+def bench_chat(openai: FakeOpenAI, requests: int, concurrency: int) -> Dict:
+    """Measure ``chat_response`` time to first token and prompt size through the provider router."""
+    from tabs import chat_tab
+
+    router = ProviderRouter([(OpenAIProvider("Mock", "bench-key", {"base_url": openai.base_url}), "mock-model")])
+    chat_tab.get_provider_router = lambda settings: router
+
+    async def one(index: int):
+        started = time.perf_counter()
+        first = None
+        # Unique questions, so every request misses the response cache
+        async for _ in chat_tab.chat_response(f"bench question {index} {time.time()}", [], ""):
+            if first is None:
+                first = time.perf_counter() - started
+        return first, time.perf_counter() - started
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(index):
+            async with semaphore:
+                return await one(index)
+
+        await one(-1)
+        return await asyncio.gather(*(limited(i) for i in range(requests)))
+
+    openai.requests.clear()
+    started = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    prompts = [len(json.dumps(request["messages"])) for request in openai.requests]
+    return {
+        **{f"ttft_{key}": value for key, value in percentiles([first for first, _ in results]).items()},
+        **{f"total_{key}": value for key, value in percentiles([total for _, total in results]).items()},
+        "requests_per_second": requests / elapsed,
+        "prompt_chars": statistics.fmean(prompts),
+        "mock_first_token_ms": openai.first_token_delay * 1000,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """List the metrics that regressed by more than ``threshold`` against a baseline."""
+    regressions = []
+    for group, metrics in results["results"].items():
+        for name, value in metrics.items():
+            old = baseline.get("results", {}).get(group, {}).get(name)
+            if not old or name.startswith("mock_"):
+                continue
+            change = (value - old) / old
+            if name.endswith(HIGHER_IS_BETTER):
+                change = -change
+            marker = "REGRESSION" if change > threshold else ""
+            print(f"  {group}.{name}: {old:.3f} -> {value:.3f} ({change:+.1%}) {marker}")
+            if marker:
+                regressions.append(f"{group}.{name}")
+    return regressions
+
+
+def git_revision() -> str:
+    """The current git commit, if available."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--namespaces", type=int, default=20)
+    parser.add_argument("--nodes", type=int, default=10)
+    parser.add_argument("--pods", type=int, default=5000)
+    parser.add_argument("--context-iterations", type=int, default=50)
+    parser.add_argument("--usage-samples", type=int, default=20)
+    parser.add_argument("--log-rate", type=float, default=5000, help="log lines per second, 0 for unthrottled")
+    parser.add_argument("--log-duration", type=float, default=5.0)
+    parser.add_argument("--chat-requests", type=int, default=50)
+    parser.add_argument("--chat-concurrency", type=int, default=10)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to store the results")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    cluster = synthetic_cluster(args.namespaces, args.nodes, args.pods)
+    results = {
+        "metadata": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "parameters": vars(args),
+        },
+        "results": {},
+    }
+    with FakeKubernetesAPI(cluster, log_rate=args.log_rate) as api, \
+            FakeOpenAI(first_token_delay=args.first_token_delay) as openai:
+        core_v1 = kubernetes_client(api)
+        cache = ClusterCache(core_v1)
+        started = time.perf_counter()
+        cache.start()
+        cache.wait_for_sync(60)
+        sync_seconds = time.perf_counter() - started
+        # Serve get_k8s_context and chat_response from the fake cluster
+        k8s_cache._cluster_cache = cache
+        sampler = UsageSampler(lambda: fetch_metrics(client.CustomObjectsApi(core_v1.api_client)), cache.snapshot)
+        k8s_usage._usage_sampler = sampler
+        try:
+            results["results"]["context"] = {"initial_sync_ms": sync_seconds * 1000,
+                                             **bench_context(cache, args.context_iterations)}
+            results["results"]["usage"] = bench_usage(sampler, args.usage_samples)
+            results["results"]["logs"] = bench_logs(core_v1, args.log_duration)
+            results["results"]["chat"] = bench_chat(openai, args.chat_requests, args.chat_concurrency)
+        finally:
+            k8s_cache._cluster_cache = None
+            k8s_usage._usage_sampler = None
+            cache.stop()
+
+    print(json.dumps(results["results"], indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Comparison with {args.baseline} (commit {baseline['metadata'].get('git') or '?'}):")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
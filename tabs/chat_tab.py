@@ -1,82 +1,228 @@
 import gradio as gr
+import asyncio
+import logging
 import time
-from openai import OpenAI
-from utils.env_utils import EnvFileHandler
-from tabs.settings_tab import load_settings
-from kubernetes import client, config
-import yaml
+from typing import Dict, List, Optional
+from utils.llm_providers import ProviderRouter, ToolCall, create_provider, parse_targets
+from utils.llm_tools import ToolSet, stream_with_tools
+from tabs.settings_tab import env_handler, load_settings, ai_provider_config
+from tabs.log_viewer_tab import get_log_viewer
+from utils.k8s_cache import get_cluster_cache
+from utils.k8s_clusters import get_cluster_set
+from utils.k8s_tools import KubernetesTools
+from utils.k8s_usage import get_usage_sampler
+from utils.context_builder import build_cluster_context, build_multi_cluster_context, extract_terms
+from utils.response_cache import ResponseCache
+from utils.history_manager import HistoryManager
+from utils.metrics import CHAT_RESPONSE_SECONDS, K8S_CONTEXT_SECONDS, RequestTrace, record_error, timed
 
-# Initialize environment handler
-env_handler = EnvFileHandler()
+logger = logging.getLogger(__name__)
 
-def get_k8s_context():
-    """Get local Kubernetes cluster context."""
-    try:
-        # Load local kubeconfig
-        config.load_kube_config()
-        v1 = client.CoreV1Api()
-        
-        # Get cluster info
-        #k8s_version = v1.__vers
-        cluster_info = v1.list_namespace()
-        nodes = v1.list_node()
-        pods = v1.list_pod_for_all_namespaces(watch=False)
-        services = v1.list_service_for_all_namespaces()
+# Cache of complete answers for repeated questions against an unchanged cluster
+response_cache = ResponseCache(
+    max_entries=env_handler.get_number("RESPONSE_CACHE_SIZE", 256),
+    ttl=env_handler.get_number("RESPONSE_CACHE_TTL", 3600.0),
+    cache_file=env_handler.get_env("RESPONSE_CACHE_FILE") or None
+)
+# Keeps per-turn prompt size constant over long sessions
+history_manager = HistoryManager(max_tokens=env_handler.get_number("HISTORY_TOKEN_BUDGET", 2000))
+# Log a timeline of every chat request (context, cache, first token, stream)
+TRACE_REQUESTS = env_handler.get_env("TRACE_REQUESTS", "false").lower() == "true"
+# Limits of the cluster lookups models with tool calling can make
+TOOL_RESULT_CHARS = env_handler.get_number("TOOL_RESULT_CHARS", 4000)
+TOOL_CACHE_TTL = env_handler.get_number("TOOL_CACHE_TTL", 30.0)
+TOOL_TIMEOUT = env_handler.get_number("TOOL_TIMEOUT", 15.0)
+TOOL_MAX_ROUNDS = env_handler.get_number("TOOL_MAX_ROUNDS", 4)
+
+_tool_set: Optional[ToolSet] = None
+
+def get_tool_set() -> ToolSet:
+    """Get the Kubernetes tools, whose result cache is shared by all chat sessions."""
+    global _tool_set
+    if _tool_set is None:
+        kubernetes_tools = KubernetesTools(
+            get_cluster_set(load_settings()["cluster_timeout"]),
+            get_log_viewer().tail_logs
+        )
+        _tool_set = ToolSet(
+            kubernetes_tools.tools(),
+            max_result_chars=TOOL_RESULT_CHARS,
+            timeout=TOOL_TIMEOUT,
+            cache_ttl=TOOL_CACHE_TTL
+        )
+    return _tool_set
+
+def get_k8s_context(message: str = "", additional_context: str = "", clusters: Optional[List[str]] = None,
+                    token_budget: Optional[int] = None):
+    """Get Kubernetes cluster context.
+    
+    Args:
+        message (str): The user's message, used to pick the most relevant details
+        additional_context (str): User's additional context, used the same way
+        clusters (Optional[List[str]]): Kubeconfig contexts to describe, defaults to the current one
+        token_budget (Optional[int]): Token budget of the cluster state, defaults to the configured one
         
-        context = f"""Local Kubernetes Cluster Information:
-        - Namespaces: {[ns.metadata.name for ns in cluster_info.items]}
-        - Nodes: {[node.metadata.name for node in nodes.items]}
-        - Node Status: {[node.status.conditions[-1].type for node in nodes.items]}
-        """
-        return context
+    Returns:
+        str: Aggregated cluster context that fits the configured token budget
+    """
+    try:
+        with timed(K8S_CONTEXT_SECONDS):
+            settings = load_settings()
+            token_budget = token_budget or settings["context_token_budget"]
+            cluster_set = get_cluster_set(settings["cluster_timeout"])
+            if clusters and clusters != [cluster_set.current_context]:
+                # Collected in parallel; clusters that do not answer in time are listed as unavailable
+                snapshots, errors = cluster_set.snapshots(clusters, settings["cluster_timeout"])
+                return build_multi_cluster_context(
+                    snapshots,
+                    errors,
+                    message=message,
+                    additional_context=additional_context,
+                    token_budget=token_budget
+                )
+            # Served from the shared list+watch cache instead of fresh LIST calls
+            snapshot = get_cluster_cache().snapshot()
+            context = build_cluster_context(
+                snapshot,
+                message=message,
+                additional_context=additional_context,
+                token_budget=token_budget
+            )
+            if settings["usage_token_budget"] > 0:
+                usage = get_usage_sampler(settings["usage_window_samples"], settings["usage_sample_interval"])
+                facts = usage.facts(extract_terms(message, additional_context), settings["usage_token_budget"])
+                if facts:
+                    context = f"{context}\n\n{facts}"
+            return context
     except Exception as e:
         return f"Error connecting to Kubernetes: {str(e)}"
 
-def chat_response(message, history, context):
-    """Handle chat responses using OpenAI.
+def get_provider_router(settings: Dict) -> Optional[ProviderRouter]:
+    """Build the provider router for the selected model and its fallbacks.
     
     Args:
-        message (str): The user's message
-        history (list): List of previous message pairs (user, assistant)
-        context (str): User's Kubernetes context and environment details
+        settings (Dict): The current settings
         
     Returns:
-        str: The assistant's response
+        Optional[ProviderRouter]: The router, or None if no target has an API key
     """
-    settings = load_settings()
-    api_key = env_handler.get_env(f"{settings['provider'].upper()}_API_KEY")
-    
-    if not api_key:
-        return "Error: API key not found. Please set your API key in Settings."
+    targets = []
+    candidates = [(settings['provider'], settings['model']), *parse_targets(settings['fallback_providers'])]
+    for provider, model in candidates:
+        api_key = env_handler.get_env(ai_provider_config.get_api_key_env(provider))
+        if api_key:
+            targets.append((create_provider(provider, api_key, ai_provider_config), model))
+    if not targets:
+        return None
+    return ProviderRouter(targets, hedge_after=settings['hedge_after'] or None)
+
+async def chat_response(message, history, context, clusters=None):
+    """Stream chat responses from the selected AI provider.
     
+    Args:
+        message (str): The user's message
+        history (list): Previous messages in Gradio's messages format
+        context (str): User's additional context and environment details
+        clusters (list): Kubeconfig contexts whose state is sent, defaults to the current one
+        
+    Yields:
+        str: The assistant's response generated so far
+    """
+    stream = None
+    trace = RequestTrace("chat", enabled=TRACE_REQUESTS)
+    started = time.perf_counter()
+    cache_result = "miss"
     try:
-        client = OpenAI(api_key=api_key)
+        settings = load_settings()
+        router = get_provider_router(settings)
+        if router is None:
+            yield "Error: API key not found. Please set your API key in Settings."
+            return
         
-        # Convert history to messages format
-        messages = []
-        for user_msg, assistant_msg in history:
-            messages.append({"role": "user", "content": user_msg})
-            messages.append({"role": "assistant", "content": assistant_msg})
+        # Recent turns verbatim, older ones folded into a summary
+        with trace.span("history"):
+            messages = history_manager.build(history, settings['model'])
         messages.append({"role": "user", "content": message})
         
-        response = client.chat.completions.create(
-            model=settings['model'],
-            messages=[
-                {"role": "system", "content": f"""You are a Kubernetes expert that helps users with their specific K8s issues. 
-                The user's Kubernetes context is:
+        # Models that can call tools get a short summary and look up details on demand
+        use_tools = settings['chat_tools'] and router.supports_tools
+        context_budget = settings['tool_context_token_budget'] if use_tools else None
+        
+        # Cluster state comes from an in-memory cache but may block on first sync
+        loop = asyncio.get_running_loop()
+        with trace.span("k8s context"):
+            cluster_context = await loop.run_in_executor(
+                None, get_k8s_context, message, context, clusters, context_budget
+            )
+        
+        # Answers built from tool lookups depend on live data the key does not cover, so they
+        # are never replayed from the response cache
+        cache_key = None
+        if use_tools:
+            cache_result = "bypass"
+        else:
+            cache_key = ResponseCache.make_key(
+                settings['provider'], settings['model'], messages, f"{cluster_context}\n{context}"
+            )
+            with trace.span("response cache"):
+                cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                cache_result = "hit"
+                yield cached
+                return
+        
+        tool_instructions = f"""
+                This is only a summary. Use the tools to look up pods, workloads, logs and warning events
+                before answering questions about them, and only what the question needs.
+                Selected clusters: {", ".join(clusters or []) or "the current one"}.""" if use_tools else ""
+        system_message = {"role": "system", "content": f"""You are a Kubernetes expert that helps users with their specific K8s issues. 
+                The user's Kubernetes cluster state is:
+                {cluster_context}
+                {tool_instructions}
+                
+                The user's additional context is:
                 {context}
                 
                 Provide detailed explanations with code and YAML examples when relevant. 
-                Focus on solutions specific to the user's environment."""},
-                *messages
-            ]
-        )
-        return response.choices[0].message.content
+                Focus on solutions specific to the user's environment."""}
+        if use_tools:
+            stream = stream_with_tools(router, [system_message, *messages], get_tool_set(), TOOL_MAX_ROUNDS)
+        else:
+            stream = router.stream([system_message, *messages])
+        response = ""
+        async for item in stream:
+            if isinstance(item, ToolCall):
+                # Shown until the answer continues, not part of it
+                trace.mark(f"tool {item.name}")
+                arguments = ", ".join(f"{key}={value}" for key, value in (item.arguments or {}).items())
+                yield f"{response}\n\n" * bool(response) + f"_Looking up {item.name}({arguments})..._"
+                continue
+            if not response:
+                trace.mark("first token")
+            response += item
+            yield response
+        trace.mark("last token")
+        # Only complete answers are cached; errors and cancellations never get here
+        if cache_key is not None:
+            await response_cache.aset(cache_key, response)
     except Exception as e:
-        return f"Error: {str(e)}"
+        record_error("chat", e)
+        yield f"Error: {str(e)}"
+    finally:
+        # Gradio closes the generator when the user stops or leaves, which
+        # lands here and aborts the underlying HTTP request
+        if stream is not None:
+            await stream.aclose()
+        CHAT_RESPONSE_SECONDS.observe(time.perf_counter() - started, cache=cache_result)
+        if trace.enabled:
+            logger.info("%s", trace.render())
 
 def create_chat_window():
-    """Create the chat application window."""
+    """Create the chat application window.
+    
+    Returns:
+        Tuple[gr.Blocks, gr.Textbox]: The chat window and its Additional Context input
+    """
     with gr.Blocks(title="AI Chat") as chat_window:
         gr.Markdown("# AI Chat Interface")
         
@@ -88,10 +234,27 @@ def create_chat_window():
         - Model: {current_settings['model']}
         """)
         
-        # Get and display Kubernetes context
-        k8s_context = get_k8s_context()
+        # Display Kubernetes context, loaded with the page so startup does not wait for the cluster
         gr.Markdown("### Kubernetes Cluster Information")
-        gr.Markdown(k8s_context)
+        clusters = gr.Dropdown(
+            choices=[],
+            multiselect=True,
+            label="Clusters",
+            info="Kubeconfig contexts whose state is sent with each message"
+        )
+        cluster_info = gr.Markdown("Loading cluster information...")
+        
+        def load_clusters():
+            cluster_set = get_cluster_set(load_settings()["cluster_timeout"])
+            current = cluster_set.current_context
+            return gr.Dropdown(choices=cluster_set.contexts(), value=[current] if current else []), get_k8s_context()
+        
+        chat_window.load(fn=load_clusters, inputs=[], outputs=[clusters, cluster_info])
+        clusters.change(
+            fn=lambda selected: get_k8s_context(clusters=selected),
+            inputs=[clusters],
+            outputs=[cluster_info]
+        )
         
         # Add additional context input
         with gr.Row():
@@ -105,8 +268,8 @@ def create_chat_window():
         # Create chat interface
         chatbot = gr.ChatInterface(
             fn=chat_response,
-            additional_inputs=[context],
+            additional_inputs=[context, clusters],
             type="messages"
         )
        
-    return chat_window 
\ No newline at end of file
+    return chat_window, context 
\ No newline at end of file
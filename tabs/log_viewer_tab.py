@@ -1,81 +1,213 @@
 import gradio as gr
-from kubernetes import client, config, watch
+from kubernetes import client
+import re
 import threading
-import queue
 import time
-from typing import Optional, Dict, List
+from datetime import datetime
+from typing import Optional, List
+from tabs.settings_tab import env_handler
+from utils.k8s_cache import get_cluster_cache
+from utils.k8s_clusters import get_cluster_set
+from utils.log_archive import LogArchive
+from utils.log_filter import LOG_LEVELS, LogFilter
+from utils.log_sessions import LogSessionManager, SessionLimitError
+from utils.metrics import K8S_API_SECONDS, timed
+
+# Bounded per-session log history and how often the UI is refreshed
+LOG_BUFFER_LINES = env_handler.get_number("LOG_BUFFER_LINES", 2000)
+LOG_UPDATE_INTERVAL = env_handler.get_number("LOG_UPDATE_INTERVAL_MS", 250) / 1000
+# Maximum number of browser sessions watching logs at the same time
+LOG_MAX_SESSIONS = env_handler.get_number("LOG_MAX_SESSIONS", 20)
+# Directory of the optional on-disk log archive, archiving is disabled if empty
+LOG_ARCHIVE_DIR = env_handler.get_env("LOG_ARCHIVE_DIR", "")
+LOG_ARCHIVE_SEGMENT_MB = env_handler.get_number("LOG_ARCHIVE_SEGMENT_MB", 8)
+LOG_ARCHIVE_SEGMENTS = env_handler.get_number("LOG_ARCHIVE_SEGMENTS", 16)
+# Token budget of the log summary sent to the chat
+LOG_SUMMARY_TOKENS = env_handler.get_number("LOG_SUMMARY_TOKENS", 600)
+# Fields of JSON/logfmt logs whose most common values are shown
+LOG_STATS_FIELDS = [
+    field.strip() for field in env_handler.get_env("LOG_STATS_FIELDS", "status,method,path,error,logger").split(",")
+    if field.strip()
+]
 
 class LogViewer:
     def __init__(self):
-        """Initialize the log viewer with Kubernetes client."""
-        config.load_kube_config()
-        self.core_v1 = client.CoreV1Api()
-        self.apps_v1 = client.AppsV1Api()
-        self.log_queue = queue.Queue()
-        self.stop_event = threading.Event()
-        self.current_watch = None
+        """Initialize the log viewer; Kubernetes clients are created on first use."""
+        self.archive = None
+        if LOG_ARCHIVE_DIR:
+            self.archive = LogArchive(
+                LOG_ARCHIVE_DIR,
+                segment_bytes=LOG_ARCHIVE_SEGMENT_MB * 1024 * 1024,
+                max_segments=LOG_ARCHIVE_SEGMENTS
+            )
+        self._sessions: Optional[LogSessionManager] = None
+        self._sessions_lock = threading.Lock()
+
+    def cluster_cache(self, cluster: Optional[str] = None):
+        """The cluster cache of a kubeconfig context, the current one loads the kube config on first use."""
+        return get_cluster_set().cache(cluster)
+
+    def get_clusters(self) -> List[str]:
+        """Get the kubeconfig contexts, the current one first."""
+        cluster_set = get_cluster_set()
+        current = cluster_set.current_context
+        return sorted(cluster_set.contexts(), key=lambda context: context != current)
+
+    def get_clients(self, cluster: Optional[str] = None):
+        """Get the (CoreV1Api, AppsV1Api) clients of a context, (None, None) for the current one."""
+        cluster_set = get_cluster_set()
+        if not cluster or cluster == cluster_set.current_context:
+            return None, None
+        api_client = cluster_set.api_client(cluster)
+        return client.CoreV1Api(api_client), client.AppsV1Api(api_client)
+
+    def get_sessions(self, create: bool = True) -> Optional[LogSessionManager]:
+        """Get the log watch session manager.
+        
+        Args:
+            create (bool): Create the manager (and the Kubernetes clients) if needed
+            
+        Returns:
+            Optional[LogSessionManager]: The manager, None if not created yet and create is False
+        """
+        with self._sessions_lock:
+            if self._sessions is None and create:
+                # The clients copy the default configuration, so load the kube config first
+                get_cluster_cache()
+                # Every browser session gets its own watch, buffer and stream
+                self._sessions = LogSessionManager(
+                    client.CoreV1Api(),
+                    client.AppsV1Api(),
+                    max_sessions=LOG_MAX_SESSIONS,
+                    max_lines=LOG_BUFFER_LINES,
+                    archive=self.archive,
+                    stats_fields=LOG_STATS_FIELDS
+                )
+                self._sessions.register_metrics()
+            return self._sessions
 
-    def get_namespaces(self) -> List[str]:
+    def get_namespaces(self, cluster: Optional[str] = None) -> List[str]:
         """Get list of available namespaces."""
         try:
-            namespaces = self.core_v1.list_namespace()
-            return [ns.metadata.name for ns in namespaces.items]
+            return self.cluster_cache(cluster).get_namespaces()
         except Exception as e:
             return [f"Error: {str(e)}"]
 
-    def get_pods(self, namespace: str) -> List[str]:
+    def get_pods(self, namespace: str, cluster: Optional[str] = None) -> List[str]:
         """Get list of pods in a namespace."""
         try:
-            pods = self.core_v1.list_namespaced_pod(namespace)
-            return [pod.metadata.name for pod in pods.items]
+            return self.cluster_cache(cluster).get_pods(namespace)
         except Exception as e:
             return [f"Error: {str(e)}"]
 
-    def get_containers(self, namespace: str, pod: str) -> List[str]:
+    def get_containers(self, namespace: str, pod: str, cluster: Optional[str] = None) -> List[str]:
         """Get list of containers in a pod."""
         try:
-            pod_info = self.core_v1.read_namespaced_pod(pod, namespace)
-            return [container.name for container in pod_info.spec.containers]
+            return self.cluster_cache(cluster).get_containers(namespace, pod)
         except Exception as e:
             return [f"Error: {str(e)}"]
 
-    def watch_logs(self, namespace: str, pod: str, container: str) -> None:
-        """Watch logs from a specific pod and container."""
-        try:
-            self.stop_event.clear()
-            self.current_watch = watch.Watch()
+    def tail_logs(self, namespace: str, pod: str, container: str = "", lines: int = 100,
+                  previous: bool = False, cluster: Optional[str] = None) -> str:
+        """Read the last lines of a container's log without following it.
+        
+        Args:
+            namespace (str): The pod namespace
+            pod (str): The pod name
+            container (str): The container, defaults to the pod's first one
+            lines (int): Number of lines from the end of the log
+            previous (bool): Read the log of the previous, e.g. crashed, container instance
+            cluster (Optional[str]): The kubeconfig context, defaults to the current one
             
-            for log in self.current_watch.stream(
-                self.core_v1.read_namespaced_pod_log,
+        Returns:
+            str: The log lines
+        """
+        if not container:
+            container = self.cluster_cache(cluster).get_containers(namespace, pod)[0]
+        core_v1, _ = get_cluster_set().clients(cluster)
+        with timed(K8S_API_SECONDS, operation="read_namespaced_pod_log"):
+            response = core_v1.read_namespaced_pod_log(
                 name=pod,
                 namespace=namespace,
                 container=container,
-                follow=True,
-                tail_lines=100
-            ):
-                if self.stop_event.is_set():
-                    break
-                self.log_queue.put(log)
-        except Exception as e:
-            self.log_queue.put(f"Error watching logs: {str(e)}")
+                tail_lines=lines,
+                previous=previous,
+                _preload_content=False
+            )
+            try:
+                return response.data.decode("utf-8", errors="replace")
+            finally:
+                response.release_conn()
+    
+    def search_archive(self, cluster: str, namespace: str, pod: str, container: str, text: str,
+                       minutes: float) -> str:
+        """Search the log archive.
+        
+        Args:
+            cluster (str): Kubeconfig context whose archived logs are searched
+            namespace (str): Namespace to search
+            pod (str): Pod to search, empty for all pods of the namespace
+            container (str): Container to search, empty for all containers
+            text (str): Substring the lines must contain
+            minutes (float): Only search the last minutes, 0 for all
+            
+        Returns:
+            str: The matching lines, oldest first
+        """
+        if self.archive is None:
+            return "Log archive is disabled, set LOG_ARCHIVE_DIR to enable it"
+        if not namespace:
+            return "Please select a namespace"
+        started = time.perf_counter()
+        results = self.archive.search(
+            cluster or "",
+            namespace,
+            pod or "",
+            container or "",
+            text or "",
+            since=time.time() - minutes * 60 if minutes else None
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        lines = [
+            f"{datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M:%S} [{result_pod}/{result_container}] {line}"
+            for timestamp, result_pod, result_container, line in results
+        ]
+        lines.append(f"-- {len(results)} lines in {elapsed:.0f} ms")
+        return "\n".join(lines)
+
+_log_viewer: Optional[LogViewer] = None
+_log_viewer_lock = threading.Lock()
 
-    def stop_watching(self) -> None:
-        """Stop the current log watch."""
-        self.stop_event.set()
-        if self.current_watch:
-            self.current_watch.stop()
+def get_log_viewer() -> LogViewer:
+    """Get the log viewer shared by the Log Viewer tab and the chat's log tool."""
+    global _log_viewer
+    with _log_viewer_lock:
+        if _log_viewer is None:
+            _log_viewer = LogViewer()
+        return _log_viewer
 
-def create_log_viewer_window():
-    """Create the log viewer window."""
-    log_viewer = LogViewer()
+def create_log_viewer_window(chat_context: Optional[gr.Textbox] = None):
+    """Create the log viewer window.
+    
+    Args:
+        chat_context (Optional[gr.Textbox]): The chat's Additional Context input summarized logs are sent to
+    """
+    log_viewer = get_log_viewer()
     
     with gr.Blocks(title="Kubernetes Log Viewer") as log_window:
         gr.Markdown("# Kubernetes Log Viewer")
         
         with gr.Row():
+            with gr.Column(scale=1):
+                # Filled when the page loads, so startup does not wait for the cluster
+                cluster_dropdown = gr.Dropdown(
+                    choices=[],
+                    label="Cluster",
+                    interactive=True
+                )
             with gr.Column(scale=1):
                 namespace_dropdown = gr.Dropdown(
-                    choices=log_viewer.get_namespaces(),
+                    choices=[],
                     label="Namespace",
                     interactive=True
                 )
@@ -99,6 +231,34 @@ def create_log_viewer_window():
                 stop_button = gr.Button("Stop Watching")
             with gr.Column(scale=1):
                 clear_button = gr.Button("Clear Logs")
+            with gr.Column(scale=1, visible=chat_context is not None):
+                send_button = gr.Button("Send Summarized Logs to Chat")
+        
+        with gr.Row():
+            with gr.Column(scale=2):
+                selector_input = gr.Textbox(
+                    label="Label Selector or Workload",
+                    placeholder="app=web or deployment/web - follows all matching pods in the namespace"
+                )
+            with gr.Column(scale=1):
+                selector_button = gr.Button("Watch All Matching Pods")
+        
+        with gr.Row():
+            with gr.Column(scale=1):
+                include_input = gr.Textbox(
+                    label="Include",
+                    placeholder="Regex lines must match, e.g. timeout|refused"
+                )
+            with gr.Column(scale=1):
+                exclude_input = gr.Textbox(
+                    label="Exclude",
+                    placeholder="Regex of lines to hide, e.g. healthz"
+                )
+            with gr.Column(scale=1):
+                level_input = gr.CheckboxGroup(
+                    choices=LOG_LEVELS,
+                    label="Levels"
+                )
         
         log_output = gr.Textbox(
             label="Logs",
@@ -106,73 +266,222 @@ def create_log_viewer_window():
             interactive=False,
             show_copy_button=True
         )
+        log_status = gr.Markdown("")
+        log_stats = gr.Markdown("")
         
-        def update_pods(namespace):
-            return gr.Dropdown(choices=log_viewer.get_pods(namespace))
+        with gr.Accordion("Log Archive", open=False, visible=log_viewer.archive is not None):
+            with gr.Row():
+                with gr.Column(scale=2):
+                    archive_text = gr.Textbox(
+                        label="Search",
+                        placeholder="Text to find in archived logs of the selected cluster/namespace/pod/container"
+                    )
+                with gr.Column(scale=1):
+                    archive_minutes = gr.Number(label="Last Minutes (0 = all)", value=60, minimum=0)
+                with gr.Column(scale=1):
+                    archive_button = gr.Button("Search Archive")
+            archive_output = gr.Textbox(
+                label="Archived Logs",
+                lines=15,
+                interactive=False
+            )
         
-        def update_containers(namespace, pod):
-            return gr.Dropdown(choices=log_viewer.get_containers(namespace, pod))
+        def update_namespaces(cluster):
+            return gr.Dropdown(choices=log_viewer.get_namespaces(cluster), value=None)
         
-        def start_watching(namespace, pod, container):
-            if not all([namespace, pod, container]):
-                return "Please select namespace, pod, and container"
-            
-            # Start watching in a separate thread
-            watch_thread = threading.Thread(
-                target=log_viewer.watch_logs,
-                args=(namespace, pod, container)
+        def update_pods(cluster, namespace):
+            return gr.Dropdown(choices=log_viewer.get_pods(namespace, cluster))
+        
+        def update_containers(cluster, namespace, pod):
+            return gr.Dropdown(choices=log_viewer.get_containers(namespace, pod, cluster))
+        
+        def start_session(cluster, request):
+            # Watches of other clusters get that context's API clients
+            return log_viewer.get_sessions().start(
+                request.session_hash, *log_viewer.get_clients(cluster), cluster=cluster or ""
             )
-            watch_thread.daemon = True
-            watch_thread.start()
+        
+        def start_watching(cluster, namespace, pod, container, include, exclude, levels, request: gr.Request):
+            if not all([namespace, pod, container]):
+                yield "Please select namespace, pod, and container", "", ""
+                return
             
-            # Start log processing
-            def process_logs():
-                while not log_viewer.stop_event.is_set():
-                    try:
-                        log = log_viewer.log_queue.get(timeout=1)
-                        yield log
-                    except queue.Empty:
-                        continue
+            try:
+                log_filter = LogFilter(include, exclude, levels)
+                session = start_session(cluster, request)
+            except re.error as e:
+                yield f"Invalid filter: {str(e)}", "", ""
+                return
+            except SessionLimitError as e:
+                yield str(e), "", ""
+                return
+            except Exception as e:
+                yield f"Error watching logs: {str(e)}", "", ""
+                return
+            session.follow_container(namespace, pod, container, log_filter)
+            yield from process_logs(session)
+        
+        def start_watching_selector(cluster, namespace, selector, include, exclude, levels, request: gr.Request):
+            if not all([namespace, selector]):
+                yield "Please select a namespace and enter a label selector or workload", "", ""
+                return
             
-            return process_logs()
+            try:
+                log_filter = LogFilter(include, exclude, levels)
+                session = start_session(cluster, request)
+            except re.error as e:
+                yield f"Invalid filter: {str(e)}", "", ""
+                return
+            except SessionLimitError as e:
+                yield str(e), "", ""
+                return
+            except Exception as e:
+                yield f"Error watching logs: {str(e)}", "", ""
+                return
+            session.follow_selector(namespace, selector.strip(), log_filter)
+            yield from process_logs(session)
+        
+        def process_logs(session):
+            # Render the bounded buffer at most once per interval instead of once per line
+            version = -1
+            try:
+                while not session.stop_event.is_set():
+                    if session.buffer.wait_for_update(version, timeout=1):
+                        text, version, dropped = session.buffer.snapshot()
+                        yield text, format_status(session, dropped), format_stats(session.stats.summary())
+                        time.sleep(LOG_UPDATE_INTERVAL)
+                    elif session.finished:
+                        break
+            finally:
+                # Runs on stop, on a new watch and when the browser disconnects
+                log_viewer.get_sessions().stop(session.session_id, session)
+        
+        def format_status(session, dropped):
+            status = f"Showing the last {len(session.buffer)} lines from {session.active_streams} stream(s)"
+            if dropped:
+                status += f" ({dropped} older lines dropped, limit {LOG_BUFFER_LINES})"
+            if session.log_filter.dropped:
+                status += f", {session.log_filter.dropped} lines hidden by filters"
+            return status
+        
+        def format_stats(summary):
+            # Only shown once the stream contains JSON or logfmt lines
+            if not summary["parsed"]:
+                return ""
+            levels = " · ".join(f"{level}: {count}" for level, count in summary["levels"].items() if count)
+            recent = summary["errors_per_second"][-10:]
+            lines = [
+                f"**Structured logs:** {summary['parsed']} parsed, {summary['unparsed']} unstructured"
+                + (f", {summary['dropped']} dropped before parsing" if summary["dropped"] else ""),
+                f"**Levels:** {levels}",
+                f"**Errors/s (last 60s):** {summary['error_rate']:.2f} avg, last 10s {recent}"
+                f" · {summary['lines_per_second']:.1f} lines/s",
+            ]
+            for field, values in summary["top_fields"].items():
+                top = ", ".join(f"`{value}` ({count})" for value, count in values)
+                lines.append(f"**Top {field}:** {top}")
+            return "\n\n".join(lines)
+        
+        def get_session(request):
+            sessions = log_viewer.get_sessions(create=False)
+            return sessions.get(request.session_hash) if sessions else None
         
-        def stop_watching():
-            log_viewer.stop_watching()
-            return ""
+        def stop_watching(request: gr.Request):
+            session = get_session(request)
+            if session is not None:
+                session.stop()
+            return "", "", ""
         
-        def clear_logs():
-            log_viewer.stop_watching()
-            return ""
+        def clear_logs(request: gr.Request):
+            session = get_session(request)
+            if session is not None:
+                session.buffer.clear()
+            return "", "", ""
+        
+        def send_to_chat(current_context, request: gr.Request):
+            session = get_session(request)
+            if session is None or not session.templates.lines:
+                gr.Warning("No logs to summarize, start watching first")
+                return current_context
+            summary = session.templates.summarize(LOG_SUMMARY_TOKENS)
+            gr.Info("Summarized logs added to the chat's Additional Context")
+            return f"{current_context}\n\n{summary}" if current_context else summary
+        
+        def end_session(request: gr.Request):
+            sessions = log_viewer.get_sessions(create=False)
+            if sessions is not None:
+                sessions.close(request.session_hash)
         
         # Set up event handlers
+        if chat_context is not None:
+            send_button.click(
+                fn=send_to_chat,
+                inputs=[chat_context],
+                outputs=[chat_context]
+            )
+        
+        archive_button.click(
+            fn=log_viewer.search_archive,
+            inputs=[cluster_dropdown, namespace_dropdown, pod_dropdown, container_dropdown, archive_text,
+                    archive_minutes],
+            outputs=[archive_output]
+        )
+        
+        cluster_dropdown.change(
+            fn=update_namespaces,
+            inputs=[cluster_dropdown],
+            outputs=[namespace_dropdown]
+        )
+        
         namespace_dropdown.change(
             fn=update_pods,
-            inputs=[namespace_dropdown],
+            inputs=[cluster_dropdown, namespace_dropdown],
             outputs=[pod_dropdown]
         )
         
         pod_dropdown.change(
             fn=update_containers,
-            inputs=[namespace_dropdown, pod_dropdown],
+            inputs=[cluster_dropdown, namespace_dropdown, pod_dropdown],
             outputs=[container_dropdown]
         )
         
         start_button.click(
             fn=start_watching,
-            inputs=[namespace_dropdown, pod_dropdown, container_dropdown],
-            outputs=[log_output]
+            inputs=[cluster_dropdown, namespace_dropdown, pod_dropdown, container_dropdown,
+                    include_input, exclude_input, level_input],
+            outputs=[log_output, log_status, log_stats]
+        )
+        
+        selector_button.click(
+            fn=start_watching_selector,
+            inputs=[cluster_dropdown, namespace_dropdown, selector_input, include_input, exclude_input, level_input],
+            outputs=[log_output, log_status, log_stats]
         )
         
         stop_button.click(
             fn=stop_watching,
             inputs=[],
-            outputs=[log_output]
+            outputs=[log_output, log_status, log_stats]
         )
         
         clear_button.click(
             fn=clear_logs,
             inputs=[],
-            outputs=[log_output]
+            outputs=[log_output, log_status, log_stats]
+        )
+    
+        def load_clusters():
+            clusters = log_viewer.get_clusters()
+            return (
+                gr.Dropdown(choices=clusters, value=clusters[0] if clusters else None),
+                gr.Dropdown(choices=log_viewer.get_namespaces())
+            )
+        
+        log_window.load(
+            fn=load_clusters,
+            inputs=[],
+            outputs=[cluster_dropdown, namespace_dropdown]
         )
+        log_window.unload(end_session)
     
     return log_window 
\ No newline at end of file
@@ -0,0 +1,81 @@
+import gradio as gr
+import math
+from typing import Dict, List, Tuple
+from tabs.settings_tab import load_settings
+from utils.k8s_usage import format_cpu, format_memory, get_usage_sampler
+
+NODE_HEADERS = ["Node", "CPU", "CPU %", "CPU p95 %", "Memory", "Memory %"]
+POD_HEADERS = ["Finding", "Pod", "CPU", "CPU p95", "CPU Limit", "Memory", "Memory Limit"]
+# Pod rankings of the sampler shown in the table, in order
+FINDINGS = [
+    ("near_memory_limit", "Near memory limit"),
+    ("near_cpu_limit", "Near CPU limit"),
+    ("over_cpu_request", "Above CPU request"),
+    ("top_cpu", "Top CPU"),
+    ("top_memory", "Top memory"),
+]
+
+
+def _percent(ratio: float) -> str:
+    """Format a ratio as a percentage, "-" if it is NaN or infinite (no request, limit or samples)."""
+    return f"{ratio:.0%}" if math.isfinite(ratio) else "-"
+
+
+def hotspot_rows(stats: Dict) -> Tuple[List[List[str]], List[List[str]]]:
+    """Turn the sampler's hotspots into table rows.
+
+    Args:
+        stats (Dict): Result of ``UsageSampler.hotspots``
+
+    Returns:
+        Tuple[List[List[str]], List[List[str]]]: Node rows and pod rows
+    """
+    nodes = [
+        [node["node"], format_cpu(node["cpu"]), _percent(node["cpu_ratio"]), _percent(node["cpu_p95_ratio"]),
+         format_memory(node["memory"]), _percent(node["memory_ratio"])]
+        for node in stats.get("nodes", [])
+    ]
+    pods = [
+        [label, pod["pod"], format_cpu(pod["cpu"]), format_cpu(pod["cpu_p95"]),
+         format_cpu(pod["cpu_limit"]) if pod["cpu_limit"] else "-", format_memory(pod["memory"]),
+         format_memory(pod["memory_limit"]) if pod["memory_limit"] else "-"]
+        for key, label in FINDINGS
+        for pod in stats.get(key, [])
+    ]
+    return nodes, pods
+
+
+def create_resources_window():
+    """Create the resource usage window."""
+    with gr.Blocks(title="Resource Usage") as resources_window:
+        gr.Markdown("# Resource Usage")
+
+        with gr.Row():
+            with gr.Column(scale=3):
+                usage_status = gr.Markdown("")
+            with gr.Column(scale=1):
+                refresh_button = gr.Button("Refresh")
+
+        node_table = gr.Dataframe(headers=NODE_HEADERS, label="Nodes", interactive=False)
+        pod_table = gr.Dataframe(headers=POD_HEADERS, label="Pod Hotspots", interactive=False)
+
+        def refresh():
+            settings = load_settings()
+            try:
+                sampler = get_usage_sampler(settings["usage_window_samples"], settings["usage_sample_interval"])
+            except Exception as e:
+                return f"Error connecting to Kubernetes: {str(e)}", [], []
+            stats = sampler.hotspots()
+            if not stats:
+                status = sampler.last_error or "Waiting for the first usage sample..."
+                return status, [], []
+            status = f"Last {stats['window_seconds'] / 60:.0f} minutes, {stats['samples']} samples"
+            if sampler.last_error:
+                status += f" - {sampler.last_error}"
+            return (status, *hotspot_rows(stats))
+
+        # Starts the sampler when the page loads, not at import time
+        resources_window.load(refresh, outputs=[usage_status, node_table, pod_table])
+        refresh_button.click(refresh, outputs=[usage_status, node_table, pod_table])
+
+    return resources_window
@@ -5,12 +5,9 @@ from utils.json_utils import AIProviderConfig
 
 # Initialize environment handler
 env_handler = EnvFileHandler()
-# Initialize AI provider config
+# Initialize AI provider config, shared with the chat and reloaded when the file changes
 ai_provider_config = AIProviderConfig()
 
-# Define available AI providers and their models
-AI_PROVIDERS = ai_provider_config.get_providers()
-
 def show_popup(message: str):
     gr.Info(message)
     
@@ -20,28 +17,39 @@ def load_settings() -> Dict:
         "provider": env_handler.get_env("AI_PROVIDER", "OpenAI"),
         "model": env_handler.get_env("AI_MODEL", "gpt-3.5-turbo"),
         "api_key": env_handler.get_env("API_KEY", ""),
+        "context_token_budget": env_handler.get_number("CONTEXT_TOKEN_BUDGET", 800),
+        "cluster_timeout": env_handler.get_number("CLUSTER_TIMEOUT", 10.0),
+        "fallback_providers": env_handler.get_env("AI_FALLBACK_PROVIDERS", ""),
+        "hedge_after": env_handler.get_number("AI_HEDGE_AFTER", 0.0),
+        "chat_tools": env_handler.get_env("CHAT_TOOLS", "true").lower() == "true",
+        "tool_context_token_budget": env_handler.get_number("TOOL_CONTEXT_TOKEN_BUDGET", 200),
+        "usage_token_budget": env_handler.get_number("USAGE_TOKEN_BUDGET", 200),
+        "usage_sample_interval": env_handler.get_number("USAGE_SAMPLE_INTERVAL", 15.0),
+        "usage_window_samples": env_handler.get_number("USAGE_WINDOW_SAMPLES", 60),
     }
     return settings
 
 def save_settings(provider: str, model: str, api_key: str) -> str:
     """Save settings to environment variables."""
-    env_handler.set_env("AI_PROVIDER", provider)
-    env_handler.set_env("AI_MODEL", model)
-    env_handler.set_env(f"{provider.upper()}_API_KEY", api_key)
+    env_handler.update_env({
+        "AI_PROVIDER": provider,
+        "AI_MODEL": model,
+        ai_provider_config.get_api_key_env(provider): api_key
+    })
     return "Settings saved successfully!"
 
 def save_api_key(provider: str, api_key: str) -> str:
     """Save API key for the selected provider."""
-    env_handler.set_env(f"{provider.upper()}_API_KEY", api_key)
+    env_handler.set_env(ai_provider_config.get_api_key_env(provider), api_key)
     return "API key saved successfully!"
 
 def update_api_key(provider: str) -> str:
     """Update API key based on selected provider."""
-    return env_handler.get_env(f"{provider.upper()}_API_KEY", "")
+    return env_handler.get_env(ai_provider_config.get_api_key_env(provider), "")
 
 def set_api_key(provider: str, api_key: str) -> str:
     """Set API key based on selected provider."""
-    saved = env_handler.set_env(f"{provider.upper()}_API_KEY", api_key)
+    saved = env_handler.set_env(ai_provider_config.get_api_key_env(provider), api_key)
     if saved:
         show_popup(f"{provider} API Key saved successfully!")
     else:
@@ -49,10 +57,25 @@ def set_api_key(provider: str, api_key: str) -> str:
 
 def save_selected_model(provider: str, model: str) -> str:
     """Save selected provider and model."""
-    env_handler.set_env("AI_PROVIDER", provider)
-    env_handler.set_env("AI_MODEL", model)
+    env_handler.update_env({"AI_PROVIDER": provider, "AI_MODEL": model})
     show_popup(f"Selected {provider} model {model} saved successfully!")
 
+def update_models(provider: str, current_model: str):
+    """Update the model choices for the selected provider."""
+    models = ai_provider_config.get_provider_models(provider)
+    return gr.Dropdown(choices=models, value=current_model if current_model in models else (models[0] if models else None))
+
+def refresh_providers(api_provider: str, selected_provider: str, selected_model: str):
+    """Refresh provider and model choices from the (possibly edited) configuration."""
+    if ai_provider_config.last_error:
+        gr.Warning(ai_provider_config.last_error)
+    providers = list(ai_provider_config.get_providers().keys())
+    return (
+        gr.Dropdown(choices=providers, value=api_provider),
+        gr.Dropdown(choices=providers, value=selected_provider),
+        update_models(selected_provider, selected_model)
+    )
+
 def create_settings_window():
     """Create the settings window with provider, model, and API key inputs."""
     settings = load_settings()
@@ -65,13 +88,13 @@ def create_settings_window():
             with gr.Column(scale=1):
                 with gr.Row():
                     provider_api_dropdown = gr.Dropdown(
-                        choices=list(AI_PROVIDERS.keys()),
+                        choices=list(ai_provider_config.get_providers().keys()),
                         value=settings["provider"],
                         label="AI Provider"
                     )
                     
                     api_key_input = gr.Textbox(
-                        value=env_handler.get_env(f"{settings['provider'].upper()}_API_KEY", ""),
+                        value=update_api_key(settings["provider"]),
                         label="API Key",
                         type="password"
                     )
@@ -100,13 +123,13 @@ def create_settings_window():
             with gr.Column(scale=1):
                 with gr.Row():
                     selected_provider_dropdown = gr.Dropdown(
-                        choices=list(AI_PROVIDERS.keys()),
+                        choices=list(ai_provider_config.get_providers().keys()),
                         value=settings["provider"],
                         label="Selected AI Provider"
                     )
                     
                     selected_model_dropdown = gr.Dropdown(
-                        choices=AI_PROVIDERS[settings["provider"]],
+                        choices=ai_provider_config.get_provider_models(settings["provider"]),
                         value=settings["model"],
                         label="Selected AI Model"
                     )
@@ -115,10 +138,7 @@ def create_settings_window():
                     
                 # Update model choices when provider changes
                 selected_provider_dropdown.change(
-                    fn=lambda provider: gr.Dropdown(choices=AI_PROVIDERS[provider], 
-                                                    value=settings["model"] 
-                                                    if settings["model"] in AI_PROVIDERS[provider] 
-                                                    else AI_PROVIDERS[provider][0]),
+                    fn=lambda provider: update_models(provider, settings["model"]),
                     inputs=[selected_provider_dropdown],
                     outputs=[selected_model_dropdown]
                 )
@@ -131,5 +151,12 @@ def create_settings_window():
                 )
             with gr.Column(scale=2):
                 pass
+        
+        # Pick up edits to ai_providers.json whenever the page is opened
+        settings_window.load(
+            fn=refresh_providers,
+            inputs=[provider_api_dropdown, selected_provider_dropdown, selected_model_dropdown],
+            outputs=[provider_api_dropdown, selected_provider_dropdown, selected_model_dropdown]
+        )
     
     return settings_window 
\ No newline at end of file
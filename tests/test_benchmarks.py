@@ -0,0 +1,40 @@
+import time
+from benchmarks.fake_servers import FakeKubernetesAPI, synthetic_cluster
+from benchmarks.run_benchmarks import compare, kubernetes_client
+from utils.k8s_cache import ClusterCache
+from utils.log_sessions import LogSessionManager
+
+def test_cache_syncs_from_fake_api():
+    """Test that the cluster cache lists the synthetic cluster page by page."""
+    with FakeKubernetesAPI(synthetic_cluster(namespaces=3, nodes=2, pods=1200)) as api:
+        cache = ClusterCache(kubernetes_client(api))
+        cache.start()
+        try:
+            assert cache.wait_for_sync(10)
+            snapshot = cache.snapshot()
+            assert len(snapshot.pods) == 1200
+            assert len(snapshot.nodes) == 2
+        finally:
+            cache.stop()
+
+def test_followed_logs_stream_from_fake_api():
+    """Test that followed logs arrive while the stream is still open."""
+    with FakeKubernetesAPI(synthetic_cluster(namespaces=1, nodes=1, pods=1), log_rate=1000) as api:
+        manager = LogSessionManager(kubernetes_client(api), None)
+        session = manager.start("bench")
+        session.follow_container("team-0", "app-0-000000", "app")
+        deadline = time.time() + 5
+        while len(session.buffer) < 50 and time.time() < deadline:
+            time.sleep(0.05)
+        assert session.running
+        manager.stop_all()
+        assert len(session.buffer) >= 50
+        assert '"msg": "request handled"' in session.buffer.snapshot()[0]
+
+def test_compare_flags_regressions():
+    """Test that latencies regress upwards and throughputs downwards."""
+    baseline = {"results": {"logs": {"p50_ms": 10.0, "lines_per_second": 1000.0, "mock_first_token_ms": 50.0}}}
+    results = {"results": {"logs": {"p50_ms": 11.0, "lines_per_second": 700.0, "mock_first_token_ms": 100.0}}}
+    assert compare(results, baseline, 0.2) == ["logs.lines_per_second"]
+    results["results"]["logs"]["p50_ms"] = 13.0
+    assert compare(results, baseline, 0.2) == ["logs.p50_ms", "logs.lines_per_second"]
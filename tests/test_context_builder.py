@@ -0,0 +1,80 @@
+import pytest
+from utils.context_builder import build_cluster_context, build_multi_cluster_context, estimate_tokens, extract_terms
+from utils.k8s_events import EventGroup
+from utils.k8s_snapshot import ClusterSnapshot, NamespaceRecord, NodeRecord, PodRecord
+
+@pytest.fixture
+def snapshot():
+    """Create a cluster snapshot with a few problems."""
+    pods = [
+        PodRecord(f"web-{i}", "shop", node="node-1", phase="Running", owner="web", containers=["app"])
+        for i in range(50)
+    ]
+    pods.append(PodRecord("api-1", "shop", node="node-1", phase="Running", reason="CrashLoopBackOff",
+                          owner="api", restarts=12))
+    pods.append(PodRecord("worker-1", "jobs", phase="Pending", owner="worker"))
+    namespaces = [NamespaceRecord(name) for name in ("shop", "jobs", "kube-system")]
+    nodes = [NodeRecord("node-1", True), NodeRecord("node-2", False)]
+    return ClusterSnapshot(namespaces, nodes, pods)
+
+def test_estimate_tokens():
+    """Test the token estimate."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+def test_extract_terms():
+    """Test extracting identifier-like terms."""
+    assert extract_terms("Why is web-7d4b9c CrashLooping?", "ns: Shop") >= {"web-7d4b9c", "shop", "ns"}
+
+def test_summary_and_problems(snapshot):
+    """Test that the context aggregates state instead of listing everything."""
+    context = build_cluster_context(snapshot)
+    assert "3 namespaces, 2 nodes (1 NotReady), 52 pods (Pending 1, Running 51)" in context
+    assert "- node-2" in context
+    assert "shop/api-1 (CrashLoopBackOff, 12 restarts, node node-1)" in context
+    assert "jobs/worker-1 (Pending" in context
+    assert "shop/api: 12 restarts across 1 pods" in context
+    # Healthy pods are only counted
+    assert "web-3" not in context
+
+def test_mentioned_pods(snapshot):
+    """Test that healthy pods named in the message are included."""
+    context = build_cluster_context(snapshot, message="What is web-3 doing?")
+    assert "Mentioned pods:\n- shop/web-3 (Running" in context
+
+def test_token_budget(snapshot):
+    """Test that the context fits the budget and prefers relevant items."""
+    context = build_cluster_context(snapshot, additional_context="the worker in jobs", token_budget=60)
+    assert estimate_tokens(context) <= 60
+    assert "jobs/worker-1" in context
+    assert "more items omitted" in context
+
+def test_multi_cluster_context(snapshot):
+    """Test that every cluster gets its section and unavailable clusters are listed."""
+    empty = ClusterSnapshot([NamespaceRecord("default")], [NodeRecord("node-a", True)], [])
+    context = build_multi_cluster_context(
+        {"prod": snapshot, "dev": empty},
+        {"edge": "no response within 10s"},
+        message="Is anything broken in prod?",
+        token_budget=400
+    )
+    assert context.startswith("Unavailable clusters: edge (no response within 10s)")
+    assert context.index("=== Cluster prod ===") < context.index("=== Cluster dev ===")
+    assert "2 nodes (1 NotReady)" in context
+    assert "1 nodes (0 NotReady)" in context
+    assert estimate_tokens(context) <= 400
+
+def test_recent_warnings(snapshot):
+    """Test that warnings about mentioned workloads come first, with count and age."""
+    now = 1714557600.0
+    snapshot.events = [
+        EventGroup("jobs", "Pod", "worker-1", "FailedScheduling", message="0/2 nodes are available",
+                   count=4, first_seen=now - 600, last_seen=now - 30),
+        EventGroup("shop", "Pod", "api-1", "BackOff", message="Back-off restarting failed container",
+                   count=12, first_seen=now - 3600, last_seen=now - 300),
+    ]
+    context = build_cluster_context(snapshot, message="Why is api restarting?", now=now, token_budget=120)
+    assert "2 recent warning events" in context
+    assert "Recent warnings:\n- shop/Pod/api-1: BackOff x12, last 5m ago: Back-off restarting failed container" \
+        in context
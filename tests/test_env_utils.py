@@ -1,5 +1,10 @@
+import importlib
 import os
+import threading
 import pytest
+import tabs.chat_tab
+import tabs.log_viewer_tab
+from utils import env_utils
 from utils.env_utils import EnvFileHandler
 
 @pytest.fixture
@@ -60,4 +65,82 @@ def test_update_existing_variable(env_handler):
     
     # Update the value
     env_handler.set_env("UPDATE_KEY", "updated")
-    assert env_handler.get_env("UPDATE_KEY") == "updated" 
\ No newline at end of file
+    assert env_handler.get_env("UPDATE_KEY") == "updated"
+
+def test_update_env_batches_one_write(env_handler, monkeypatch):
+    """Test that several keys are committed with a single file replace."""
+    replaces = []
+    original = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: replaces.append(dst) or original(src, dst))
+    assert env_handler.update_env({"AI_PROVIDER": "OpenAI", "AI_MODEL": "gpt-4", "OPENAI_API_KEY": "sk-1"})
+    assert len(replaces) == 1
+    assert env_handler.get_file_values() == {"AI_PROVIDER": "OpenAI", "AI_MODEL": "gpt-4", "OPENAI_API_KEY": "sk-1"}
+    assert env_handler.get_env("AI_MODEL") == "gpt-4"
+
+def test_own_writes_are_not_read_back(env_handler, monkeypatch):
+    """Test that the file is not re-read after the handler's own write."""
+    env_handler.set_env("KEY1", "value1")
+    reads = []
+    original = env_utils.dotenv_values
+    monkeypatch.setattr(env_utils, "dotenv_values", lambda **kwargs: reads.append(1) or original(**kwargs))
+    assert env_handler.update_env({"KEY2": "value2", "KEY1": None})
+    assert env_handler.get_file_values() == {"KEY2": "value2"}
+    assert reads == []
+
+def test_preserves_comments_and_quotes(env_handler):
+    """Test that unrelated lines are kept and special characters round-trip."""
+    with open(env_handler.env_file, 'a') as f:
+        f.write("# provider keys\nexport OTHER=keep")
+    assert env_handler.update_env({"QUOTED": "it's a \\ test", "OTHER": None})
+    with open(env_handler.env_file) as f:
+        content = f.read()
+    assert "# K8sBuddy Environment Variables" in content
+    assert "# provider keys" in content
+    assert "OTHER" not in content
+    assert env_handler.get_file_values()["QUOTED"] == "it's a \\ test"
+
+def test_picks_up_external_edits(env_handler):
+    """Test that changes made by another writer are not overwritten."""
+    env_handler.set_env("KEY1", "value1")
+    with open(env_handler.env_file, 'a') as f:
+        f.write("EXTERNAL='yes'\n")
+    os.utime(env_handler.env_file, ns=(0, 10**18))
+    env_handler.set_env("KEY2", "value2")
+    assert env_handler.get_file_values() == {"KEY1": "value1", "EXTERNAL": "yes", "KEY2": "value2"}
+
+def test_concurrent_updates(env_handler):
+    """Test that concurrent saves do not lose keys."""
+    threads = [threading.Thread(target=env_handler.set_env, args=(f"KEY{i}", str(i))) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert env_handler.get_file_values() == {f"KEY{i}": str(i) for i in range(20)}
+
+def test_get_number_falls_back_on_invalid_values(env_handler, monkeypatch):
+    """Test that malformed numbers fall back to the default instead of raising."""
+    monkeypatch.setenv("NUMBER_OK", " 42 ")
+    monkeypatch.setenv("NUMBER_BAD", "ten")
+    monkeypatch.setenv("NUMBER_FLOAT", "2.5")
+    assert env_handler.get_number("NUMBER_OK", 10) == 42
+    assert env_handler.get_number("NUMBER_BAD", 10) == 10
+    assert env_handler.get_number("NUMBER_FLOAT", 1.0) == 2.5
+    assert env_handler.get_number("NUMBER_FLOAT", 1) == 1
+    assert env_handler.get_number("NUMBER_MISSING", 0.5) == 0.5
+
+def test_tab_modules_import_with_malformed_numbers(monkeypatch):
+    """Test that malformed numeric settings fall back to their defaults when the tabs are imported."""
+    for key in ("RESPONSE_CACHE_SIZE", "RESPONSE_CACHE_TTL", "HISTORY_TOKEN_BUDGET", "TOOL_RESULT_CHARS",
+                "TOOL_TIMEOUT", "LOG_BUFFER_LINES", "LOG_UPDATE_INTERVAL_MS", "LOG_ARCHIVE_SEGMENTS"):
+        monkeypatch.setenv(key, "not-a-number")
+    try:
+        log_viewer_tab = importlib.reload(tabs.log_viewer_tab)
+        chat_tab = importlib.reload(tabs.chat_tab)
+        assert log_viewer_tab.LOG_BUFFER_LINES == 2000
+        assert log_viewer_tab.LOG_UPDATE_INTERVAL == 0.25
+        assert chat_tab.response_cache.max_entries == 256
+        assert chat_tab.TOOL_TIMEOUT == 15.0
+    finally:
+        monkeypatch.undo()
+        importlib.reload(tabs.log_viewer_tab)
+        importlib.reload(tabs.chat_tab)
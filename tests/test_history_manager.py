@@ -0,0 +1,58 @@
+import pytest
+from utils.history_manager import HistoryManager, count_tokens, extractive_summary, normalize_history
+
+def make_history(turns, size=100):
+    """Create a messages-format history of user/assistant turns."""
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question {i} " + "x" * size})
+        history.append({"role": "assistant", "content": f"answer {i} " + "y" * size})
+    return history
+
+def test_normalize_history():
+    """Test that both Gradio history formats are accepted."""
+    messages = [{"role": "user", "content": "hi", "metadata": None}, {"role": "assistant", "content": "hello"}]
+    assert normalize_history(messages) == [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    assert normalize_history([["hi", "hello"], ["bye", None]]) == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "user", "content": "bye"}
+    ]
+
+def test_count_tokens_fallback():
+    """Test the character estimate for models without a tokenizer."""
+    assert count_tokens("abcdefgh", "claude-2.1") == 2
+
+def test_short_history_unchanged():
+    """Test that a history within budget is passed through."""
+    manager = HistoryManager(max_tokens=1000)
+    history = make_history(2)
+    assert manager.build(history) == normalize_history(history)
+
+def test_long_history_is_bounded():
+    """Test that prompt size stays roughly constant as the session grows."""
+    manager = HistoryManager(max_tokens=300, summary_tokens=100)
+    sizes = []
+    for turns in (10, 50, 200):
+        messages = manager.build(make_history(turns), "claude-2.1")
+        sizes.append(sum(count_tokens(m["content"]) for m in messages))
+        assert messages[0]["role"] == "system"
+        assert messages[1]["role"] == "user"
+        assert messages[-1]["content"].startswith(f"answer {turns - 1}")
+    assert max(sizes) <= 300 + 20
+
+def test_rolling_summary_reused():
+    """Test that each turn only folds messages that newly left the window."""
+    folded = []
+
+    def summarizer(previous, messages, max_tokens):
+        folded.append(len(messages))
+        return extractive_summary(previous, messages, max_tokens)
+
+    manager = HistoryManager(max_tokens=300, summary_tokens=100, summarizer=summarizer)
+    history = make_history(10)
+    manager.build(history)
+    manager.build(history)
+    manager.build(history + make_history(1))
+    assert len(folded) == 2
+    assert folded[1] == 2
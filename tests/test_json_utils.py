@@ -1,7 +1,7 @@
 import os
 import json
 import pytest
-from utils.json_utils import AIProviderConfig
+from utils.json_utils import AIProviderConfig, ProviderConfigError, validate_providers
 
 @pytest.fixture
 def config_handler(tmp_path):
@@ -89,4 +89,69 @@ def test_persistence(config_handler):
     new_handler = AIProviderConfig(config_handler.config_file)
     
     # Verify the provider exists in the new instance
-    assert "TestProvider" in new_handler.get_providers() 
\ No newline at end of file
+    assert "TestProvider" in new_handler.get_providers()
+
+def test_get_provider_legacy_format(tmp_path):
+    """Test that list-of-models entries are read like dict entries."""
+    config_file = tmp_path / "ai_providers.json"
+    config_file.write_text(json.dumps({"Google": ["gemini-pro"]}))
+    handler = AIProviderConfig(config_file)
+    
+    assert handler.get_provider("Google") == {
+        "models": ["gemini-pro"],
+        "api_key_env": "GOOGLE_API_KEY",
+        "client": "google"
+    }
+    assert handler.get_provider_models("Google") == ["gemini-pro"]
+    assert handler.get_api_key_env("Google") == "GOOGLE_API_KEY"
+    assert handler.get_provider("NonExistent") == {}
+
+def test_lookups_use_cache(config_handler, monkeypatch):
+    """Test that lookups do not re-read an unchanged file."""
+    config_handler.reload_interval = 0
+    loads = []
+    original = json.load
+    monkeypatch.setattr(json, "load", lambda f: loads.append(1) or original(f))
+    for _ in range(10):
+        config_handler.get_provider_models("OpenAI")
+        config_handler.get_api_key_env("OpenAI")
+    assert loads == []
+
+def test_reload_on_change(tmp_path):
+    """Test that edits to the file are picked up without a new instance."""
+    config_file = tmp_path / "ai_providers.json"
+    config_file.write_text(json.dumps({"OpenAI": ["gpt-4"]}))
+    handler = AIProviderConfig(str(config_file), reload_interval=0)
+    assert handler.get_provider_models("OpenAI") == ["gpt-4"]
+    config_file.write_text(json.dumps({"OpenAI": {"models": ["gpt-4o", "gpt-4"]}}))
+    os.utime(config_file, ns=(0, 10**18))
+    assert handler.get_provider_models("OpenAI") == ["gpt-4o", "gpt-4"]
+
+def test_invalid_edit_keeps_last_valid_config(tmp_path):
+    """Test that an invalid edit is reported and the previous configuration is kept."""
+    config_file = tmp_path / "ai_providers.json"
+    config_file.write_text(json.dumps({"OpenAI": ["gpt-4"]}))
+    handler = AIProviderConfig(str(config_file), reload_interval=0)
+    config_file.write_text(json.dumps({"OpenAI": {"models": []}}))
+    os.utime(config_file, ns=(0, 10**18))
+    assert handler.get_provider_models("OpenAI") == ["gpt-4"]
+    assert "models" in handler.last_error
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"OpenAI": "gpt-4"},
+    {"OpenAI": {"models": [""]}},
+    {"OpenAI": {"models": ["gpt-4"], "api_key_env": "NOT VALID"}},
+    {"OpenAI": {"models": ["gpt-4"], "max_tokens": -1}},
+])
+def test_validate_providers_rejects_invalid(data):
+    """Test schema validation of provider entries."""
+    with pytest.raises(ProviderConfigError):
+        validate_providers(data)
+
+def test_atomic_write_leaves_no_temp_files(config_handler, tmp_path):
+    """Test that writes replace the file without leaving temporary files behind."""
+    config_handler.add_provider("TestProvider", ["model1"], "TEST_API_KEY")
+    assert sorted(os.listdir(tmp_path)) == ["ai_providers.json"]
+    assert not config_handler.add_provider("Broken", [], "TEST_API_KEY")
+    assert "Broken" not in config_handler.get_providers()
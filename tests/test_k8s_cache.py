@@ -0,0 +1,161 @@
+import json
+import pytest
+from kubernetes.client.rest import ApiException
+from utils.k8s_cache import Informer, ClusterCache, iter_list
+from utils.k8s_snapshot import PodRecord
+
+class FakeResponse:
+    """Minimal stand-in for a urllib3 response returned with _preload_content=False."""
+
+    def __init__(self, body):
+        self.data = json.dumps(body).encode()
+
+    def release_conn(self):
+        pass
+
+def make_pod(name, namespace="default", containers=("app",)):
+    """Create a raw pod object."""
+    return {
+        "metadata": {"name": name, "namespace": namespace},
+        "spec": {"containers": [{"name": c} for c in containers], "nodeName": "node-1"},
+        "status": {"phase": "Running", "containerStatuses": [{"restartCount": 2}]}
+    }
+
+def make_list_func(items, resource_version="1"):
+    """Create a fake paginated list function over raw objects."""
+    calls = []
+
+    def list_func(limit=None, _continue=None, _preload_content=True, **kwargs):
+        calls.append(_continue)
+        start = int(_continue or 0)
+        end = start + (limit or len(items))
+        metadata = {"resourceVersion": resource_version}
+        if end < len(items):
+            metadata["continue"] = str(end)
+        return FakeResponse({"items": items[start:end], "metadata": metadata})
+
+    list_func.calls = calls
+    return list_func
+
+@pytest.fixture
+def pod_informer():
+    """Create a pod informer backed by a fake list function."""
+    pods = [make_pod("web-1"), make_pod("web-2"), make_pod("db-1", "data")]
+    informer = Informer(
+        make_list_func(pods, "42"),
+        transform=PodRecord.from_raw,
+        index_func=lambda pod: pod.namespace,
+        page_size=2
+    )
+    informer._relist()
+    return informer
+
+def test_iter_list_pages():
+    """Test that listing follows continue tokens page by page."""
+    list_func = make_list_func([make_pod(f"pod-{i}") for i in range(5)])
+    names = [obj["metadata"]["name"] for obj in iter_list(list_func, limit=2)]
+    assert names == [f"pod-{i}" for i in range(5)]
+    assert list_func.calls == [None, "2", "4"]
+
+def test_relist_populates_store(pod_informer):
+    """Test that the initial LIST fills the store and records the resourceVersion."""
+    assert pod_informer.wait_for_sync(0)
+    assert pod_informer.resource_version == "42"
+    assert len(pod_informer.list()) == 3
+    assert pod_informer.get("data/db-1").name == "db-1"
+
+def test_index_lookup(pod_informer):
+    """Test looking up objects by index value."""
+    names = sorted(pod.name for pod in pod_informer.by_index("default"))
+    assert names == ["web-1", "web-2"]
+    assert pod_informer.by_index("missing") == []
+
+def test_apply_events(pod_informer):
+    """Test that watch events update the store and the index."""
+    pod_informer._apply_event("ADDED", make_pod("web-3"))
+    assert pod_informer.get("default/web-3") is not None
+    assert len(pod_informer.by_index("default")) == 3
+
+    pod_informer._apply_event("MODIFIED", make_pod("web-3", containers=("app", "sidecar")))
+    assert pod_informer.get("default/web-3").containers == ("app", "sidecar")
+
+    pod_informer._apply_event("DELETED", make_pod("web-1"))
+    assert pod_informer.get("default/web-1") is None
+    assert len(pod_informer.by_index("default")) == 2
+
+    # Bookmarks only advance the resourceVersion
+    pod_informer._handle_event({"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "99"}}})
+    assert pod_informer.resource_version == "99"
+    assert len(pod_informer.list()) == 3
+
+def test_error_event_raises(pod_informer):
+    """Test that an ERROR watch event surfaces as an ApiException."""
+    with pytest.raises(ApiException) as excinfo:
+        pod_informer._handle_event({"type": "ERROR", "object": {"code": 410, "message": "too old"}})
+    assert excinfo.value.status == 410
+
+def test_relist_after_gone():
+    """Test that a 410 Gone from the watch triggers a fresh LIST."""
+    list_func = make_list_func([make_pod("pod-1")])
+    informer = Informer(list_func, retry_delay=0)
+    watches = []
+
+    def watch_once():
+        watches.append(informer.resource_version)
+        if len(watches) == 1:
+            raise ApiException(status=410)
+        informer._stop_event.set()
+
+    informer._watch_once = watch_once
+    informer._run()
+
+    assert len(list_func.calls) == 2
+    assert watches == ["1", "1"]
+
+def test_cluster_cache_queries():
+    """Test the cluster cache query helpers."""
+    core_v1 = type("FakeCoreV1", (), {})()
+    core_v1.list_namespace = make_list_func([{"metadata": {"name": n}} for n in ("kube-system", "default")])
+    core_v1.list_node = make_list_func([])
+    core_v1.list_pod_for_all_namespaces = make_list_func([make_pod("web-1", containers=("app", "proxy"))])
+    core_v1.list_event_for_all_namespaces = make_list_func([{
+        "metadata": {"name": "web-1.1", "namespace": "default", "uid": "e1"},
+        "involvedObject": {"kind": "Pod", "namespace": "default", "name": "web-1"},
+        "reason": "BackOff", "type": "Warning", "count": 3
+    }])
+    cache = ClusterCache(core_v1, sync_timeout=0)
+    for informer in (cache.namespaces, cache.nodes, cache.pods, cache.events):
+        informer._relist()
+
+    assert cache.get_namespaces() == ["default", "kube-system"]
+    assert cache.get_pods("default") == ["web-1"]
+    assert cache.get_containers("default", "web-1") == ["app", "proxy"]
+    with pytest.raises(KeyError):
+        cache.get_containers("default", "missing")
+
+    snapshot = cache.snapshot()
+    assert snapshot.namespace_names() == ["default", "kube-system"]
+    assert [pod.name for pod in snapshot.pods_in("default")] == ["web-1"]
+    assert [(group.name, group.reason, group.count) for group in snapshot.events] == [("web-1", "BackOff", 3)]
+
+def test_watch_applies_stream_events(pod_informer):
+    """Test that a WATCH response is parsed line by line into the store."""
+    events = [
+        {"type": "ADDED", "object": make_pod("web-3")},
+        {"type": "DELETED", "object": make_pod("web-1")},
+    ]
+    events[0]["object"]["metadata"]["resourceVersion"] = "43"
+
+    class WatchResponse:
+        def stream(self, amt=None, decode_content=False):
+            for event in events:
+                yield (json.dumps(event) + "\n").encode()
+
+        def release_conn(self):
+            pass
+
+    pod_informer.list_func = lambda **kwargs: WatchResponse()
+    pod_informer._watch_once()
+    assert pod_informer.get("default/web-3") is not None
+    assert pod_informer.get("default/web-1") is None
+    assert pod_informer.resource_version == "43"
@@ -0,0 +1,69 @@
+import socket
+import time
+import pytest
+import yaml
+from benchmarks.fake_servers import FakeKubernetesAPI, synthetic_cluster
+from utils import k8s_clusters
+from utils.k8s_clusters import DEFAULT_CLUSTER_TIMEOUT, ClusterSet, get_cluster_set
+
+def write_kubeconfig(path, servers):
+    """Write a kubeconfig with one context per server URL, the first being current."""
+    names = list(servers)
+    path.write_text(yaml.safe_dump({
+        "apiVersion": "v1",
+        "kind": "Config",
+        "current-context": names[0],
+        "clusters": [{"name": name, "cluster": {"server": url}} for name, url in servers.items()],
+        "users": [{"name": "user", "user": {"token": "test"}}],
+        "contexts": [{"name": name, "context": {"cluster": name, "user": "user"}} for name in names],
+    }))
+    return str(path)
+
+@pytest.fixture
+def silent_server():
+    """A socket that accepts connections but never answers, like a hung API server."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    sock.close()
+
+def test_contexts(tmp_path):
+    """Test enumerating the kubeconfig contexts."""
+    config_file = write_kubeconfig(tmp_path / "config", {"prod": "http://a", "dev": "http://b"})
+    clusters = ClusterSet(config_file)
+    assert clusters.contexts() == ["dev", "prod"]
+    assert clusters.current_context == "prod"
+    assert ClusterSet(str(tmp_path / "missing")).contexts() == []
+
+def test_snapshots_in_parallel_with_timeout(tmp_path, silent_server):
+    """Test that a hung cluster is reported without delaying the others."""
+    with FakeKubernetesAPI(synthetic_cluster(namespaces=2, nodes=3, pods=10)) as prod, \
+            FakeKubernetesAPI(synthetic_cluster(namespaces=1, nodes=7, pods=5)) as dev:
+        config_file = write_kubeconfig(tmp_path / "config", {
+            "prod": prod.url, "dev": dev.url, "hung": silent_server
+        })
+        clusters = ClusterSet(config_file, timeout=1.0)
+        try:
+            started = time.perf_counter()
+            snapshots, errors = clusters.snapshots(["prod", "dev", "hung"])
+            assert time.perf_counter() - started < 3
+            assert sorted(snapshots) == ["dev", "prod"]
+            assert len(snapshots["prod"].nodes) == 3
+            assert len(snapshots["dev"].not_ready_nodes()) == 1
+            assert list(errors) == ["hung"]
+            # Caches are kept, later snapshots come from memory
+            assert clusters.cache("prod") is clusters.cache("prod")
+        finally:
+            clusters.stop()
+
+def test_shared_cluster_set_applies_latest_timeout(monkeypatch):
+    """Test that the shared set uses the timeout of the latest caller that passes one."""
+    monkeypatch.setattr(k8s_clusters, "_cluster_set", None)
+    cluster_set = get_cluster_set()
+    assert cluster_set.timeout == DEFAULT_CLUSTER_TIMEOUT
+    assert get_cluster_set(3.0) is cluster_set
+    assert cluster_set.timeout == 3.0
+    get_cluster_set()
+    assert cluster_set.timeout == 3.0
+    cluster_set.stop()
@@ -0,0 +1,69 @@
+import json
+from utils.k8s_events import EventInformer, EventStore
+
+def make_event(uid, name="api-1", reason="BackOff", count=1, last="2024-05-01T10:00:00Z", message="Back-off"):
+    """Create a raw core/v1 Warning event."""
+    return {
+        "metadata": {"name": f"{name}.{uid}", "namespace": "shop", "uid": uid},
+        "involvedObject": {"kind": "Pod", "namespace": "shop", "name": name},
+        "reason": reason,
+        "message": message,
+        "type": "Warning",
+        "count": count,
+        "firstTimestamp": "2024-05-01T09:00:00Z",
+        "lastTimestamp": last,
+    }
+
+NOW = 1714557600.0  # 2024-05-01T10:00:00Z
+
+def test_events_are_aggregated_by_object_and_reason():
+    """Test that events of one object and reason form one group with a total count."""
+    store = EventStore()
+    store.ingest(make_event("a", count=3))
+    store.ingest(make_event("b", count=2, last="2024-05-01T09:59:00Z", message="older"))
+    store.ingest(make_event("c", reason="FailedMount"))
+    groups = store.groups(now=NOW)
+    assert len(groups) == 2
+    backoff = next(group for group in groups if group.reason == "BackOff")
+    assert backoff.count == 5
+    assert backoff.message == "Back-off"
+    assert backoff.last_seen == NOW
+    assert backoff.first_seen == NOW - 3600
+
+def test_count_updates_are_not_double_counted():
+    """Test that MODIFIED events and re-lists only add the count difference."""
+    store = EventStore()
+    store.ingest(make_event("a", count=3))
+    store.ingest(make_event("a", count=5))
+    store.ingest(make_event("a", count=5))
+    assert store.groups(now=NOW)[0].count == 5
+
+def test_store_is_bounded_and_expires():
+    """Test the group limit and the time window."""
+    store = EventStore(max_groups=2, window=600)
+    store.ingest(make_event("a", name="old", last="2024-05-01T09:00:00Z"))
+    store.ingest(make_event("b", name="web"))
+    store.ingest(make_event("c", name="db"))
+    assert len(store) == 2
+    assert sorted(group.name for group in store.groups(now=NOW)) == ["db", "web"]
+    assert store.groups(now=NOW + 601) == []
+
+def test_informer_feeds_store():
+    """Test that LIST pages and WATCH events end up in the store, not the informer's items."""
+    class Response:
+        def __init__(self, body):
+            self.data = json.dumps(body).encode()
+
+        def release_conn(self):
+            pass
+
+    def list_func(**kwargs):
+        return Response({"items": [make_event("a", count=2)], "metadata": {"resourceVersion": "7"}})
+
+    informer = EventInformer(list_func)
+    informer._relist()
+    informer._handle_event({"type": "MODIFIED", "object": make_event("a", count=4)})
+    informer._handle_event({"type": "DELETED", "object": make_event("a", count=4)})
+    assert informer.resource_version == "7"
+    assert informer.list() == []
+    assert informer.store.groups(now=NOW)[0].count == 4
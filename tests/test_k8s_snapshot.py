@@ -0,0 +1,97 @@
+import pytest
+from utils.k8s_snapshot import NO_RESOURCES, ClusterSnapshot, NamespaceRecord, NodeRecord, PodRecord, parse_quantity
+
+# Memory budget for 10k resident pods (records plus their names)
+MAX_BYTES_PER_10K_PODS = 2 * 1024 * 1024
+
+def make_raw_pod(name, namespace="default", phase="Running", restarts=0):
+    """Create a raw pod object."""
+    return {
+        "metadata": {
+            "name": name,
+            "namespace": namespace,
+            "ownerReferences": [{"kind": "ReplicaSet", "name": "web-7d4b9c"}]
+        },
+        "spec": {"containers": [{"name": "app"}, {"name": "proxy"}], "nodeName": "node-1"},
+        "status": {"phase": phase, "containerStatuses": [{"restartCount": restarts}]}
+    }
+
+@pytest.fixture
+def snapshot():
+    """Create a small cluster snapshot."""
+    return ClusterSnapshot(
+        [NamespaceRecord("kube-system"), NamespaceRecord("default")],
+        [NodeRecord("node-2", False), NodeRecord("node-1", True)],
+        [
+            PodRecord.from_raw(make_raw_pod("web-1")),
+            PodRecord.from_raw(make_raw_pod("web-2", phase="Pending")),
+            PodRecord.from_raw(make_raw_pod("dns-1", "kube-system"))
+        ]
+    )
+
+def test_pod_record_from_raw():
+    """Test that a pod record keeps the fields the app uses."""
+    pod = PodRecord.from_raw(make_raw_pod("web-1", restarts=3))
+    assert pod.name == "web-1"
+    assert pod.namespace == "default"
+    assert pod.node == "node-1"
+    assert pod.phase == "Running"
+    assert pod.owner == "web-7d4b9c"
+    assert pod.containers == ("app", "proxy")
+    assert pod.restarts == 3
+    with pytest.raises(AttributeError):
+        pod.extra = "value"
+
+def test_node_record_from_raw():
+    """Test node readiness detection."""
+    node = NodeRecord.from_raw({
+        "metadata": {"name": "node-1"},
+        "status": {"conditions": [{"type": "MemoryPressure", "status": "False"},
+                                  {"type": "Ready", "status": "True"}]}
+    })
+    assert node.name == "node-1"
+    assert node.ready
+
+def test_parse_quantity():
+    """Test CPU and memory quantities in cores and bytes."""
+    assert parse_quantity("250m") == 0.25
+    assert parse_quantity("2") == 2.0
+    assert parse_quantity("512Mi") == 512 * 2 ** 20
+    assert parse_quantity("1G") == 1e9
+    assert parse_quantity("1500000n") == 0.0015
+    assert parse_quantity("lots") == 0.0
+    assert parse_quantity(None) == 0.0
+
+def test_resources_from_raw():
+    """Test that container requests and limits are summed per pod and allocatable is read per node."""
+    raw = make_raw_pod("web-1")
+    raw["spec"]["containers"][0]["resources"] = {"requests": {"cpu": "100m", "memory": "64Mi"},
+                                                 "limits": {"cpu": "500m", "memory": "128Mi"}}
+    raw["spec"]["containers"][1]["resources"] = {"requests": {"cpu": "50m"}}
+    assert PodRecord.from_raw(raw).resources == pytest.approx((0.15, 0.5, 64 * 2 ** 20, 128 * 2 ** 20))
+    assert PodRecord.from_raw(make_raw_pod("web-2")).resources is NO_RESOURCES
+    node = NodeRecord.from_raw({"metadata": {"name": "node-1"},
+                                "status": {"allocatable": {"cpu": "3920m", "memory": "16Gi"}}})
+    assert node.cpu_allocatable == 3.92
+    assert node.memory_allocatable == 16 * 2 ** 30
+
+def test_shared_values():
+    """Test that repeated strings and container tuples are shared."""
+    first = PodRecord.from_raw(make_raw_pod("web-1"))
+    second = PodRecord.from_raw(make_raw_pod("web-2"))
+    assert first.namespace is second.namespace
+    assert first.phase is second.phase
+    assert first.containers is second.containers
+
+def test_snapshot_queries(snapshot):
+    """Test the snapshot query helpers."""
+    assert snapshot.namespace_names() == ["default", "kube-system"]
+    assert [pod.name for pod in snapshot.pods_in("default")] == ["web-1", "web-2"]
+    assert [node.name for node in snapshot.not_ready_nodes()] == ["node-2"]
+    assert snapshot.phase_counts() == {"Running": 2, "Pending": 1}
+
+def test_memory_bound():
+    """Test that 10k pods stay within the memory budget."""
+    pods = [PodRecord.from_raw(make_raw_pod(f"web-7d4b9c-{i:05d}", f"ns-{i % 50}")) for i in range(10000)]
+    snapshot = ClusterSnapshot([], [], pods)
+    assert snapshot.memory_usage() < MAX_BYTES_PER_10K_PODS
@@ -0,0 +1,77 @@
+import copy
+import pytest
+import yaml
+from benchmarks.fake_servers import FakeKubernetesAPI, synthetic_cluster
+from tests.test_k8s_clusters import write_kubeconfig
+from utils.k8s_clusters import ClusterSet
+from utils.k8s_tools import KubernetesTools
+
+@pytest.fixture
+def tools(tmp_path):
+    """Kubernetes tools against a fake cluster, with a recording log reader."""
+    cluster = synthetic_cluster(namespaces=2, nodes=2, pods=40)
+    # A sibling deployment whose name starts with the name of app-17
+    canary = copy.deepcopy(next(pod for pod in cluster["pods"] if pod["metadata"]["name"] == "app-17-000017"))
+    canary["metadata"]["name"] = "app-17-canary-6c8f7b5d4-x2k4q"
+    canary["metadata"]["ownerReferences"][0]["name"] = "app-17-canary-6c8f7b5d4"
+    cluster["pods"].append(canary)
+    with FakeKubernetesAPI(cluster) as api:
+        cluster_set = ClusterSet(write_kubeconfig(tmp_path / "config", {"prod": api.url}), timeout=10)
+        # Events are best effort in snapshots, wait for them so the tests see all of them
+        assert cluster_set.cache("prod").events.wait_for_sync(10)
+        tail_calls = []
+
+        def tail_logs(*args):
+            tail_calls.append(args)
+            return "line 1\nline 2\n"
+
+        kubernetes_tools = KubernetesTools(cluster_set, tail_logs)
+        kubernetes_tools.tail_calls = tail_calls
+        yield kubernetes_tools
+        cluster_set.stop()
+
+def test_tool_definitions(tools):
+    """Test that every tool has a JSON schema and a handler."""
+    definitions = {tool.name: tool for tool in tools.tools()}
+    assert set(definitions) == {"list_pods", "get_pod", "describe_workload", "tail_logs", "list_events"}
+    assert definitions["get_pod"].schema()["parameters"]["required"] == ["namespace", "name"]
+
+def test_list_pods(tools):
+    """Test listing unhealthy pods of a namespace from the cache."""
+    lines = tools.list_pods("team-0", unhealthy_only=True, cluster="prod").splitlines()
+    assert lines == [
+        "team-0/app-18-000018: Failed, 5 restarts, node node-0",
+        "team-0/app-38-000038: Failed, 12 restarts, node node-0",
+    ]
+    assert len(tools.list_pods(cluster="prod").splitlines()) == 41
+
+def test_get_pod(tools):
+    """Test the pod summary read from the API server."""
+    pod = yaml.safe_load(tools.get_pod("team-0", "app-18-000018", cluster="prod"))
+    assert pod["phase"] == "Failed"
+    assert pod["owner"] == "ReplicaSet/app-18-7d9f8"
+    assert pod["containers"][0]["restarts"] == 5
+    assert pod["containers"][0]["limits"] == {"cpu": "500m", "memory": "256Mi"}
+    assert "BackOff x4" in pod["warnings"][0]
+
+def test_describe_workload(tools):
+    """Test the deployment summary with its own pods from the cache, not those of sibling deployments."""
+    deployment = yaml.safe_load(tools.describe_workload("team-1", "deployment", "app-17", cluster="prod"))
+    assert deployment["replicas"]["ready"] == 2
+    assert deployment["failing_conditions"][0].startswith("Available=False (MinimumReplicasUnavailable)")
+    assert deployment["pods"] == ["app-17-000017: Pending, 4 restarts, node node-1"]
+    assert "FailedScheduling" in deployment["warnings"][0]
+    with pytest.raises(ValueError):
+        tools.describe_workload("team-1", "cronjob", "app-17", cluster="prod")
+
+def test_tail_logs_is_bounded(tools):
+    """Test that log tails go through the log reader with a capped line count."""
+    assert tools.tail_logs("team-0", "app-0-000000", lines=5000, cluster="prod") == "line 1\nline 2"
+    assert tools.tail_calls == [("team-0", "app-0-000000", "", 200, False, "prod")]
+
+def test_list_events(tools):
+    """Test filtering the aggregated warning events."""
+    events = tools.list_events(namespace="team-1", cluster="prod").splitlines()
+    assert len(events) == 2
+    assert all(line.startswith("team-1/Pod/") for line in events)
+    assert tools.list_events(name="does-not-exist", cluster="prod") == "None found"
@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+from kubernetes import client
+from benchmarks.fake_servers import FakeKubernetesAPI, synthetic_cluster
+from benchmarks.run_benchmarks import kubernetes_client
+from tabs.resources_tab import hotspot_rows
+from utils.k8s_snapshot import ClusterSnapshot, NodeRecord, PodRecord
+from utils import k8s_usage
+from utils.k8s_usage import UsageSampler, fetch_metrics, get_usage_sampler, parse_pod_metrics, row_percentiles
+
+MI = 2 ** 20
+
+def make_snapshot():
+    """Create a snapshot of two pods with limits and one node."""
+    return ClusterSnapshot(
+        [],
+        [NodeRecord("node-1", True, cpu_allocatable=4.0, memory_allocatable=8192 * MI)],
+        [
+            PodRecord("api-1", "shop", resources=(0.1, 0.5, 128 * MI, 256 * MI)),
+            PodRecord("worker-1", "shop", resources=(0.2, 1.0, 256 * MI, 512 * MI)),
+            PodRecord("batch-1", "jobs"),
+        ]
+    )
+
+class FakeMetrics:
+    """Usage returned by the sampler's fetch function, changed by the tests between samples."""
+
+    def __init__(self):
+        self.pods = {"shop/api-1": (0.1, 100 * MI), "shop/worker-1": (0.3, 200 * MI), "jobs/batch-1": (1.5, 50 * MI)}
+
+    def __call__(self):
+        keys = list(self.pods)
+        return (
+            (["node-1"], np.array([2.0]), np.array([4096.0 * MI])),
+            (keys, np.array([self.pods[key][0] for key in keys]), np.array([self.pods[key][1] for key in keys]))
+        )
+
+@pytest.fixture
+def sampler():
+    """Create a sampler with three samples of usage."""
+    metrics = FakeMetrics()
+    sampler = UsageSampler(metrics, make_snapshot, capacity=4, max_pods=8, max_nodes=2)
+    for index, api_memory in enumerate([100, 150, 240]):
+        metrics.pods["shop/api-1"] = (0.1 * (index + 1), api_memory * MI)
+        sampler.sample(now=1000.0 + index * 15)
+    sampler.metrics = metrics
+    return sampler
+
+def test_row_percentiles_match_numpy():
+    """Test that the vectorized percentiles ignore NaN like np.nanpercentile."""
+    values = np.array([[1.0, np.nan, 3.0, 2.0], [np.nan, np.nan, np.nan, np.nan], [5.0, 1.0, np.nan, np.nan]])
+    result = row_percentiles(values, [50, 95])
+    assert np.allclose(result[:, 0], [2.0, 2.9])
+    assert np.isnan(result[:, 1]).all()
+    assert np.allclose(result[:, 2], [3.0, 4.8])
+
+def test_parse_pod_metrics_sums_containers():
+    """Test that container usage is summed per pod."""
+    keys, cpu, memory = parse_pod_metrics({"items": [{
+        "metadata": {"name": "api-1", "namespace": "shop"},
+        "containers": [{"usage": {"cpu": "150m", "memory": "100Mi"}}, {"usage": {"cpu": "50m", "memory": "28Mi"}}]
+    }]})
+    assert keys == ["shop/api-1"]
+    assert cpu[0] == pytest.approx(0.2)
+    assert memory[0] == 128 * MI
+
+def test_hotspots(sampler):
+    """Test the rolling statistics, limit ratios and rankings."""
+    stats = sampler.hotspots()
+    assert stats["samples"] == 3
+    assert stats["window_seconds"] == 30
+    assert [pod["pod"] for pod in stats["top_cpu"]] == ["jobs/batch-1", "shop/api-1", "shop/worker-1"]
+    near_memory = stats["near_memory_limit"]
+    assert [pod["pod"] for pod in near_memory] == ["shop/api-1"]
+    assert near_memory[0]["memory_limit_ratio"] == pytest.approx(240 / 256)
+    # batch-1 has no requests or limits, so it is never reported as close to them
+    assert "jobs/batch-1" not in [pod["pod"] for pod in stats["over_cpu_request"]]
+    assert [pod["pod"] for pod in stats["over_cpu_request"]] == ["shop/api-1", "shop/worker-1"]
+    assert stats["nodes"][0]["cpu_ratio"] == 0.5
+    assert sampler.hotspots() is stats
+
+def test_ring_buffer_wraps_and_frees_rows(sampler):
+    """Test that old samples are overwritten and pods gone for a whole window free their row."""
+    del sampler.metrics.pods["jobs/batch-1"]
+    for index in range(3, 8):
+        sampler.sample(now=1000.0 + index * 15)
+    stats = sampler.hotspots()
+    assert stats["samples"] == 4
+    assert stats["window_seconds"] == 45
+    assert "jobs/batch-1" not in sampler.pods.rows
+    assert [pod["pod"] for pod in stats["top_cpu"]] == ["shop/api-1", "shop/worker-1"]
+
+def test_resize_keeps_newest_samples(sampler):
+    """Test that a smaller window keeps the newest samples and frees rows of pods only seen before."""
+    del sampler.metrics.pods["jobs/batch-1"]
+    sampler.sample(now=1045.0)
+    sampler.sample(now=1060.0)
+    sampler.resize(2)
+    assert list(sampler.times) == [1045.0, 1060.0]
+    assert "jobs/batch-1" not in sampler.pods.rows
+    sampler.resize(6)
+    sampler.sample(now=1075.0)
+    stats = sampler.hotspots()
+    assert stats["samples"] == 3
+    assert stats["window_seconds"] == 30
+
+def test_shared_sampler_applies_latest_settings(monkeypatch):
+    """Test that the shared sampler uses the window and interval of the latest caller that passes them."""
+    shared = UsageSampler(FakeMetrics(), capacity=4)
+    monkeypatch.setattr(k8s_usage, "_usage_sampler", shared)
+    assert get_usage_sampler(8, 5.0) is shared
+    assert (shared.capacity, shared.interval, len(shared.times)) == (8, 5.0, 8)
+    get_usage_sampler()
+    assert (shared.capacity, shared.interval) == (8, 5.0)
+
+def test_facts_fit_budget_and_mention_pods(sampler):
+    """Test that the facts put pods named in the question first and respect the budget."""
+    facts = sampler.facts({"api-1"}, token_budget=200)
+    lines = facts.splitlines()
+    assert lines[0] == "Resource usage (last 0m, 3 samples):"
+    assert lines[1].startswith("- shop/api-1: CPU 300m")
+    assert "Near memory limit (OOM risk): shop/api-1 240Mi/256Mi (94%)" in facts
+    assert len(sampler.facts(token_budget=40).splitlines()) < len(lines)
+    assert UsageSampler(FakeMetrics()).facts() == ""
+
+def test_hotspot_rows(sampler):
+    """Test the table rows of the resources tab."""
+    nodes, pods = hotspot_rows(sampler.hotspots())
+    assert nodes == [["node-1", "2.00", "50%", "50%", "4.0Gi", "50%"]]
+    assert pods[0] == ["Near memory limit", "shop/api-1", "300m", "290m", "500m", "240Mi", "256Mi"]
+
+def test_fetch_metrics_from_fake_api():
+    """Test sampling the metrics API of the fake cluster."""
+    cluster = synthetic_cluster(namespaces=2, nodes=2, pods=40)
+    with FakeKubernetesAPI(cluster) as api:
+        custom_objects = client.CustomObjectsApi(kubernetes_client(api).api_client)
+        snapshot = ClusterSnapshot([], [NodeRecord.from_raw(node) for node in cluster["nodes"]],
+                                   [PodRecord.from_raw(pod) for pod in cluster["pods"]])
+        sampler = UsageSampler(lambda: fetch_metrics(custom_objects), lambda: snapshot, capacity=10)
+        sampler.sample()
+        sampler.sample()
+    stats = sampler.hotspots()
+    assert stats["samples"] == 2
+    assert len(sampler.pods.rows) == 34
+    assert len(stats["nodes"]) == 2
+    assert stats["top_cpu"][0]["cpu_limit"] == 0.5
@@ -0,0 +1,185 @@
+import asyncio
+import pytest
+from benchmarks.fake_servers import FakeOpenAI
+from utils.json_utils import AIProviderConfig
+from utils.llm_providers import (
+    AnthropicProvider, LLMProvider, OpenAIProvider, ProviderError, ProviderRouter, ToolCall, _anthropic_messages,
+    _openai_messages, create_provider, parse_targets
+)
+
+class FakeProvider(LLMProvider):
+    """Provider that streams fixed chunks after a delay, or fails."""
+
+    def __init__(self, name, chunks=("Hello", " world"), delay=0.0, error=None):
+        super().__init__(name, "key")
+        self.chunks = chunks
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.closed = False
+
+    async def stream(self, model, messages, tools=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error:
+                raise self.error
+            for chunk in self.chunks:
+                yield chunk
+        finally:
+            self.closed = True
+
+def collect(router):
+    """Run a router and join the streamed text."""
+    async def run():
+        return "".join([text async for text in router.stream([{"role": "user", "content": "hi"}])])
+    return asyncio.run(run())
+
+def test_parse_targets():
+    """Test parsing the fallback list."""
+    assert parse_targets("Anthropic:claude-2.1, OpenAI:gpt-4,invalid") == [
+        ("Anthropic", "claude-2.1"),
+        ("OpenAI", "gpt-4")
+    ]
+    assert parse_targets("") == []
+
+def test_create_provider(tmp_path):
+    """Test dispatching to the provider's native client."""
+    config = AIProviderConfig(tmp_path / "ai_providers.json")
+    assert isinstance(create_provider("OpenAI", "key", config), OpenAIProvider)
+    assert isinstance(create_provider("Anthropic", "key", config), AnthropicProvider)
+    with pytest.raises(ProviderError):
+        create_provider("Unknown", "key", config)
+
+def test_primary_success():
+    """Test that the first target is used when it works."""
+    primary, fallback = FakeProvider("primary"), FakeProvider("fallback", ("other",))
+    assert collect(ProviderRouter([(primary, "m1"), (fallback, "m2")])) == "Hello world"
+    assert fallback.calls == 0
+
+def test_fallback_on_error():
+    """Test ordered fallback when a provider errors."""
+    primary = FakeProvider("primary", error=RuntimeError("rate limited"))
+    fallback = FakeProvider("fallback", ("from fallback",))
+    assert collect(ProviderRouter([(primary, "m1"), (fallback, "m2")])) == "from fallback"
+
+def test_all_failed():
+    """Test that an error lists every failed provider."""
+    router = ProviderRouter([
+        (FakeProvider("a", error=RuntimeError("down")), "m1"),
+        (FakeProvider("b", error=RuntimeError("rate limited")), "m2")
+    ])
+    with pytest.raises(ProviderError) as excinfo:
+        collect(router)
+    assert "a (m1): down" in str(excinfo.value)
+    assert "b (m2): rate limited" in str(excinfo.value)
+
+def test_hedged_request_wins():
+    """Test that a slow primary is hedged and the faster answer is used."""
+    slow = FakeProvider("slow", ("slow",), delay=1.0)
+    fast = FakeProvider("fast", ("fast",), delay=0.01)
+    assert collect(ProviderRouter([(slow, "m1"), (fast, "m2")], hedge_after=0.05)) == "fast"
+    assert slow.calls == 1
+    assert slow.closed
+
+class SlowStream:
+    """Async iterator that is not a generator, so only aclose releases its connection."""
+
+    def __init__(self):
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(1.0)
+        return "slow"
+
+    async def aclose(self):
+        self.closed = True
+
+class SlowStreamProvider(LLMProvider):
+    """Provider whose stream is a SlowStream."""
+
+    def __init__(self):
+        super().__init__("slow-stream", "key")
+        self.streams = []
+
+    def stream(self, model, messages, tools=None):
+        self.streams.append(SlowStream())
+        return self.streams[-1]
+
+def test_hedge_loser_stream_is_closed():
+    """Test that the stream of a hedged request that lost the race is closed."""
+    slow = SlowStreamProvider()
+    fast = FakeProvider("fast", ("fast",), delay=0.01)
+    assert collect(ProviderRouter([(slow, "m1"), (fast, "m2")], hedge_after=0.05)) == "fast"
+    assert slow.streams[0].closed
+
+def test_no_hedge_when_fast():
+    """Test that no hedged request is sent when the primary answers in time."""
+    primary, hedge = FakeProvider("primary"), FakeProvider("hedge")
+    assert collect(ProviderRouter([(primary, "m1"), (hedge, "m2")], hedge_after=0.5)) == "Hello world"
+    assert hedge.calls == 0
+
+def test_router_records_metrics():
+    """Test that the answering target's latency and token counts are recorded."""
+    from utils.metrics import LLM_FIRST_TOKEN_SECONDS, LLM_REQUEST_SECONDS, LLM_TOKENS
+    labels = {"provider": "metered", "model": "m1"}
+    before = LLM_TOKENS.value(kind="completion", **labels)
+    assert collect(ProviderRouter([(FakeProvider("metered", ("a" * 8,)), "m1")])) == "a" * 8
+    assert LLM_REQUEST_SECONDS.count(**labels) >= 1
+    assert LLM_FIRST_TOKEN_SECONDS.count(**labels) >= 1
+    assert LLM_TOKENS.value(kind="completion", **labels) == before + 2
+
+TOOL_TURN = [
+    {"role": "user", "content": "why?"},
+    {"role": "assistant", "content": "", "tool_calls": [
+        ToolCall("call-1", "get_pod", {"name": "api"}), ToolCall("call-2", "list_events", {})
+    ]},
+    {"role": "tool", "tool_call_id": "call-1", "name": "get_pod", "content": "phase: Failed"},
+    {"role": "tool", "tool_call_id": "call-2", "name": "list_events", "content": "None found"},
+]
+
+def test_openai_tool_messages():
+    """Test converting tool calls and results to the Chat Completions format."""
+    converted = _openai_messages(TOOL_TURN)
+    assert converted[1]["content"] is None
+    assert converted[1]["tool_calls"][0]["function"] == {"name": "get_pod", "arguments": '{"name": "api"}'}
+    assert converted[2] == {"role": "tool", "tool_call_id": "call-1", "content": "phase: Failed"}
+
+def test_anthropic_tool_messages():
+    """Test that tool calls become tool_use blocks and the results of one turn one user message."""
+    converted = _anthropic_messages(TOOL_TURN)
+    assert len(converted) == 3
+    assert [block["type"] for block in converted[1]["content"]] == ["tool_use", "tool_use"]
+    assert converted[2]["role"] == "user"
+    assert [block["tool_use_id"] for block in converted[2]["content"]] == ["call-1", "call-2"]
+
+def test_provider_must_implement_stream():
+    """Test that a provider without stream can not be created."""
+    class Incomplete(LLMProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "key")
+
+def test_router_supports_tools():
+    """Test that tools are only offered when every target supports them."""
+    openai = OpenAIProvider("OpenAI", "key")
+    assert ProviderRouter([(openai, "m1")]).supports_tools
+    assert not ProviderRouter([(openai, "m1"), (FakeProvider("plain"), "m2")]).supports_tools
+
+def test_openai_streams_tool_calls():
+    """Test that streamed function call fragments are joined into one call."""
+    tools = [{"name": "get_pod", "description": "Get a pod", "parameters": {"type": "object", "properties": {}}}]
+    with FakeOpenAI(first_token_delay=0, tokens=3, tool_call={"name": "get_pod", "arguments": {"name": "api"}}) as fake:
+        router = ProviderRouter([(OpenAIProvider("Mock", "key", {"base_url": fake.base_url}), "mock-model")])
+
+        async def run():
+            return [item async for item in router.stream([{"role": "user", "content": "why?"}], tools)]
+
+        items = asyncio.run(run())
+    assert len(items) == 1
+    assert (items[0].id, items[0].name, items[0].arguments) == ("call_1", "get_pod", {"name": "api"})
+    assert fake.requests[0]["tools"] == [{"type": "function", "function": tools[0]}]
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from utils.llm_providers import LLMProvider, ProviderRouter, ToolCall
+from utils.llm_tools import Tool, ToolSet, stream_with_tools
+
+ECHO_SCHEMA = {"type": "object", "properties": {"text": {"type": "string"}}}
+
+class ScriptedProvider(LLMProvider):
+    """Provider that answers each turn from a script and records the conversations it got."""
+
+    supports_tools = True
+
+    def __init__(self, turns):
+        super().__init__("scripted", "key")
+        self.turns = list(turns)
+        self.requests = []
+
+    async def stream(self, model, messages, tools=None):
+        self.requests.append((list(messages), tools))
+        for item in self.turns.pop(0):
+            yield item
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_tool_calls_run_in_parallel():
+    """Test that the calls of one turn overlap and keep their order."""
+    barrier = threading.Barrier(3, timeout=2)
+
+    def wait(text):
+        barrier.wait()
+        return text
+
+    tools = ToolSet([Tool("wait", "Wait for the others", ECHO_SCHEMA, wait)])
+    calls = [ToolCall(str(i), "wait", {"text": f"result {i}"}) for i in range(3)]
+    assert run(tools.execute(calls)) == ["result 0", "result 1", "result 2"]
+
+def test_results_are_cached_and_truncated():
+    """Test the per-call result cache and the size limit."""
+    counter = []
+
+    def lookup(text):
+        counter.append(text)
+        return text * 100
+
+    tools = ToolSet([Tool("lookup", "Look up", ECHO_SCHEMA, lookup)], max_result_chars=50)
+    first = run(tools.execute([ToolCall("1", "lookup", {"text": "ab"})]))[0]
+    assert first == "ab" * 25 + "\n... (150 more characters omitted)"
+    assert run(tools.execute([ToolCall("2", "lookup", {"text": "ab"})]))[0] == first
+    assert counter == ["ab"]
+    run(tools.execute([ToolCall("3", "lookup", {"text": "cd"})]))
+    assert counter == ["ab", "cd"]
+
+def test_errors_are_returned_to_the_model():
+    """Test that failing, unknown, malformed and slow calls give an error text instead of raising."""
+    def fail(text):
+        raise KeyError("pod not found")
+
+    tools = ToolSet([
+        Tool("fail", "Fail", ECHO_SCHEMA, fail),
+        Tool("slow", "Sleep", ECHO_SCHEMA, lambda text: time.sleep(1) or text),
+    ], timeout=0.1)
+    results = run(tools.execute([
+        ToolCall("1", "fail", {"text": "x"}),
+        ToolCall("2", "missing", {}),
+        ToolCall("3", "fail", None),
+        ToolCall("4", "fail", {"unexpected": 1}),
+        ToolCall("5", "slow", {"text": "x"}),
+    ]))
+    assert results[0] == "Error: 'pod not found'"
+    assert results[1] == "Error: unknown tool missing"
+    assert results[2] == "Error: the arguments are not a valid JSON object"
+    assert results[3].startswith("Error: ")
+    assert results[4] == "Error: slow did not finish within 0.1s"
+
+def test_stream_with_tools_feeds_results_back():
+    """Test that tool results are sent back and the final answer is streamed."""
+    provider = ScriptedProvider([
+        ["Checking. ", ToolCall("call-1", "echo", {"text": "pod is OOMKilled"})],
+        ["It was ", "OOMKilled."],
+    ])
+    tools = ToolSet([Tool("echo", "Echo", ECHO_SCHEMA, lambda text: text)])
+
+    async def collect():
+        return [item async for item in stream_with_tools(
+            ProviderRouter([(provider, "m")]), [{"role": "user", "content": "why?"}], tools
+        )]
+
+    items = run(collect())
+    assert items[:2] == ["Checking. ", items[1]]
+    assert isinstance(items[1], ToolCall)
+    assert items[2:] == ["It was ", "OOMKilled."]
+    messages, definitions = provider.requests[1]
+    assert definitions == [{"name": "echo", "description": "Echo", "parameters": ECHO_SCHEMA}]
+    assert messages[1]["role"] == "assistant" and messages[1]["content"] == "Checking. "
+    assert messages[2] == {"role": "tool", "tool_call_id": "call-1", "name": "echo", "content": "pod is OOMKilled"}
+
+def test_stream_with_tools_stops_after_max_rounds():
+    """Test that a model that keeps calling tools is cut off."""
+    provider = ScriptedProvider([[ToolCall(str(i), "echo", {"text": "again"})] for i in range(3)])
+    tools = ToolSet([Tool("echo", "Echo", ECHO_SCHEMA, lambda text: text)])
+
+    async def collect():
+        return [item async for item in stream_with_tools(
+            ProviderRouter([(provider, "m")]), [{"role": "user", "content": "loop"}], tools, max_rounds=2
+        )]
+
+    items = run(collect())
+    assert sum(isinstance(item, ToolCall) for item in items) == 2
+    assert items[-1] == "\n\n(Stopped after the maximum number of tool calls.)"
@@ -0,0 +1,78 @@
+import os
+from utils import log_archive
+from utils.log_archive import LogArchive, _query_tokens
+
+def test_append_and_search(tmp_path):
+    """Test searching archived lines by text across pods."""
+    archive = LogArchive(str(tmp_path))
+    archive.append("prod", "default", "web-1", "app", "GET /api 200", timestamp=100.0)
+    archive.append("prod", "default", "web-1", "app", "connection refused to db", timestamp=101.0)
+    archive.append("prod", "default", "web-2", "app", "Connection Refused again", timestamp=102.0)
+    archive.append("prod", "other", "web-1", "app", "connection refused elsewhere", timestamp=103.0)
+    archive.append("staging", "default", "web-1", "app", "connection refused in staging", timestamp=104.0)
+    results = archive.search("prod", "default", text="connection refused")
+    assert results == [
+        (101.0, "web-1", "app", "connection refused to db"),
+        (102.0, "web-2", "app", "Connection Refused again"),
+    ]
+    assert archive.search("prod", "default", pod="web-2", text="refused")[0][1] == "web-2"
+    assert [line for _, _, _, line in archive.search("staging", "default")] == ["connection refused in staging"]
+
+def test_time_range(tmp_path):
+    """Test filtering by time range."""
+    archive = LogArchive(str(tmp_path))
+    for i in range(10):
+        archive.append("prod", "default", "web", "app", f"line {i}", timestamp=float(i))
+    results = archive.search("prod", "default", since=3, until=5)
+    assert [line for _, _, _, line in results] == ["line 3", "line 4", "line 5"]
+
+def test_persists_across_instances(tmp_path):
+    """Test that flushed lines can be searched by a new archive instance."""
+    archive = LogArchive(str(tmp_path))
+    archive.append("prod", "default", "web", "app", "hello world", timestamp=1.0)
+    archive.flush()
+    assert LogArchive(str(tmp_path)).search("prod", "default", text="world")[0][3] == "hello world"
+
+def test_replayed_lines_are_archived_once(tmp_path):
+    """Test that lines at or before the newest archived timestamp are dropped."""
+    archive = LogArchive(str(tmp_path))
+    for _ in range(2):
+        archive.append("prod", "default", "web", "app", "started", timestamp=1.0)
+        archive.append("prod", "default", "web", "app", "ready", timestamp=2.0)
+    assert [line for _, _, _, line in archive.search("prod", "default")] == ["started", "ready"]
+    reopened = LogArchive(str(tmp_path))
+    reopened.append("prod", "default", "web", "app", "ready", timestamp=2.0)
+    reopened.append("prod", "default", "web", "app", "serving", timestamp=3.0)
+    assert [line for _, _, _, line in reopened.search("prod", "default")] == ["started", "ready", "serving"]
+
+def test_bloom_filter_skips_blocks(tmp_path, monkeypatch):
+    """Test that blocks without the query's words are not decompressed."""
+    monkeypatch.setattr(log_archive, "BLOCK_LINES", 4)
+    archive = LogArchive(str(tmp_path))
+    for i in range(40):
+        archive.append("prod", "default", "web", "app", f"request {i} ok", timestamp=float(i))
+    archive.append("prod", "default", "web", "app", "request failed with panic here", timestamp=40.0)
+    decompressed = []
+    original = log_archive.zlib.decompress
+    monkeypatch.setattr(log_archive.zlib, "decompress", lambda data: decompressed.append(data) or original(data))
+    results = archive.search("prod", "default", text="with panic here")
+    assert [line for _, _, _, line in results] == ["request failed with panic here"]
+    assert len(decompressed) == 1
+
+def test_query_tokens():
+    """Test that partial words at the query edges are not used for pruning."""
+    assert _query_tokens("rror connecting to db") == ["connecting"]
+    assert _query_tokens(" timeout ") == ["timeout"]
+    assert _query_tokens("timeout") == []
+
+def test_segment_rotation(tmp_path, monkeypatch):
+    """Test that segments rotate by size and old ones are deleted."""
+    monkeypatch.setattr(log_archive, "BLOCK_LINES", 1)
+    archive = LogArchive(str(tmp_path), segment_bytes=64, max_segments=2)
+    for i in range(20):
+        archive.append("prod", "default", "web", "app", f"line {i} " + os.urandom(16).hex(), timestamp=float(i))
+    segments = [name for name in os.listdir(tmp_path / "prod" / "default" / "web" / "app") if name.endswith(".seg")]
+    assert len(segments) == 2
+    results = archive.search("prod", "default")
+    assert results and results[-1][3].startswith("line 19")
+    assert len(results) < 20
@@ -0,0 +1,38 @@
+import threading
+from utils.log_buffer import LogBuffer
+
+def test_append_and_snapshot():
+    """Test rendering buffered lines."""
+    buffer = LogBuffer(max_lines=10)
+    buffer.append("one")
+    buffer.extend(["two", "three"])
+    text, version, dropped = buffer.snapshot()
+    assert text == "one\ntwo\nthree"
+    assert version == 2
+    assert dropped == 0
+    assert len(buffer) == 3
+
+def test_ring_buffer_drops_oldest():
+    """Test that memory stays bounded and dropped lines are counted."""
+    buffer = LogBuffer(max_lines=3)
+    for i in range(10):
+        buffer.append(f"line {i}")
+    text, _, dropped = buffer.snapshot()
+    assert text == "line 7\nline 8\nline 9"
+    assert dropped == 7
+
+def test_clear():
+    """Test clearing the buffer."""
+    buffer = LogBuffer(max_lines=2)
+    buffer.extend(["a", "b", "c"])
+    buffer.clear()
+    assert buffer.snapshot()[0] == ""
+    assert buffer.dropped == 0
+
+def test_wait_for_update():
+    """Test waiting for new lines from another thread."""
+    buffer = LogBuffer()
+    version = buffer.version
+    assert not buffer.wait_for_update(version, timeout=0.01)
+    threading.Timer(0.01, buffer.append, args=("late",)).start()
+    assert buffer.wait_for_update(version, timeout=2)
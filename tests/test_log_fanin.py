@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from utils.log_fanin import LogFanIn, is_workload_reference, parse_log_timestamp, selector_for_workload
+
+class FakeStream:
+    """Streaming response that yields lines and then blocks until closed, like a follow request."""
+
+    def __init__(self, lines=()):
+        self.lines = lines
+        self.closed = threading.Event()
+        self.data = json.dumps({"items": [], "metadata": {"resourceVersion": "1"}}).encode()
+
+    def stream(self, amt=None, decode_content=False):
+        for line in self.lines:
+            yield (line + "\n").encode()
+        self.closed.wait(5)
+
+    def close(self):
+        self.closed.set()
+
+    def release_conn(self):
+        pass
+
+class FakeCoreV1:
+    """Fake CoreV1Api serving a pod list and per-container log streams."""
+
+    def __init__(self, pods, logs):
+        self.pods = pods
+        self.logs = logs
+        self.streams = []
+
+    def list_namespaced_pod(self, namespace, label_selector=None, watch=False, **kwargs):
+        if watch:
+            stream = FakeStream()
+            self.streams.append(stream)
+            return stream
+        response = FakeStream()
+        response.data = json.dumps({"items": self.pods, "metadata": {"resourceVersion": "1"}}).encode()
+        return response
+
+    def read_namespaced_pod_log(self, name, namespace, container, **kwargs):
+        stream = FakeStream(self.logs.get((name, container), []))
+        self.streams.append(stream)
+        return stream
+
+def make_pod(name, phase="Running"):
+    """Create a raw pod object with one container."""
+    return {
+        "metadata": {"name": name, "namespace": "default"},
+        "spec": {"containers": [{"name": "app"}]},
+        "status": {"phase": phase}
+    }
+
+def test_parse_log_timestamp():
+    """Test parsing RFC3339Nano timestamps of varying precision."""
+    whole, text = parse_log_timestamp("2024-05-01T10:00:00Z started")
+    fraction, _ = parse_log_timestamp("2024-05-01T10:00:00.25Z next")
+    nanos, _ = parse_log_timestamp("2024-05-01T10:00:00.123456789Z last")
+    assert text == "started"
+    assert fraction - whole == pytest.approx(0.25)
+    assert nanos - whole == pytest.approx(0.123456789)
+    assert parse_log_timestamp("no timestamp here") == (None, "no timestamp here")
+
+def test_selector_for_workload():
+    """Test resolving a workload to its label selector."""
+    deployment = SimpleNamespace(spec=SimpleNamespace(selector=SimpleNamespace(
+        match_labels={"tier": "web", "app": "shop"}, match_expressions=None
+    )))
+    apps_v1 = SimpleNamespace(read_namespaced_deployment=lambda name, namespace: deployment,
+                              read_namespaced_stateful_set=None)
+    assert selector_for_workload(apps_v1, "default", "deployment/web") == "app=shop,tier=web"
+    with pytest.raises(ValueError):
+        selector_for_workload(apps_v1, "default", "daemonset/web")
+
+def test_selector_for_workload_expressions():
+    """Test converting matchExpressions and refusing an empty selector."""
+    selector = SimpleNamespace(match_labels=None, match_expressions=[
+        SimpleNamespace(key="app", operator="In", values=["web", "api"]),
+        SimpleNamespace(key="track", operator="NotIn", values=["canary"]),
+        SimpleNamespace(key="app.kubernetes.io/name", operator="Exists", values=None),
+        SimpleNamespace(key="legacy", operator="DoesNotExist", values=None),
+    ])
+    apps_v1 = SimpleNamespace(read_namespaced_deployment=None,
+                              read_namespaced_stateful_set=lambda name, namespace: SimpleNamespace(
+                                  spec=SimpleNamespace(selector=selector)))
+    assert selector_for_workload(apps_v1, "default", "sts/db") == (
+        "app in (web,api),track notin (canary),app.kubernetes.io/name,!legacy"
+    )
+    selector.match_expressions = []
+    with pytest.raises(ValueError):
+        selector_for_workload(apps_v1, "default", "sts/db")
+
+def test_is_workload_reference():
+    """Test telling workload references from label selectors that contain a slash."""
+    assert is_workload_reference("deployment/web")
+    assert is_workload_reference("STS/db")
+    assert not is_workload_reference("app.kubernetes.io/name")
+    assert not is_workload_reference("!app.kubernetes.io/part-of")
+    assert not is_workload_reference("app.kubernetes.io/name=web")
+    assert not is_workload_reference("daemonset/agent")
+
+def test_fan_in_merges_in_timestamp_order():
+    """Test that lines from all running pods are merged by timestamp with a pod prefix."""
+    core_v1 = FakeCoreV1(
+        [make_pod("web-1"), make_pod("web-2"), make_pod("web-3", phase="Pending")],
+        {
+            ("web-1", "app"): ["2024-05-01T10:00:01Z one", "2024-05-01T10:00:03Z three"],
+            ("web-2", "app"): ["2024-05-01T10:00:02Z two", "2024-05-01T10:00:04Z four"],
+        }
+    )
+    lines = []
+    fan_in = LogFanIn(core_v1, "default", "app=web", lines.append, reorder_window=0.2)
+    thread = threading.Thread(target=fan_in.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 5
+    while len(lines) < 4 and time.time() < deadline:
+        time.sleep(0.05)
+    assert fan_in.active_streams == 2
+    fan_in.stop()
+    thread.join(5)
+
+    assert lines == ["[web-1/app] one", "[web-2/app] two", "[web-1/app] three", "[web-2/app] four"]
+    assert all(stream.closed.is_set() for stream in core_v1.streams)
+
+def test_fan_in_stream_limit():
+    """Test that the number of followed containers is capped."""
+    core_v1 = FakeCoreV1([make_pod(f"web-{i}") for i in range(3)], {})
+    lines = []
+    fan_in = LogFanIn(core_v1, "default", "app=web", lines.append, max_streams=2, reorder_window=0.05)
+    fan_in.pods._relist()
+    fan_in._reconcile()
+    assert fan_in.active_streams == 2
+    assert lines == ["Not following web-2/app: limit of 2 streams reached"]
+    fan_in.stop()
+
+class EndedStream(FakeStream):
+    """Log stream that ends after its lines, like the follow request of a container that restarted."""
+
+    def stream(self, amt=None, decode_content=False):
+        for line in self.lines:
+            yield (line + "\n").encode()
+
+def test_fan_in_resumes_after_restart():
+    """Test that a follower whose stream ended resumes after the last line read instead of losing lines."""
+    core_v1 = FakeCoreV1([make_pod("web-1")], {})
+    requests = []
+    streams = iter([
+        EndedStream(["2024-05-01T10:00:01Z one", "2024-05-01T10:00:02Z two"]),
+        FakeStream(["2024-05-01T10:00:02Z two", "2024-05-01T10:00:03Z three"]),
+    ])
+
+    def read_namespaced_pod_log(name, namespace, container, **kwargs):
+        requests.append(kwargs)
+        stream = next(streams)
+        core_v1.streams.append(stream)
+        return stream
+
+    core_v1.read_namespaced_pod_log = read_namespaced_pod_log
+    lines = []
+    fan_in = LogFanIn(core_v1, "default", "app=web", lines.append, reorder_window=0.05, tail_lines=10)
+    fan_in.pods._relist()
+    fan_in._reconcile()
+    deadline = time.time() + 5
+    while len(requests) < 2 and time.time() < deadline:
+        time.sleep(0.05)
+        fan_in._reconcile()
+    time.sleep(0.1)
+    fan_in.stop()
+    fan_in._flush(float("inf"))
+
+    assert requests[0]["tail_lines"] == 10
+    assert "tail_lines" not in requests[1] and requests[1]["since_seconds"] >= 1
+    assert lines == ["[web-1/app] one", "[web-1/app] two", "[web-1/app] three"]
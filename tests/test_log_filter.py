@@ -0,0 +1,40 @@
+import re
+import pytest
+from utils.log_filter import LogFilter
+
+LINES = [
+    "2024-05-01 INFO GET /healthz 200",
+    "2024-05-01 ERROR connection refused to db:5432",
+    "2024-05-01 WARNING slow query took 2s",
+    "level=error msg=\"timeout waiting for lock\"",
+    "2024-05-01 DEBUG cache miss for key user:1",
+]
+
+def test_empty_filter_keeps_everything():
+    """Test that an empty filter is inactive and passes all lines."""
+    log_filter = LogFilter()
+    assert not log_filter.active
+    assert all(log_filter(line) for line in LINES)
+
+def test_include_and_exclude():
+    """Test include and exclude regexes together."""
+    log_filter = LogFilter(include=r"refused|timeout|healthz", exclude="healthz")
+    assert [line for line in LINES if log_filter(line)] == [LINES[1], LINES[3]]
+    assert log_filter.dropped == 3
+
+def test_literal_prefilter():
+    """Test that a plain include string is matched as a substring."""
+    log_filter = LogFilter(include="db:5432")
+    assert [line for line in LINES if log_filter(line)] == [LINES[1]]
+
+def test_level_filter():
+    """Test level filtering across common spellings, case-insensitively."""
+    errors = LogFilter(levels=["ERROR"])
+    assert [line for line in LINES if errors(line)] == [LINES[1], LINES[3]]
+    warnings = LogFilter(levels=["WARN"], exclude="slow")
+    assert not any(warnings(line) for line in LINES)
+
+def test_invalid_regex():
+    """Test that an invalid pattern is reported when the filter is built."""
+    with pytest.raises(re.error):
+        LogFilter(include="(unclosed")
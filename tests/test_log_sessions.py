@@ -0,0 +1,142 @@
+import time
+import pytest
+from tests.test_log_fanin import FakeCoreV1, make_pod
+from utils.log_archive import LogArchive
+from utils.log_filter import LogFilter
+from utils.log_sessions import LogSessionManager, SessionLimitError
+
+def wait_for(condition, timeout=2.0):
+    """Poll a condition until it holds or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_sessions_are_isolated():
+    """Test that each session only sees its own container's logs."""
+    core_v1 = FakeCoreV1([], {("web", "app"): ["from web"], ("db", "app"): ["from db"]})
+    manager = LogSessionManager(core_v1, None)
+    first = manager.start("first")
+    first.follow_container("default", "web", "app")
+    second = manager.start("second")
+    second.follow_container("default", "db", "app")
+    assert wait_for(lambda: first.buffer.snapshot()[0] and second.buffer.snapshot()[0])
+    assert first.buffer.snapshot()[0] == "from web"
+    assert second.buffer.snapshot()[0] == "from db"
+    assert manager.active_sessions == 2
+    assert manager.active_streams == 2
+    manager.stop_all()
+
+def test_stop_closes_stream_and_joins_thread():
+    """Test that stopping a blocked watch closes its HTTP stream promptly."""
+    core_v1 = FakeCoreV1([], {})
+    manager = LogSessionManager(core_v1, None)
+    session = manager.start("user")
+    session.follow_container("default", "web", "app")
+    assert wait_for(lambda: session.active_streams == 1)
+    started = time.monotonic()
+    manager.stop("user")
+    assert time.monotonic() - started < 1
+    assert core_v1.streams[0].closed.is_set()
+    assert not session.active
+    assert manager.active_streams == 0
+    # The stopped watch keeps its logs until the session is closed
+    assert manager.get("user") is session
+    manager.close("user")
+    assert manager.get("user") is None
+
+def test_restart_replaces_previous_watch():
+    """Test that starting a new watch stops the session's previous one."""
+    manager = LogSessionManager(FakeCoreV1([], {}), None, max_sessions=1)
+    old = manager.start("user")
+    old.follow_container("default", "web", "app")
+    new = manager.start("user")
+    assert old.stop_event.is_set() and not old.active
+    assert manager.get("user") is new
+    # A stale stop from the old watch's generator leaves the new one alone
+    manager.stop("user", old)
+    assert manager.get("user") is new
+
+def test_session_limit():
+    """Test that running watches are capped and stopped ones do not count."""
+    manager = LogSessionManager(FakeCoreV1([], {}), None, max_sessions=1)
+    first = manager.start("first")
+    first.follow_container("default", "web", "app")
+    with pytest.raises(SessionLimitError):
+        manager.start("second")
+    first.stop()
+    assert manager.start("second") is manager.get("second")
+
+def test_selector_watch_counts_streams():
+    """Test that a selector watch reports one stream per followed container."""
+    core_v1 = FakeCoreV1([make_pod("web-1"), make_pod("web-2")], {})
+    manager = LogSessionManager(core_v1, None)
+    session = manager.start("user")
+    session.follow_selector("default", "app=web")
+    assert wait_for(lambda: manager.active_streams == 2)
+    manager.stop("user")
+    assert manager.active_streams == 0
+
+def test_filter_applies_before_buffer():
+    """Test that filtered lines never reach the session buffer."""
+    core_v1 = FakeCoreV1([], {("web", "app"): ["GET /healthz", "ERROR boom", "GET /api"]})
+    manager = LogSessionManager(core_v1, None)
+    session = manager.start("user")
+    session.follow_container("default", "web", "app", LogFilter(exclude="healthz", levels=["ERROR"]))
+    assert wait_for(lambda: session.log_filter.dropped == 2)
+    assert session.buffer.snapshot()[0] == "ERROR boom"
+    manager.stop_all()
+
+def test_lines_are_archived(tmp_path):
+    """Test that followed lines are archived with their timestamps."""
+    core_v1 = FakeCoreV1([], {("web", "app"): ["2024-05-01T10:00:00Z started", "2024-05-01T10:00:01Z ready"]})
+    manager = LogSessionManager(core_v1, None, archive=LogArchive(str(tmp_path)))
+    session = manager.start("user", cluster="prod")
+    session.follow_container("default", "web", "app")
+    assert wait_for(lambda: len(session.buffer) == 2)
+    manager.stop("user")
+    assert session.buffer.snapshot()[0] == "started\nready"
+    results = LogArchive(str(tmp_path)).search("prod", "default", text="ready")
+    assert [(pod, line) for _, pod, _, line in results] == [("web", "ready")]
+    assert LogArchive(str(tmp_path)).search("staging", "default") == []
+
+def test_templates_survive_stop():
+    """Test that a stopped watch can still be summarized for the chat."""
+    core_v1 = FakeCoreV1([], {("web", "app"): [f"GET /api/items/{i} 200" for i in range(20)]})
+    manager = LogSessionManager(core_v1, None)
+    session = manager.start("user")
+    session.follow_container("default", "web", "app")
+    assert wait_for(lambda: session.templates.lines == 20)
+    manager.stop("user")
+    summary = manager.get("user").templates.summarize()
+    assert "20x" in summary and "GET /api/items/<*> <*>" in summary
+
+def test_watch_metrics():
+    """Test that line counts and queue depths are reported per watch."""
+    from utils.metrics import LOG_LINES, LOG_QUEUE_DEPTH, LOG_WATCHES
+    core_v1 = FakeCoreV1([], {("web", "app"): ["one", "two", "three"]})
+    manager = LogSessionManager(core_v1, None)
+    manager.register_metrics()
+    session = manager.start("abcdef123456")
+    session.follow_container("default", "web", "app")
+    assert wait_for(lambda: len(session.buffer) == 3)
+    samples = {(name, tuple(labels.values())): value for name, labels, value in LOG_LINES.samples()}
+    assert samples[("k8s_buddy_log_lines_total", ("abcdef12",))] == 3
+    depths = {tuple(labels.values()): value for _, labels, value in LOG_QUEUE_DEPTH.samples()}
+    assert depths[("abcdef12", "buffer")] == 3
+    assert depths[("abcdef12", "stats")] == 3
+    session.stats.update()
+    assert {tuple(l.values()): v for _, l, v in LOG_QUEUE_DEPTH.samples()}[("abcdef12", "stats")] == 0
+    manager.stop_all()
+    assert LOG_WATCHES.samples()[0][2] == 0
+
+def test_watch_another_cluster():
+    """Test that a watch can use the clients of another cluster."""
+    default = FakeCoreV1([], {("web", "app"): ["default cluster"]})
+    other = FakeCoreV1([], {("web", "app"): ["other cluster"]})
+    manager = LogSessionManager(default, None)
+    session = manager.start("user", core_v1=other)
+    session.follow_container("default", "web", "app")
+    assert wait_for(lambda: len(session.buffer) == 1)
+    assert session.buffer.snapshot()[0] == "other cluster"
+    manager.stop_all()
@@ -0,0 +1,68 @@
+import json
+from utils.log_stats import LogStats, parse_structured
+
+def test_parse_json_and_logfmt():
+    """Test detecting JSON and logfmt lines."""
+    assert parse_structured('{"level": "error", "msg": "boom"}') == {"level": "error", "msg": "boom"}
+    assert parse_structured('level=info msg="hello \\"you\\"" status=200') == {
+        "level": "info", "msg": 'hello "you"', "status": "200"
+    }
+    assert parse_structured('[web-1/app] {"msg": "from fan-in"}') == {"msg": "from fan-in"}
+    assert parse_structured("plain text line") is None
+    assert parse_structured("a=1 b=2") is None
+    assert parse_structured("{not json") is None
+
+def test_level_histogram_and_fields():
+    """Test level counts and top field values."""
+    stats = LogStats(fields=["status"])
+    for status, level in [("200", "info"), ("200", "INFO"), ("500", "error"), ("404", "warning")]:
+        stats.append(json.dumps({"level": level, "status": status, "msg": "request"}))
+    stats.append("unstructured")
+    summary = stats.summary()
+    assert summary["parsed"] == 4
+    assert summary["unparsed"] == 1
+    assert summary["levels"] == {"ERROR": 1, "WARN": 1, "INFO": 2, "DEBUG": 0, "OTHER": 0}
+    assert summary["top_fields"]["status"][0] == ("200", 2)
+
+def test_ring_eviction_updates_aggregates():
+    """Test that evicted lines are removed from the aggregates."""
+    stats = LogStats(capacity=3, fields=["status"])
+    for i in range(5):
+        stats.append(f"level=error msg=fail status={i}")
+    stats.update()
+    stats.append("level=info msg=ok status=9")
+    summary = stats.summary()
+    assert summary["parsed"] == 6
+    assert summary["levels"]["ERROR"] == 2
+    assert summary["levels"]["INFO"] == 1
+    assert sorted(value for value, _ in summary["top_fields"]["status"]) == ["3", "4", "9"]
+
+def test_error_rate_window():
+    """Test per-second error counts within the rate window."""
+    stats = LogStats()
+    now = 1_700_000_000
+    lines = [
+        {"ts": now - 120, "level": "error"},
+        {"ts": now - 1, "level": "error"},
+        {"ts": now - 1, "level": "error"},
+        {"ts": (now + 0.5) * 1000, "level": "error"},
+        {"ts": "2023-11-14T22:13:20Z", "level": "info"},
+    ]
+    for line in lines:
+        stats.append(json.dumps({"msg": "x", **line}))
+    summary = stats.summary(now=now)
+    assert summary["errors_per_second"][-2:] == [2, 1]
+    assert sum(summary["errors_per_second"]) == 3
+    assert summary["error_rate"] == 3 / 60
+
+def test_pending_lines_are_bounded():
+    """Test that lines queued without updates are capped and the dropped ones counted."""
+    stats = LogStats(fields=["status"], max_pending=3)
+    for i in range(5):
+        stats.append(f"level=info msg=ok status={i}")
+    assert stats.pending == 3
+    assert stats.received == 5
+    summary = stats.summary()
+    assert summary["dropped"] == 2
+    assert summary["parsed"] == 3
+    assert sorted(value for value, _ in summary["top_fields"]["status"]) == ["2", "3", "4"]
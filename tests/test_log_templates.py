@@ -0,0 +1,51 @@
+from utils.log_templates import TemplateMiner, mask_line
+
+def test_mask_line():
+    """Test masking of numbers, addresses and IDs."""
+    assert mask_line("GET /api/users/42 took 35ms from 10.0.0.7:5000") == [
+        "GET", "/api/users/<*>", "took", "<*>", "from", "<*>"
+    ]
+    assert mask_line("request 123e4567-e89b-12d3-a456-426614174000 done") == ["request", "<*>", "done"]
+
+def test_clusters_similar_lines():
+    """Test that near-identical lines share one template with counts and time range."""
+    miner = TemplateMiner()
+    for i, user in enumerate(["alice", "bob", "carol"]):
+        miner.add(f"user {user} logged in from web", timestamp=100.0 + i)
+    miner.add("connection refused to database", timestamp=110.0)
+    templates = miner.templates()
+    assert len(templates) == 2
+    assert templates[0].template == "user <*> logged in from web"
+    assert templates[0].count == 3
+    assert (templates[0].first_seen, templates[0].last_seen) == (100.0, 102.0)
+    assert templates[0].samples == [f"user {user} logged in from web" for user in ["alice", "bob", "carol"]]
+    assert templates[1].count == 1
+
+def test_different_lengths_do_not_merge():
+    """Test that lines with different token counts stay apart."""
+    miner = TemplateMiner()
+    miner.add("cache miss")
+    miner.add("cache miss for key")
+    assert len(miner.templates()) == 2
+
+def test_max_clusters_evicts_oldest():
+    """Test that the least recently seen template is dropped."""
+    miner = TemplateMiner(max_clusters=2)
+    miner.add("alpha beta gamma", timestamp=1.0)
+    miner.add("delta epsilon", timestamp=2.0)
+    miner.add("zeta", timestamp=3.0)
+    assert [t.template for t in miner.templates()] == ["delta epsilon", "zeta"]
+
+def test_summarize_respects_budget():
+    """Test that the summary is compact and stays within the token budget."""
+    miner = TemplateMiner()
+    for i in range(1000):
+        miner.add(f"GET /health returned 200 in {i}ms", timestamp=float(i))
+    for i in range(50):
+        miner.add(f"distinct message number{i} " + "word " * i)
+    summary = miner.summarize(token_budget=200)
+    assert summary.splitlines()[0].startswith("Log summary: 1050 lines")
+    assert "1000x" in summary
+    assert "GET /health returned <*> in <*>" in summary
+    assert "templates omitted" in summary
+    assert len(summary) <= 200 * 4
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from utils.metrics import (
+    ERRORS, Counter, Gauge, Histogram, MetricsRegistry, RequestTrace, timed
+)
+
+def test_render_exposition_format():
+    """Test HELP/TYPE lines, labels and cumulative histogram buckets."""
+    registry = MetricsRegistry()
+    requests = Counter("requests_total", "Requests", ["path"], registry=registry)
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry)
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{path="/a\\"b"} 3.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+
+def test_labels_are_validated():
+    """Test that label names must match and counters only increase."""
+    registry = MetricsRegistry()
+    counter = Counter("c_total", "C", ["kind"], registry=registry)
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="x")
+    with pytest.raises(ValueError):
+        Counter("c_total", "Duplicate", registry=registry)
+
+def test_gauge_function_is_read_at_scrape_time():
+    """Test that computed samples come from the function when rendering."""
+    registry = MetricsRegistry()
+    depth = Gauge("depth", "Depth", ["queue"], registry=registry)
+    queue = [1, 2]
+    depth.set_function(lambda: {("a",): len(queue)})
+    queue.append(3)
+    assert 'depth{queue="a"} 3' in registry.render()
+
+def test_timed_records_latency_and_errors():
+    """Test the context manager and the sync and async decorators."""
+    histogram = Histogram("test_timed_seconds", "Timed", ["op"], registry=MetricsRegistry())
+
+    @timed(histogram, op="sync")
+    def work():
+        return 1
+
+    @timed(histogram, op="async")
+    async def async_work():
+        await asyncio.sleep(0.01)
+        return 2
+
+    assert work() == 1
+    assert asyncio.run(async_work()) == 2
+    assert histogram.count(op="sync") == 1
+    assert histogram.sum(op="async") >= 0.01
+    errors = ERRORS.value(source="test_timed_seconds", error="KeyError")
+    with pytest.raises(KeyError):
+        with timed(histogram, op="sync"):
+            raise KeyError("missing")
+    assert histogram.count(op="sync") == 2
+    assert ERRORS.value(source="test_timed_seconds", error="KeyError") == errors + 1
+
+def test_request_trace():
+    """Test that spans are recorded in order and a disabled trace records nothing."""
+    trace = RequestTrace("chat")
+    with trace.span("context"):
+        pass
+    with pytest.raises(RuntimeError):
+        with trace.span("llm"):
+            raise RuntimeError("boom")
+    trace.mark("done")
+    assert [span["name"] for span in trace.spans] == ["context", "llm", "done"]
+    assert "llm" in trace.render() and "(RuntimeError)" in trace.render()
+    disabled = RequestTrace("chat", enabled=False)
+    with disabled.span("context"):
+        pass
+    disabled.mark("done")
+    assert disabled.spans == []
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+import pytest
+from utils.response_cache import ResponseCache
+
+MESSAGES = [{"role": "user", "content": "Why is  web-1\nCrashLooping?"}]
+
+@pytest.fixture
+def cache():
+    """Create a small in-memory response cache."""
+    return ResponseCache(max_entries=2, ttl=60)
+
+def test_make_key():
+    """Test that keys ignore whitespace but not provider, model or context."""
+    key = ResponseCache.make_key("OpenAI", "gpt-4", MESSAGES, "ctx")
+    same = ResponseCache.make_key("OpenAI", "gpt-4", [{"role": "user", "content": "Why is web-1 CrashLooping?"}], "ctx")
+    assert key == same
+    assert key != ResponseCache.make_key("Anthropic", "gpt-4", MESSAGES, "ctx")
+    assert key != ResponseCache.make_key("OpenAI", "gpt-4", MESSAGES, "other ctx")
+
+def test_hit_and_miss(cache):
+    """Test hit and miss counters."""
+    assert cache.get("a") is None
+    cache.set("a", "answer")
+    assert cache.get("a") == "answer"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["bytes"] == len("answer")
+
+def test_lru_eviction(cache):
+    """Test that the least recently used entry is evicted."""
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+def test_size_limit():
+    """Test that the byte limit evicts old entries."""
+    cache = ResponseCache(max_bytes=10)
+    cache.set("a", "12345")
+    cache.set("b", "1234567")
+    assert cache.get("a") is None
+    assert cache.get("b") == "1234567"
+
+def test_ttl_expiry(cache, monkeypatch):
+    """Test that entries expire after the TTL."""
+    cache.set("a", "answer")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+def test_disk_persistence(tmp_path):
+    """Test that entries survive a new cache instance."""
+    cache_file = str(tmp_path / "responses.db")
+    ResponseCache(cache_file=cache_file).set("a", "answer")
+
+    new_cache = ResponseCache(cache_file=cache_file)
+    assert new_cache.get("a") == "answer"
+    new_cache.clear()
+    assert ResponseCache(cache_file=cache_file).get("a") is None
+
+def test_async_access_runs_disk_io_off_the_loop(tmp_path, monkeypatch):
+    """Test that the async accessors read and write the disk store on a worker thread."""
+    cache = ResponseCache(cache_file=str(tmp_path / "responses.db"))
+    threads = []
+    original_set = cache.set
+    monkeypatch.setattr(cache, "set", lambda key, value: threads.append(threading.current_thread()) or original_set(key, value))
+
+    async def run():
+        await cache.aset("a", "answer")
+        cache._entries.clear()
+        return await cache.aget("a")
+
+    assert asyncio.run(run()) == "answer"
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,34 @@
+import time
+import pytest
+from utils.startup import StartupReport, start_warmup
+
+def test_phases_are_timed():
+    """Test that phases are recorded with their duration and errors."""
+    report = StartupReport()
+    with report.phase("fast"):
+        pass
+    with pytest.raises(ValueError):
+        with report.phase("broken"):
+            raise ValueError("boom")
+    assert [phase["name"] for phase in report.phases] == ["fast", "broken"]
+    assert report.phases[1]["error"] == "boom"
+
+def test_warmup_runs_in_background():
+    """Test that warmup does not block and continues after a failing task."""
+    report = StartupReport()
+    done = []
+    def slow():
+        time.sleep(0.2)
+        done.append("slow")
+    def failing():
+        raise RuntimeError("no cluster")
+    started = time.perf_counter()
+    thread = start_warmup([("failing", failing), ("slow", slow)], report, on_ready=lambda r: done.append("ready"))
+    report.mark_serving()
+    assert time.perf_counter() - started < 0.1
+    thread.join(2)
+    assert report.ready.is_set()
+    assert done == ["slow", "ready"]
+    summary = report.summary()
+    assert "failing" in summary and "failed: no cluster" in summary
+    assert report.serving_after < report.ready_after
@@ -0,0 +1,221 @@
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.k8s_snapshot import ClusterSnapshot
+
+DEFAULT_TOKEN_BUDGET = 800
+# Rough average for English text and Kubernetes identifiers
+CHARS_PER_TOKEN = 4
+OMITTED_NOTE_TOKENS = 16
+# Event messages are cut to keep one warning from using up the budget
+EVENT_MESSAGE_CHARS = 120
+
+_TERM_PATTERN = re.compile(r"[a-z0-9][a-z0-9.\-]*")
+
+# Section titles in the order they are rendered
+SECTIONS = (
+    "Mentioned pods",
+    "NotReady nodes",
+    "Unhealthy pods",
+    "Recent warnings",
+    "Top restarting workloads",
+    "Namespaces",
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text.
+
+    Args:
+        text (str): The text to measure
+
+    Returns:
+        int: Approximate token count
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def extract_terms(*texts: str) -> Set[str]:
+    """Extract lowercase identifier-like terms from free text.
+
+    Args:
+        *texts (str): Texts to scan (e.g. the user's message and additional context)
+
+    Returns:
+        Set[str]: Terms that may name namespaces, pods, workloads or nodes
+    """
+    terms = set()
+    for text in texts:
+        if text:
+            terms.update(_TERM_PATTERN.findall(text.lower()))
+    return terms
+
+
+def _format_age(seconds: float) -> str:
+    """Format a duration as a short age like ``45s``, ``12m`` or ``3h``."""
+    seconds = max(0, int(seconds))
+    if seconds < 120:
+        return f"{seconds}s"
+    if seconds < 7200:
+        return f"{seconds // 60}m"
+    return f"{seconds // 3600}h"
+
+
+def format_event_line(group, now: Optional[float] = None) -> str:
+    """Format an aggregated event as one line with its count, age and shortened message.
+
+    Args:
+        group: The ``utils.k8s_events.EventGroup``
+        now (Optional[float]): Current epoch time, defaults to the wall clock
+
+    Returns:
+        str: ``namespace/kind/name: reason xcount, last age ago: message``
+    """
+    now = time.time() if now is None else now
+    message = group.message if len(group.message) <= EVENT_MESSAGE_CHARS \
+        else group.message[:EVENT_MESSAGE_CHARS] + "..."
+    return (f"{group.namespace or '-'}/{group.kind}/{group.name}: {group.reason} x{group.count}, "
+            f"last {_format_age(now - group.last_seen)} ago: {message}")
+
+
+def _collect_items(snapshot: ClusterSnapshot, terms: Set[str],
+                   now: Optional[float] = None) -> List[Tuple[int, int, str, str]]:
+    """Collect candidate context lines with their relevance and priority.
+
+    Returns:
+        List[Tuple[int, int, str, str]]: (relevance, priority, section, line) tuples
+    """
+    items = []
+    now = time.time() if now is None else now
+    for node in snapshot.not_ready_nodes():
+        items.append((int(node.name in terms), 3, "NotReady nodes", node.name))
+
+    for pod in snapshot.pods:
+        names = {pod.name, pod.namespace, pod.owner, pod.node}
+        relevance = len(names & terms)
+        if pod.healthy:
+            if pod.name in terms or (pod.owner and pod.owner in terms):
+                line = f"{pod.namespace}/{pod.name} ({pod.phase}, {pod.restarts} restarts, node {pod.node or '-'})"
+                items.append((relevance, 2, "Mentioned pods", line))
+            continue
+        status = pod.reason or pod.phase or "Unknown"
+        line = f"{pod.namespace}/{pod.name} ({status}, {pod.restarts} restarts, node {pod.node or '-'})"
+        items.append((relevance, 2, "Unhealthy pods", line))
+
+    # Events are most recent first, so equally relevant warnings keep that order
+    owners = {(pod.namespace, pod.name): pod.owner for pod in snapshot.pods} if snapshot.events else {}
+    for group in snapshot.events:
+        names = {group.namespace, group.name, group.reason.lower(), owners.get((group.namespace, group.name))}
+        items.append((len(names & terms), 2, "Recent warnings", format_event_line(group, now)))
+
+    for namespace, workload, restarts, pods in snapshot.restarts_by_workload():
+        relevance = len({namespace, workload} & terms)
+        line = f"{namespace}/{workload}: {restarts} restarts across {pods} pods"
+        items.append((relevance, 1, "Top restarting workloads", line))
+
+    for name in snapshot.namespace_names():
+        items.append((int(name in terms), 0, "Namespaces", name))
+    return items
+
+
+def build_cluster_context(snapshot: ClusterSnapshot, message: str = "", additional_context: str = "",
+                          token_budget: int = DEFAULT_TOKEN_BUDGET, now: Optional[float] = None) -> str:
+    """Build an aggregated cluster description that fits a token budget.
+
+    The summary line (counts per phase, NotReady nodes) is always included.
+    The remaining lines are added by relevance to the user's message and
+    additional context first, then by severity, until the budget is spent.
+
+    Args:
+        snapshot (ClusterSnapshot): The cluster state to describe
+        message (str): The user's message
+        additional_context (str): Text from the "Additional Context" box
+        token_budget (int): Maximum number of tokens for the returned text
+        now (Optional[float]): Current epoch time for the age of warnings, defaults to the wall clock
+
+    Returns:
+        str: The cluster context for the system prompt
+    """
+    phases = ", ".join(f"{phase or 'Unknown'} {count}"
+                       for phase, count in sorted(snapshot.phase_counts().items()))
+    not_ready = len(snapshot.not_ready_nodes())
+    summary = (f"Kubernetes cluster summary: {len(snapshot.namespaces)} namespaces, "
+               f"{len(snapshot.nodes)} nodes ({not_ready} NotReady), "
+               f"{len(snapshot.pods)} pods ({phases or 'none'})")
+    if snapshot.events:
+        summary += f", {len(snapshot.events)} recent warning events"
+
+    terms = extract_terms(message, additional_context)
+    items = sorted(_collect_items(snapshot, terms, now), key=lambda item: (-item[0], -item[1]))
+
+    # Keep room for the trailing "omitted" note
+    remaining = token_budget - estimate_tokens(summary) - OMITTED_NOTE_TOKENS
+    selected = {section: [] for section in SECTIONS}
+    omitted = 0
+    for _, _, section, line in items:
+        # Each line costs its text plus a bullet, and a new section its header
+        cost = estimate_tokens(line) + 1
+        if not selected[section]:
+            cost += estimate_tokens(section) + 1
+        if cost > remaining:
+            omitted += 1
+            continue
+        selected[section].append(line)
+        remaining -= cost
+
+    lines = [summary]
+    for section in SECTIONS:
+        if not selected[section]:
+            continue
+        lines.append(f"{section}:")
+        if section == "Namespaces":
+            lines.append("- " + ", ".join(sorted(selected[section])))
+        else:
+            lines.extend(f"- {line}" for line in selected[section])
+    if omitted:
+        lines.append(f"({omitted} more items omitted to fit the token budget)")
+    return "\n".join(lines)
+
+
+def build_multi_cluster_context(snapshots: Dict[str, ClusterSnapshot], errors: Optional[Dict[str, str]] = None,
+                                message: str = "", additional_context: str = "",
+                                token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Build the context of several clusters within one token budget.
+
+    Every cluster gets an equal share of the budget for its own context,
+    so a large cluster does not crowd out the others. Clusters named in the
+    message come first. Clusters that could not be read are listed with
+    their error, so the model knows their state is missing.
+
+    Args:
+        snapshots (Dict[str, ClusterSnapshot]): Cluster state by kubeconfig context
+        errors (Optional[Dict[str, str]]): Error by context for clusters without a snapshot
+        message (str): The user's message
+        additional_context (str): Text from the "Additional Context" box
+        token_budget (int): Maximum number of tokens for the returned text
+
+    Returns:
+        str: The cluster context for the system prompt
+    """
+    lines = []
+    if errors:
+        lines.append("Unavailable clusters: " + "; ".join(
+            f"{context} ({error})" for context, error in sorted(errors.items())
+        ))
+    if not snapshots:
+        return "\n".join(lines) or "No clusters selected"
+    terms = extract_terms(message, additional_context)
+    contexts = sorted(snapshots, key=lambda context: (context.lower() not in terms, context))
+    remaining = token_budget - sum(estimate_tokens(line) for line in lines)
+    share = max(remaining // len(contexts), OMITTED_NOTE_TOKENS * 2)
+    for context in contexts:
+        header = f"=== Cluster {context} ==="
+        lines.append(header)
+        lines.append(build_cluster_context(
+            snapshots[context],
+            message=message,
+            additional_context=additional_context,
+            token_budget=share - estimate_tokens(header)
+        ))
+    return "\n".join(lines)
@@ -1,9 +1,31 @@
+import io
+import logging
 import os
-from typing import Optional
-from dotenv import load_dotenv, set_key, unset_key
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Union
+from dotenv import dotenv_values, load_dotenv
+from utils.metrics import CONFIG_IO_SECONDS, record_error, timed
+
+try:
+    import fcntl
+except ImportError:  # Windows, fall back to the in-process lock only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_KEY_LINE_RE = re.compile(r"^\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_.]*)\s*=")
 
 class EnvFileHandler:
-    """Handler for managing environment variables in .env file."""
+    """Handler for managing environment variables in .env file.
+    
+    The file's lines are kept in memory and re-read only when the file
+    changes on disk. Updates of one or more keys are applied to that view
+    and committed in a single atomic write (temporary file, fsync, rename)
+    while holding a lock file, so concurrent saves never interleave.
+    """
     
     def __init__(self, env_file: str = ".env"):
         """Initialize the environment file handler.
@@ -12,6 +34,10 @@ class EnvFileHandler:
             env_file (str): Path to the .env file
         """
         self.env_file = env_file
+        self._lines: List[str] = []
+        self._values: Dict[str, Optional[str]] = {}
+        self._signature = None
+        self._lock = threading.Lock()
         self._ensure_env_file()
         load_dotenv(self.env_file)
     
@@ -33,6 +59,36 @@ class EnvFileHandler:
         """
         return os.getenv(key, default)
     
+    def get_number(self, key: str, default: Union[int, float]) -> Union[int, float]:
+        """Get a numeric environment variable, falling back to the default if it is malformed.
+        
+        Args:
+            key (str): The environment variable key
+            default (Union[int, float]): Default value, its type is the type of the result
+            
+        Returns:
+            Union[int, float]: The parsed value or the default
+        """
+        value = os.getenv(key)
+        if value is None or not value.strip():
+            return default
+        try:
+            return type(default)(value.strip())
+        except ValueError as e:
+            record_error("config", e)
+            logger.warning("Ignoring invalid %s=%r, using %s", key, value, default)
+            return default
+    
+    def get_file_values(self) -> Dict[str, Optional[str]]:
+        """Get the values stored in the .env file.
+        
+        Returns:
+            Dict[str, Optional[str]]: The file's keys and values
+        """
+        with self._lock:
+            self._load()
+            return dict(self._values)
+    
     def set_env(self, key: str, value: str) -> bool:
         """Set an environment variable value.
         
@@ -43,12 +99,7 @@ class EnvFileHandler:
         Returns:
             bool: True if successful, False otherwise
         """
-        try:
-            set_key(self.env_file, key, value)
-            os.environ[key] = value
-            return True
-        except Exception:
-            return False
+        return self.update_env({key: value})
     
     def delete_env(self, key: str) -> bool:
         """Delete an environment variable.
@@ -56,13 +107,120 @@ class EnvFileHandler:
         Args:
             key (str): The environment variable key to delete
             
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self.update_env({key: None})
+    
+    def update_env(self, values: Dict[str, Optional[str]]) -> bool:
+        """Set and delete several environment variables in one write.
+        
+        Args:
+            values (Dict[str, Optional[str]]): Keys to set, a value of None deletes the key
+            
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            unset_key(self.env_file, key)
-            if key in os.environ:
-                del os.environ[key]
+            with self._lock, self._file_lock():
+                self._load()
+                lines, file_values = list(self._lines), dict(self._values)
+                for key, value in values.items():
+                    lines = self._apply(lines, key, value)
+                    if value is None:
+                        file_values.pop(key, None)
+                    else:
+                        file_values[key] = value
+                self._write(lines, file_values)
+            for key, value in values.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
             return True
+        except Exception as e:
+            record_error("env_file", e)
+            return False
+    
+    @contextmanager
+    def _file_lock(self):
+        """Hold an exclusive lock file so other processes do not write concurrently."""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.env_file}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _load(self) -> None:
+        """Re-read the file if it changed since it was last read. Must hold the lock."""
+        try:
+            stat = os.stat(self.env_file)
+        except FileNotFoundError:
+            self._lines, self._values, self._signature = [], {}, None
+            return
+        signature = _signature(stat)
+        if signature == self._signature:
+            return
+        with timed(CONFIG_IO_SECONDS, file="env", operation="read"):
+            with open(self.env_file, 'r') as f:
+                content = f.read()
+            self._lines = content.splitlines(keepends=True)
+            self._values = dotenv_values(stream=io.StringIO(content))
+        self._signature = signature
+    
+    @staticmethod
+    def _apply(lines: List[str], key: str, value: Optional[str]) -> List[str]:
+        """Replace, append or remove the line of a key."""
+        updated, found = [], False
+        for line in lines:
+            match = _KEY_LINE_RE.match(line)
+            if match and match.group(1) == key:
+                if value is not None and not found:
+                    updated.append(_format_line(key, value))
+                found = True
+                continue
+            updated.append(line)
+        if value is not None and not found:
+            if updated and not updated[-1].endswith("\n"):
+                updated[-1] += "\n"
+            updated.append(_format_line(key, value))
+        return updated
+    
+    def _write(self, lines: List[str], values: Dict[str, Optional[str]]) -> None:
+        """Atomically replace the file with new lines and keep them as the in-memory view. Must hold the lock.
+        
+        Args:
+            lines (List[str]): The file's new lines
+            values (Dict[str, Optional[str]]): The keys and values of those lines
+        """
+        directory = os.path.dirname(os.path.abspath(self.env_file))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".env.", suffix=".tmp")
+        try:
+            with timed(CONFIG_IO_SECONDS, file="env", operation="write"):
+                with os.fdopen(fd, 'w') as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if os.path.exists(self.env_file):
+                    os.chmod(temp_path, os.stat(self.env_file).st_mode & 0o777)
+                os.replace(temp_path, self.env_file)
+                stat = os.stat(self.env_file)
         except Exception:
-            return False 
\ No newline at end of file
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        # Other writers wait for the file lock, so the file still holds what was just written
+        self._lines, self._values, self._signature = lines, values, _signature(stat)
+
+def _signature(stat: os.stat_result) -> tuple:
+    """Modification time, size and inode of a file, which change when it is rewritten."""
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def _format_line(key: str, value: str) -> str:
+    """Format a key as a single-quoted dotenv assignment."""
+    escaped = value.replace("\\", "\\\\").replace("'", "\\'")
+    return f"{key}='{escaped}'\n"
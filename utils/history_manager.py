@@ -0,0 +1,199 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from utils.context_builder import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional, fall back to the character estimate
+    tiktoken = None
+
+DEFAULT_HISTORY_TOKENS = 2000
+DEFAULT_SUMMARY_TOKENS = 400
+# Fixed per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_LINE_CHARS = 200
+
+Message = Dict[str, str]
+Summarizer = Callable[[str, List[Message], int], str]
+
+
+@lru_cache(maxsize=32)
+def _get_encoding(model: str):
+    """Get the tiktoken encoding for a model, or None if unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        if model.startswith("gpt-"):
+            return tiktoken.get_encoding("cl100k_base")
+        return None
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """Count the tokens of a text for a model.
+
+    Uses the model's tiktoken encoding when available and the character
+    based estimate otherwise (e.g. for Anthropic or Google models).
+
+    Args:
+        text (str): The text to measure
+        model (str): The model name
+
+    Returns:
+        int: Number of tokens
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def normalize_history(history: List) -> List[Message]:
+    """Convert Gradio chat history into role/content messages.
+
+    Accepts both the ``type="messages"`` format (dicts) and the legacy
+    ``[user, assistant]`` pair format.
+
+    Args:
+        history (List): Chat history as passed by ``gr.ChatInterface``
+
+    Returns:
+        List[Message]: Messages with only ``role`` and ``content`` keys
+    """
+    messages = []
+    for entry in history or []:
+        if isinstance(entry, dict):
+            content = entry.get("content")
+            if isinstance(content, str) and entry.get("role") in ("user", "assistant"):
+                messages.append({"role": entry["role"], "content": content})
+        else:
+            user_msg, assistant_msg = entry
+            if user_msg:
+                messages.append({"role": "user", "content": user_msg})
+            if assistant_msg:
+                messages.append({"role": "assistant", "content": assistant_msg})
+    return messages
+
+
+def extractive_summary(previous: str, messages: List[Message], max_tokens: int) -> str:
+    """Fold messages into a summary without calling a model.
+
+    Keeps the first line of every message, trimmed, and drops the oldest
+    lines once the summary exceeds its token budget.
+
+    Args:
+        previous (str): The summary of the messages folded earlier
+        messages (List[Message]): Messages to add to the summary
+        max_tokens (int): Token budget of the summary
+
+    Returns:
+        str: The updated summary
+    """
+    lines = previous.splitlines() if previous else []
+    for message in messages:
+        first_line = message["content"].strip().split("\n", 1)[0][:SUMMARY_LINE_CHARS]
+        lines.append(f"- {message['role']}: {first_line}")
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class HistoryManager:
+    """Keeps the conversation sent to the model within a token budget.
+
+    The most recent messages are kept verbatim as long as they fit the
+    budget; older ones are folded into a rolling summary. Summaries are
+    cached by a hash of the folded prefix, so each turn only folds the
+    messages that newly fell out of the window.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_HISTORY_TOKENS, summary_tokens: int = DEFAULT_SUMMARY_TOKENS,
+                 summarizer: Optional[Summarizer] = None, max_cached_summaries: int = 128):
+        """Initialize the history manager.
+
+        Args:
+            max_tokens (int): Token budget for the summary plus the recent messages
+            summary_tokens (int): Token budget for the rolling summary
+            summarizer (Optional[Summarizer]): Function folding messages into a summary
+            max_cached_summaries (int): Number of summaries kept for reuse
+        """
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or extractive_summary
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build(self, history: List, model: str = "") -> List[Message]:
+        """Build the messages to send for a chat history.
+
+        Args:
+            history (List): Chat history as passed by ``gr.ChatInterface``
+            model (str): The model name, used for token counting
+
+        Returns:
+            List[Message]: An optional summary system message followed by the recent messages
+        """
+        messages = normalize_history(history)
+        if self._window_start(messages, model, self.max_tokens) == 0:
+            return messages
+
+        # Something has to be folded, so make room for the summary
+        start = self._window_start(messages, model, self.max_tokens - self.summary_tokens)
+        # Start the window on a user turn
+        while start < len(messages) and messages[start]["role"] != "user":
+            start += 1
+
+        summary = self._summarize(messages[:start])
+        return [
+            {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"},
+            *messages[start:]
+        ]
+
+    @staticmethod
+    def _window_start(messages: List[Message], model: str, budget: int) -> int:
+        """Find the index of the oldest message of the newest suffix that fits the budget."""
+        start = len(messages)
+        while start > 0:
+            cost = count_tokens(messages[start - 1]["content"], model) + MESSAGE_OVERHEAD_TOKENS
+            if cost > budget:
+                break
+            budget -= cost
+            start -= 1
+        return start
+
+    def _summarize(self, messages: List[Message]) -> str:
+        """Get the summary of a message prefix, extending the longest cached one."""
+        hashes = self._prefix_hashes(messages)
+        with self._lock:
+            cached_at, previous = 0, ""
+            for position in range(len(messages), 0, -1):
+                summary = self._summaries.get(hashes[position - 1])
+                if summary is not None:
+                    cached_at, previous = position, summary
+                    self._summaries.move_to_end(hashes[position - 1])
+                    break
+        if cached_at == len(messages):
+            return previous
+
+        summary = self.summarizer(previous, messages[cached_at:], self.summary_tokens)
+        with self._lock:
+            self._summaries[hashes[-1]] = summary
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        return summary
+
+    @staticmethod
+    def _prefix_hashes(messages: List[Message]) -> List[str]:
+        """Hash every prefix of a message list incrementally."""
+        hashes = []
+        digest = hashlib.sha256()
+        for message in messages:
+            digest.update(f"{message['role']}\0{message['content']}\0".encode("utf-8"))
+            hashes.append(digest.copy().hexdigest())
+        return hashes
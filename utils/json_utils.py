@@ -1,16 +1,90 @@
 import json
-from typing import Dict, List
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from utils.metrics import CONFIG_IO_SECONDS, record_error, timed
+
+DEFAULT_RELOAD_INTERVAL = 1.0
+_ENV_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class ProviderConfigError(ValueError):
+    """Raised when the AI provider configuration does not match the schema."""
+
+
+def validate_providers(data) -> Dict[str, Dict]:
+    """Validate a provider configuration and normalize it.
+    
+    Entries may be a plain list of models (legacy format) or a dict with
+    ``models`` and optional ``api_key_env``, ``client``, ``base_url`` and
+    ``max_tokens`` keys.
+    
+    Args:
+        data: The parsed contents of ai_providers.json
+        
+    Returns:
+        Dict[str, Dict]: Provider entries with defaults filled in
+        
+    Raises:
+        ProviderConfigError: If the configuration is invalid
+    """
+    if not isinstance(data, dict):
+        raise ProviderConfigError("The provider configuration must be an object of provider entries")
+    providers = {}
+    for name, entry in data.items():
+        if not name.strip():
+            raise ProviderConfigError("Provider names must not be empty")
+        if isinstance(entry, list):
+            entry = {"models": entry}
+        if not isinstance(entry, dict):
+            raise ProviderConfigError(f"{name}: entry must be a list of models or an object")
+        models = entry.get("models")
+        if not isinstance(models, list) or not models or not all(isinstance(m, str) and m for m in models):
+            raise ProviderConfigError(f"{name}: 'models' must be a non-empty list of model names")
+        for key in ("api_key_env", "client", "base_url"):
+            if key in entry and not (isinstance(entry[key], str) and entry[key]):
+                raise ProviderConfigError(f"{name}: '{key}' must be a non-empty string")
+        if "api_key_env" in entry and not _ENV_NAME_RE.match(entry["api_key_env"]):
+            raise ProviderConfigError(f"{name}: 'api_key_env' is not a valid environment variable name")
+        if "max_tokens" in entry and (not isinstance(entry["max_tokens"], int) or entry["max_tokens"] <= 0):
+            raise ProviderConfigError(f"{name}: 'max_tokens' must be a positive integer")
+        providers[name] = {
+            **entry,
+            "api_key_env": entry.get("api_key_env", f"{name.upper()}_API_KEY"),
+            "client": entry.get("client", name.lower())
+        }
+    return providers
+
 
 class AIProviderConfig:
-    """Handler for managing AI provider configurations."""
+    """Handler for managing AI provider configurations.
     
-    def __init__(self, config_file: str = "config/ai_providers.json"):
+    The validated configuration is kept in memory and only re-read when the
+    file's modification time or size changes, checked at most once per
+    ``reload_interval`` seconds. Edits to the file therefore take effect
+    without a restart; an invalid edit is reported in ``last_error`` and the
+    last valid configuration stays in use. Writes replace the file atomically.
+    """
+    
+    def __init__(self, config_file: str = "config/ai_providers.json",
+                 reload_interval: float = DEFAULT_RELOAD_INTERVAL):
         """Initialize the AI provider configuration handler.
         
         Args:
             config_file (str): Path to the configuration file
+            reload_interval (float): Minimum seconds between checks for file changes
         """
         self.config_file = config_file
+        self.reload_interval = reload_interval
+        self.last_error: Optional[str] = None
+        self._providers: Dict[str, Dict] = {}
+        self._signature = None
+        self._checked_at = float("-inf")
+        self._lock = threading.RLock()
         self._ensure_config_file()
     
     def _ensure_config_file(self) -> None:
@@ -31,6 +105,12 @@ class AIProviderConfig:
                     "claude-2.1"
                 ],
                 "api_key_env": "ANTHROPIC_API_KEY"
+            },
+            "Google": {
+                "models": [
+                    "gemini-pro"
+                ],
+                "api_key_env": "GOOGLE_API_KEY"
             }
         }
         
@@ -38,8 +118,48 @@ class AIProviderConfig:
             with open(self.config_file, 'r') as f:
                 json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
-            with open(self.config_file, 'w') as f:
-                json.dump(default_config, f, indent=4)
+            self._write(default_config)
+        self._reload(force=True)
+    
+    def _reload(self, force: bool = False) -> None:
+        """Re-read the configuration if the file changed since it was last loaded."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.config_file)
+            except OSError as e:
+                self.last_error = str(e)
+                return
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return
+            try:
+                with timed(CONFIG_IO_SECONDS, file="ai_providers", operation="read"):
+                    with open(self.config_file, 'r') as f:
+                        self._providers = validate_providers(json.load(f))
+                self.last_error = None
+            except (OSError, ValueError) as e:
+                # Keep serving the last valid configuration
+                self.last_error = f"Invalid {self.config_file}: {str(e)}"
+            self._signature = signature
+    
+    def _write(self, providers: Dict[str, Dict]) -> None:
+        """Write the configuration atomically and load it."""
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".ai_providers.", suffix=".tmp")
+        try:
+            with timed(CONFIG_IO_SECONDS, file="ai_providers", operation="write"):
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(providers, f, indent=4)
+                os.replace(temp_path, self.config_file)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+        self._signature = None
+        self._checked_at = float("-inf")
     
     def get_providers(self) -> Dict[str, Dict]:
         """Get all AI provider configurations.
@@ -47,11 +167,20 @@ class AIProviderConfig:
         Returns:
             Dict[str, Dict]: Dictionary of provider configurations
         """
-        try:
-            with open(self.config_file, 'r') as f:
-                return json.load(f)
-        except Exception:
-            return {}
+        self._reload()
+        return dict(self._providers)
+    
+    def get_provider(self, provider: str) -> Dict:
+        """Get the configuration of a specific provider.
+        
+        Args:
+            provider (str): The AI provider name
+            
+        Returns:
+            Dict: The provider configuration with defaults filled in, empty if unknown
+        """
+        self._reload()
+        return self._providers.get(provider, {})
     
     def get_provider_models(self, provider: str) -> List[str]:
         """Get available models for a specific provider.
@@ -62,8 +191,7 @@ class AIProviderConfig:
         Returns:
             List[str]: List of available model names
         """
-        providers = self.get_providers()
-        return providers.get(provider, {}).get("models", [])
+        return self.get_provider(provider).get("models", [])
     
     def get_api_key_env(self, provider: str) -> str:
         """Get the environment variable name for a provider's API key.
@@ -74,8 +202,7 @@ class AIProviderConfig:
         Returns:
             str: The environment variable name
         """
-        providers = self.get_providers()
-        return providers.get(provider, {}).get("api_key_env", f"{provider.upper()}_API_KEY")
+        return self.get_provider(provider).get("api_key_env", f"{provider.upper()}_API_KEY")
     
     def add_provider(self, provider: str, models: List[str], api_key_env: str) -> bool:
         """Add a new AI provider configuration.
@@ -89,13 +216,15 @@ class AIProviderConfig:
             bool: True if successful, False otherwise
         """
         try:
-            providers = self.get_providers()
-            providers[provider] = {
-                "models": models,
-                "api_key_env": api_key_env
-            }
-            with open(self.config_file, 'w') as f:
-                json.dump(providers, f, indent=4)
+            with self._lock:
+                self._reload(force=True)
+                providers = dict(self._providers)
+                providers[provider] = {
+                    "models": models,
+                    "api_key_env": api_key_env
+                }
+                self._write(validate_providers(providers))
+                self._reload(force=True)
             return True
         except Exception:
             return False
@@ -110,12 +239,13 @@ class AIProviderConfig:
             bool: True if successful, False otherwise
         """
         try:
-            providers = self.get_providers()
-            if provider in providers:
-                del providers[provider]
-                with open(self.config_file, 'w') as f:
-                    json.dump(providers, f, indent=4)
-                return True
-            return False
+            with self._lock:
+                self._reload(force=True)
+                if provider not in self._providers:
+                    return False
+                providers = {name: entry for name, entry in self._providers.items() if name != provider}
+                self._write(providers)
+                self._reload(force=True)
+            return True
         except Exception:
             return False 
\ No newline at end of file
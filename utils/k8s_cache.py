@@ -0,0 +1,399 @@
+import json
+import socket
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from kubernetes import client, config
+from kubernetes.watch.watch import iter_resp_lines
+from kubernetes.client.rest import ApiException
+from utils.k8s_snapshot import ClusterSnapshot, NamespaceRecord, NodeRecord, PodRecord
+from utils.metrics import K8S_API_SECONDS, record_error, timed
+
+HTTP_GONE = 410
+DEFAULT_PAGE_SIZE = 500
+
+
+def interrupt_response(response) -> None:
+    """Unblock a thread reading a streaming response.
+
+    Closing a response while another thread is blocked reading it waits for
+    that read to return, which for a quiet watch or log stream can be
+    forever. Shutting the socket down makes the pending read return
+    immediately; the reading thread then releases the connection itself.
+
+    Args:
+        response: urllib3 response of a ``_preload_content=False`` request
+    """
+    shutdown = getattr(response, "shutdown", None)
+    if shutdown is not None:
+        shutdown()  # urllib3 >= 2.3
+        return
+    sock = getattr(getattr(response, "_connection", None), "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    else:
+        response.close()
+
+
+def api_operation(func: Callable) -> str:
+    """Name of a Kubernetes client function for the API latency metrics (e.g. ``list_node``)."""
+    func = getattr(func, "func", func)  # functools.partial
+    return getattr(func, "__name__", "request")
+
+
+def _object_key(obj: Dict) -> str:
+    """Build the cache key (``namespace/name`` or ``name``) for a raw object."""
+    metadata = obj["metadata"]
+    if metadata.get("namespace"):
+        return f"{metadata['namespace']}/{metadata['name']}"
+    return metadata["name"]
+
+
+def iter_pages(list_func: Callable, limit: int = DEFAULT_PAGE_SIZE, **kwargs) -> Iterator[Dict]:
+    """Yield the raw JSON pages of a LIST call using ``limit``/``continue``.
+
+    Responses are fetched with ``_preload_content=False`` and parsed as plain
+    JSON, skipping the kubernetes-client model deserialization.
+
+    Args:
+        list_func (Callable): Kubernetes client list function
+        limit (int): Maximum number of objects per page
+        **kwargs: Extra arguments for the list function (e.g. ``label_selector``)
+
+    Yields:
+        Dict: One parsed list page
+    """
+    _continue = None
+    operation = api_operation(list_func)
+    while True:
+        with timed(K8S_API_SECONDS, operation=operation):
+            resp = list_func(limit=limit, _continue=_continue, _preload_content=False, **kwargs)
+        try:
+            page = json.loads(resp.data)
+        finally:
+            resp.release_conn()
+        yield page
+        _continue = page.get("metadata", {}).get("continue")
+        if not _continue:
+            break
+
+
+def iter_list(list_func: Callable, limit: int = DEFAULT_PAGE_SIZE, **kwargs) -> Iterator[Dict]:
+    """Yield the raw objects of a paginated LIST call one at a time.
+
+    Args:
+        list_func (Callable): Kubernetes client list function
+        limit (int): Maximum number of objects per page
+        **kwargs: Extra arguments for the list function
+
+    Yields:
+        Dict: One raw object
+    """
+    for page in iter_pages(list_func, limit, **kwargs):
+        yield from page.get("items") or []
+
+
+class Informer:
+    """List+watch cache for a single Kubernetes resource type.
+
+    The informer performs an initial paginated LIST, then follows a WATCH from
+    the returned resourceVersion and applies every event to an in-memory store.
+    When the API server answers with 410 Gone the store is rebuilt from a
+    fresh LIST; any other failure is retried from the last seen version.
+    Objects are stored as the output of ``transform`` applied to the raw JSON.
+    """
+
+    def __init__(self, list_func: Callable, transform: Callable[[Dict], Any] = lambda obj: obj,
+                 index_func: Optional[Callable[[Any], str]] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                 watch_timeout: int = 300, retry_delay: float = 1.0):
+        """Initialize the informer.
+
+        Args:
+            list_func (Callable): Kubernetes client list function (e.g. ``CoreV1Api.list_node``)
+            transform (Callable): Function reducing a raw object to the form kept in the store
+            index_func (Optional[Callable]): Function returning the index value for a stored object
+            page_size (int): Maximum number of objects per LIST page
+            watch_timeout (int): Server-side timeout of a single WATCH request in seconds
+            retry_delay (float): Seconds to wait before retrying after an error
+        """
+        self.list_func = list_func
+        self.transform = transform
+        self.index_func = index_func
+        self.page_size = page_size
+        self.watch_timeout = watch_timeout
+        self.retry_delay = retry_delay
+        self.resource_version: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._items: Dict[str, Any] = {}
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._response = None
+
+    def start(self) -> None:
+        """Start the background list+watch loop."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background loop and close the current watch."""
+        self._stop_event.set()
+        response = self._response
+        if response is not None:
+            interrupt_response(response)
+
+    def wait_for_sync(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the initial LIST has populated the store.
+
+        Args:
+            timeout (Optional[float]): Maximum number of seconds to wait
+
+        Returns:
+            bool: True if the store is synced, False on timeout
+        """
+        return self._synced.wait(timeout)
+
+    def list(self) -> List[Any]:
+        """Get all cached objects.
+
+        Returns:
+            List[Any]: Snapshot of the cached objects
+        """
+        with self._lock:
+            return list(self._items.values())
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached object by key.
+
+        Args:
+            key (str): ``namespace/name`` for namespaced objects, ``name`` otherwise
+
+        Returns:
+            Optional[Any]: The cached object or None
+        """
+        with self._lock:
+            return self._items.get(key)
+
+    def by_index(self, value: str) -> List[Any]:
+        """Get all cached objects whose index value matches.
+
+        Args:
+            value (str): The index value (e.g. a namespace name)
+
+        Returns:
+            List[Any]: Matching cached objects
+        """
+        with self._lock:
+            return list(self._index.get(value, {}).values())
+
+    def _relist(self) -> None:
+        """Rebuild the store from a full paginated LIST and remember its resourceVersion."""
+        items = {}
+        index: Dict[str, Dict[str, Any]] = {}
+        resource_version = None
+        # Pages are transformed as they arrive so only one raw page is alive at a time
+        for page in iter_pages(self.list_func, self.page_size):
+            for raw in page.get("items") or []:
+                key = _object_key(raw)
+                obj = self.transform(raw)
+                items[key] = obj
+                if self.index_func:
+                    index.setdefault(self.index_func(obj), {})[key] = obj
+            resource_version = page.get("metadata", {}).get("resourceVersion")
+        with self._lock:
+            self._items = items
+            self._index = index
+        self.resource_version = resource_version
+        self._synced.set()
+
+    def _apply_event(self, event_type: str, raw: Dict) -> None:
+        """Apply a single raw watch event to the store."""
+        if event_type not in ("ADDED", "MODIFIED", "DELETED"):
+            return
+        key = _object_key(raw)
+        obj = self.transform(raw)
+        index_value = self.index_func(obj) if self.index_func else None
+        with self._lock:
+            if event_type == "DELETED":
+                self._items.pop(key, None)
+                if index_value is not None:
+                    self._index.get(index_value, {}).pop(key, None)
+            else:
+                self._items[key] = obj
+                if index_value is not None:
+                    self._index.setdefault(index_value, {})[key] = obj
+
+    def _handle_event(self, event: Dict) -> None:
+        """Apply a raw watch event and advance the resourceVersion."""
+        obj = event.get("object") or {}
+        if event.get("type") == "ERROR":
+            raise ApiException(status=obj.get("code"), reason=obj.get("message"))
+        self._apply_event(event.get("type"), obj)
+        resource_version = obj.get("metadata", {}).get("resourceVersion")
+        if resource_version:
+            self.resource_version = resource_version
+
+    def _watch_once(self) -> None:
+        """Follow a single WATCH request until it times out or is stopped."""
+        # Measures the time to the response headers, the stream itself stays open
+        with timed(K8S_API_SECONDS, operation=f"watch_{api_operation(self.list_func)}"):
+            self._response = self.list_func(
+                watch=True,
+                resource_version=self.resource_version,
+                timeout_seconds=self.watch_timeout,
+                allow_watch_bookmarks=True,
+                _preload_content=False
+            )
+        try:
+            for line in iter_resp_lines(self._response):
+                if line:
+                    self._handle_event(json.loads(line))
+                if self._stop_event.is_set():
+                    break
+        finally:
+            self._response.release_conn()
+            self._response = None
+
+    def _run(self) -> None:
+        """Main list+watch loop."""
+        while not self._stop_event.is_set():
+            try:
+                if self.resource_version is None:
+                    self._relist()
+                self._watch_once()
+                self.last_error = None
+            except ApiException as e:
+                if e.status == HTTP_GONE:
+                    # Our resourceVersion is too old, start over with a new LIST
+                    self.resource_version = None
+                    continue
+                record_error("informer", e)
+                self.last_error = f"Error watching resources: {str(e)}"
+                self._stop_event.wait(self.retry_delay)
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    record_error("informer", e)
+                self.last_error = f"Error watching resources: {str(e)}"
+                self._stop_event.wait(self.retry_delay)
+
+
+class ClusterCache:
+    """Process-wide cache of cluster state shared by the chat and log viewer tabs."""
+
+    def __init__(self, core_v1: Optional[client.CoreV1Api] = None, sync_timeout: float = 10.0,
+                 events: bool = True):
+        """Initialize the cluster cache.
+
+        Args:
+            core_v1 (Optional[client.CoreV1Api]): Kubernetes core API client
+            sync_timeout (float): Seconds to wait for the initial LIST on first read
+            events (bool): Also aggregate Warning events for the chat context
+        """
+        core_v1 = core_v1 or client.CoreV1Api()
+        self.sync_timeout = sync_timeout
+        self.namespaces = Informer(core_v1.list_namespace, transform=NamespaceRecord.from_raw)
+        self.nodes = Informer(core_v1.list_node, transform=NodeRecord.from_raw)
+        self.pods = Informer(
+            core_v1.list_pod_for_all_namespaces,
+            transform=PodRecord.from_raw,
+            index_func=lambda pod: pod.namespace
+        )
+        self._informers = [self.namespaces, self.nodes, self.pods]
+        self.events = None
+        if events:
+            # Imported here, the events module builds on Informer
+            from utils.k8s_events import EventInformer
+            # Only warnings are sent, filtered by the API server
+            self.events = EventInformer(partial(core_v1.list_event_for_all_namespaces, field_selector="type=Warning"))
+
+    def start(self) -> None:
+        """Start all informers."""
+        for informer in self._informers:
+            informer.start()
+        if self.events is not None:
+            self.events.start()
+
+    def stop(self) -> None:
+        """Stop all informers."""
+        for informer in self._informers:
+            informer.stop()
+        if self.events is not None:
+            self.events.stop()
+
+    def wait_for_sync(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every informer has completed its initial LIST.
+
+        Args:
+            timeout (Optional[float]): Maximum number of seconds to wait per informer
+
+        Returns:
+            bool: True if all informers are synced
+        """
+        return all(informer.wait_for_sync(timeout) for informer in self._informers)
+
+    def _check_synced(self, informer: Informer) -> None:
+        """Raise if an informer has not produced any data yet."""
+        if not informer.wait_for_sync(self.sync_timeout):
+            raise RuntimeError(informer.last_error or "Timed out waiting for cluster state")
+
+    def get_namespaces(self) -> List[str]:
+        """Get the names of all namespaces."""
+        self._check_synced(self.namespaces)
+        return sorted(ns.name for ns in self.namespaces.list())
+
+    def get_nodes(self) -> List[NodeRecord]:
+        """Get all nodes."""
+        self._check_synced(self.nodes)
+        return sorted(self.nodes.list(), key=lambda node: node.name)
+
+    def get_pods(self, namespace: str) -> List[str]:
+        """Get the names of all pods in a namespace."""
+        self._check_synced(self.pods)
+        return sorted(pod.name for pod in self.pods.by_index(namespace))
+
+    def get_containers(self, namespace: str, pod: str) -> List[str]:
+        """Get the container names of a pod."""
+        self._check_synced(self.pods)
+        pod_info = self.pods.get(f"{namespace}/{pod}")
+        if pod_info is None:
+            raise KeyError(f"Pod {namespace}/{pod} not found")
+        return list(pod_info.containers)
+
+    def snapshot(self) -> ClusterSnapshot:
+        """Get a point-in-time snapshot of the cached cluster state.
+
+        Events are included as far as they are loaded; a cluster whose
+        events can not be listed (e.g. missing RBAC) still has a snapshot.
+        """
+        for informer in self._informers:
+            self._check_synced(informer)
+        events = self.events.store.groups() if self.events is not None else []
+        return ClusterSnapshot(self.namespaces.list(), self.nodes.list(), self.pods.list(), events)
+
+
+_cluster_cache: Optional[ClusterCache] = None
+_cluster_cache_lock = threading.Lock()
+
+
+def get_cluster_cache() -> ClusterCache:
+    """Get the process-wide cluster cache, starting it on first use.
+
+    Returns:
+        ClusterCache: The shared cluster cache
+    """
+    global _cluster_cache
+    with _cluster_cache_lock:
+        if _cluster_cache is None:
+            config.load_kube_config()
+            _cluster_cache = ClusterCache()
+            _cluster_cache.start()
+        return _cluster_cache
@@ -0,0 +1,182 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from kubernetes import client, config
+from kubernetes.config.config_exception import ConfigException
+
+from utils.k8s_cache import ClusterCache, get_cluster_cache
+from utils.k8s_snapshot import ClusterSnapshot
+from utils.metrics import record_error
+
+DEFAULT_CLUSTER_TIMEOUT = 10.0
+DEFAULT_MAX_WORKERS = 16
+
+
+class ClusterSet:
+    """One API client and cluster cache per kubeconfig context.
+
+    Clients and caches are created the first time a context is used and
+    then kept, so every cluster is listed once and followed by its own
+    watches. The current context reuses the process-wide cluster cache.
+    Snapshots of several clusters are collected in parallel, each with its
+    own timeout, so an unreachable cluster is reported instead of stalling
+    the others.
+    """
+
+    def __init__(self, config_file: Optional[str] = None, timeout: float = DEFAULT_CLUSTER_TIMEOUT,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
+        """Initialize the cluster set.
+
+        Args:
+            config_file (Optional[str]): Path of the kubeconfig, defaults to ``$KUBECONFIG`` or ``~/.kube/config``
+            timeout (float): Default seconds to wait for a cluster's state
+            max_workers (int): Maximum number of clusters connected to at the same time
+        """
+        self.config_file = config_file
+        self.timeout = timeout
+        self._api_clients: Dict[str, client.ApiClient] = {}
+        self._caches: Dict[str, ClusterCache] = {}
+        self._current: Optional[str] = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cluster")
+
+    def contexts(self) -> List[str]:
+        """Get the names of the kubeconfig contexts.
+
+        Returns:
+            List[str]: Context names, empty if there is no kubeconfig
+        """
+        try:
+            contexts, _ = config.list_kube_config_contexts(config_file=self.config_file)
+        except (ConfigException, OSError):
+            return []
+        return sorted(context["name"] for context in contexts or [])
+
+    @property
+    def current_context(self) -> str:
+        """Name of the kubeconfig's current context, empty if there is no kubeconfig."""
+        if self._current is None:
+            try:
+                _, active = config.list_kube_config_contexts(config_file=self.config_file)
+                self._current = active["name"] if active else ""
+            except (ConfigException, OSError):
+                self._current = ""
+        return self._current
+
+    def api_client(self, context: str) -> client.ApiClient:
+        """Get the API client of a context.
+
+        Args:
+            context (str): The kubeconfig context
+
+        Returns:
+            client.ApiClient: The client, created on first use
+        """
+        with self._lock:
+            api_client = self._api_clients.get(context)
+        if api_client is None:
+            # Outside the lock, credential plugins can take a while
+            api_client = config.new_client_from_config(config_file=self.config_file, context=context)
+            with self._lock:
+                api_client = self._api_clients.setdefault(context, api_client)
+        return api_client
+
+    def clients(self, context: Optional[str] = None) -> Tuple[client.CoreV1Api, client.AppsV1Api]:
+        """Get the core and apps API clients of a context.
+
+        Args:
+            context (Optional[str]): The kubeconfig context, defaults to the current one
+
+        Returns:
+            Tuple[client.CoreV1Api, client.AppsV1Api]: The clients
+        """
+        if not context or (self.config_file is None and context == self.current_context):
+            # The default clients copy the configuration the shared cache loads
+            get_cluster_cache()
+            return client.CoreV1Api(), client.AppsV1Api()
+        api_client = self.api_client(context)
+        return client.CoreV1Api(api_client), client.AppsV1Api(api_client)
+
+    def cache(self, context: Optional[str] = None) -> ClusterCache:
+        """Get the started cluster cache of a context.
+
+        Args:
+            context (Optional[str]): The kubeconfig context, defaults to the current one
+
+        Returns:
+            ClusterCache: The cluster cache
+        """
+        if not context or (self.config_file is None and context == self.current_context):
+            return get_cluster_cache()
+        with self._lock:
+            cache = self._caches.get(context)
+        if cache is not None:
+            # The timeout may have changed since the cache was created
+            cache.sync_timeout = self.timeout
+        else:
+            cache = ClusterCache(client.CoreV1Api(self.api_client(context)), sync_timeout=self.timeout)
+            with self._lock:
+                if context in self._caches:
+                    return self._caches[context]
+                self._caches[context] = cache
+            cache.start()
+        return cache
+
+    def snapshots(self, contexts: Sequence[str],
+                  timeout: Optional[float] = None) -> Tuple[Dict[str, ClusterSnapshot], Dict[str, str]]:
+        """Collect the snapshots of several clusters in parallel.
+
+        Args:
+            contexts (Sequence[str]): The kubeconfig contexts
+            timeout (Optional[float]): Seconds to wait for the clusters, defaults to ``timeout``
+
+        Returns:
+            Tuple[Dict[str, ClusterSnapshot], Dict[str, str]]: Snapshots and errors by context
+        """
+        timeout = self.timeout if timeout is None else timeout
+        futures = {self._executor.submit(lambda c=context: self.cache(c).snapshot()): context
+                   for context in contexts}
+        done, _ = wait(futures, timeout)
+        snapshots, errors = {}, {}
+        for future, context in futures.items():
+            if future not in done:
+                errors[context] = f"no response within {timeout:g}s"
+            elif future.exception() is not None:
+                record_error("cluster", future.exception())
+                errors[context] = str(future.exception())
+            else:
+                snapshots[context] = future.result()
+        return snapshots, errors
+
+    def stop(self) -> None:
+        """Stop the caches of all contexts except the shared current one."""
+        with self._lock:
+            caches = list(self._caches.values())
+            self._caches.clear()
+        for cache in caches:
+            cache.stop()
+        self._executor.shutdown(wait=False)
+
+
+_cluster_set: Optional[ClusterSet] = None
+_cluster_set_lock = threading.Lock()
+
+
+def get_cluster_set(timeout: Optional[float] = None) -> ClusterSet:
+    """Get the process-wide cluster set.
+
+    Args:
+        timeout (Optional[float]): Default seconds to wait for a cluster's state, applied on
+            every call that passes it; callers without a setting keep the current value
+
+    Returns:
+        ClusterSet: The shared cluster set
+    """
+    global _cluster_set
+    with _cluster_set_lock:
+        if _cluster_set is None:
+            _cluster_set = ClusterSet(timeout=DEFAULT_CLUSTER_TIMEOUT if timeout is None else timeout)
+        elif timeout is not None:
+            _cluster_set.timeout = timeout
+        return _cluster_set
@@ -0,0 +1,175 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.k8s_cache import Informer, iter_pages
+
+DEFAULT_MAX_GROUPS = 2000
+DEFAULT_WINDOW = 3600.0
+MAX_MESSAGE_CHARS = 200
+
+EventKey = Tuple[str, str, str, str]
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    """Convert an RFC3339 timestamp of an event to epoch seconds."""
+    if not value or len(value) < 19:
+        return None
+    try:
+        return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+class EventGroup:
+    """All occurrences of one reason for one object, e.g. BackOff of a pod."""
+
+    __slots__ = ("namespace", "kind", "name", "reason", "type", "message", "count", "first_seen", "last_seen")
+
+    def __init__(self, namespace: str, kind: str, name: str, reason: str, type: str = "Warning",
+                 message: str = "", count: int = 0, first_seen: float = 0.0, last_seen: float = 0.0):
+        self.namespace = sys.intern(namespace)
+        self.kind = sys.intern(kind)
+        self.name = name
+        self.reason = sys.intern(reason)
+        self.type = sys.intern(type)
+        self.message = message
+        self.count = count
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+
+    @property
+    def key(self) -> EventKey:
+        """The (namespace, kind, name, reason) the group aggregates."""
+        return self.namespace, self.kind, self.name, self.reason
+
+
+class EventStore:
+    """Bounded aggregate of Kubernetes Events by involved object and reason.
+
+    Every Event object is counted once: the store remembers the last count
+    seen for each event UID and only adds the difference when the API
+    server bumps it, so re-listing after a watch expiry does not double
+    count. At most ``max_groups`` groups are kept, dropping the least
+    recently updated, and groups not seen within ``window`` seconds expire.
+    """
+
+    def __init__(self, max_groups: int = DEFAULT_MAX_GROUPS, window: float = DEFAULT_WINDOW):
+        """Initialize the store.
+
+        Args:
+            max_groups (int): Maximum number of (object, reason) groups kept
+            window (float): Seconds after its last occurrence a group is dropped
+        """
+        self.max_groups = max_groups
+        self.window = window
+        self._groups: "OrderedDict[EventKey, EventGroup]" = OrderedDict()
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._groups)
+
+    def ingest(self, raw: Dict) -> Optional[EventGroup]:
+        """Add a raw core/v1 Event object.
+
+        Args:
+            raw (Dict): The event as returned by the API server
+
+        Returns:
+            Optional[EventGroup]: The group the event was added to, None if it has no reason
+        """
+        reason = raw.get("reason")
+        if not reason:
+            return None
+        metadata = raw.get("metadata") or {}
+        involved = raw.get("involvedObject") or {}
+        series = raw.get("series") or {}
+        namespace = involved.get("namespace") or metadata.get("namespace") or ""
+        key = (namespace, involved.get("kind") or "", involved.get("name") or "", reason)
+        count = series.get("count") or raw.get("count") or 1
+        last_seen = (_parse_time(series.get("lastObservedTime")) or _parse_time(raw.get("lastTimestamp"))
+                     or _parse_time(raw.get("eventTime")) or _parse_time(metadata.get("creationTimestamp"))
+                     or time.time())
+        first_seen = _parse_time(raw.get("firstTimestamp")) or _parse_time(raw.get("eventTime")) or last_seen
+        uid = metadata.get("uid") or f"{namespace}/{metadata.get('name')}"
+        with self._lock:
+            previous = self._counts.pop(uid, None)
+            self._counts[uid] = count
+            # Remember a few times more events than groups, older UIDs have stopped changing
+            while len(self._counts) > self.max_groups * 4:
+                self._counts.popitem(last=False)
+            delta = count - previous if previous is not None and count >= previous else count
+            group = self._groups.pop(key, None)
+            if group is None:
+                group = EventGroup(*key, type=raw.get("type") or "", first_seen=first_seen, last_seen=last_seen)
+            group.count += delta
+            group.first_seen = min(group.first_seen, first_seen)
+            if last_seen >= group.last_seen:
+                group.last_seen = last_seen
+                group.type = sys.intern(raw.get("type") or group.type)
+                group.message = (raw.get("message") or "").strip()[:MAX_MESSAGE_CHARS]
+            self._groups[key] = group
+            while len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+            return group
+
+    def groups(self, now: Optional[float] = None) -> List[EventGroup]:
+        """Get the groups seen within the window, most recent first.
+
+        Args:
+            now (Optional[float]): Current epoch time, defaults to the wall clock
+
+        Returns:
+            List[EventGroup]: The current groups
+        """
+        cutoff = (time.time() if now is None else now) - self.window
+        with self._lock:
+            for key in [key for key, group in self._groups.items() if group.last_seen < cutoff]:
+                del self._groups[key]
+            groups = list(self._groups.values())
+        return sorted(groups, key=lambda group: group.last_seen, reverse=True)
+
+    def clear(self) -> None:
+        """Forget all events."""
+        with self._lock:
+            self._groups.clear()
+            self._counts.clear()
+
+
+class EventInformer(Informer):
+    """List+watch of Events feeding an ``EventStore`` instead of keeping every object.
+
+    The informer's own store stays empty; ``list``, ``get`` and ``by_index``
+    return nothing. Use the ``store`` to query the aggregated events.
+    """
+
+    def __init__(self, list_func: Callable, store: Optional[EventStore] = None, **kwargs):
+        """Initialize the informer.
+
+        Args:
+            list_func (Callable): Events list function, e.g. ``CoreV1Api.list_event_for_all_namespaces``
+            store (Optional[EventStore]): The store events are aggregated in
+            **kwargs: Further ``Informer`` arguments (page size, timeouts)
+        """
+        super().__init__(list_func, **kwargs)
+        self.store = store or EventStore()
+
+    def _relist(self) -> None:
+        """Feed a full paginated LIST into the store and remember its resourceVersion."""
+        resource_version = None
+        for page in iter_pages(self.list_func, self.page_size):
+            for raw in page.get("items") or []:
+                self.store.ingest(raw)
+            resource_version = page.get("metadata", {}).get("resourceVersion")
+        self.resource_version = resource_version
+        self._synced.set()
+
+    def _apply_event(self, event_type: str, raw: Dict) -> None:
+        """Add created and updated events; deleted ones only expired on the server."""
+        if event_type in ("ADDED", "MODIFIED"):
+            self.store.ingest(raw)
@@ -0,0 +1,236 @@
+import re
+import sys
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+HEALTHY_PHASES = ("Running", "Succeeded")
+
+# Container name tuples are shared between all pods of the same workload
+_container_tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+# So are resource tuples, replicas have the same requests and limits
+NO_RESOURCES = (0.0, 0.0, 0.0, 0.0)
+_resource_tuples: Dict[Tuple[float, ...], Tuple[float, ...]] = {NO_RESOURCES: NO_RESOURCES}
+_QUANTITY_RE = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)([a-zA-Z]*)$")
+_QUANTITY_SUFFIXES = {
+    "n": 1e-9, "u": 1e-6, "m": 1e-3, "": 1.0,
+    "k": 1e3, "M": 1e6, "G": 1e9, "T": 1e12, "P": 1e15, "E": 1e18,
+    "Ki": 2.0 ** 10, "Mi": 2.0 ** 20, "Gi": 2.0 ** 30, "Ti": 2.0 ** 40, "Pi": 2.0 ** 50, "Ei": 2.0 ** 60,
+}
+
+
+def _intern(value: str) -> str:
+    """Intern a (possibly empty or missing) string."""
+    return sys.intern(value or "")
+
+
+def _intern_tuple(values: Iterable[str]) -> Tuple[str, ...]:
+    """Intern a tuple of strings so identical tuples share one object."""
+    key = tuple(_intern(value) for value in values)
+    return _container_tuples.setdefault(key, key)
+
+
+def parse_quantity(value) -> float:
+    """Convert a Kubernetes quantity (``250m``, ``1.5``, ``512Mi``, ``123456n``) to a float.
+
+    Args:
+        value: The quantity string or number
+
+    Returns:
+        float: CPU in cores or memory in bytes, 0.0 if missing or invalid
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _QUANTITY_RE.match(value.strip()) if value else None
+    if match is None or match.group(2) not in _QUANTITY_SUFFIXES:
+        return 0.0
+    return float(match.group(1)) * _QUANTITY_SUFFIXES[match.group(2)]
+
+
+def _pod_resources(spec: Dict) -> Tuple[float, ...]:
+    """Sum the container CPU/memory requests and limits of a pod spec.
+
+    Returns:
+        Tuple[float, ...]: Shared (cpu request, cpu limit, memory request, memory limit) tuple
+    """
+    totals = [0.0, 0.0, 0.0, 0.0]
+    for container in spec.get("containers") or []:
+        resources = container.get("resources") or {}
+        requests, limits = resources.get("requests") or {}, resources.get("limits") or {}
+        totals[0] += parse_quantity(requests.get("cpu"))
+        totals[1] += parse_quantity(limits.get("cpu"))
+        totals[2] += parse_quantity(requests.get("memory"))
+        totals[3] += parse_quantity(limits.get("memory"))
+    key = tuple(totals)
+    return _resource_tuples.setdefault(key, key)
+
+
+class NamespaceRecord:
+    """Compact, read-only view of a namespace."""
+
+    __slots__ = ("name", "phase")
+
+    def __init__(self, name: str, phase: str = ""):
+        self.name = _intern(name)
+        self.phase = _intern(phase)
+
+    @classmethod
+    def from_raw(cls, obj: Dict) -> "NamespaceRecord":
+        """Build a record from a raw namespace object."""
+        return cls(obj["metadata"]["name"], obj.get("status", {}).get("phase", ""))
+
+
+class NodeRecord:
+    """Compact, read-only view of a node."""
+
+    __slots__ = ("name", "ready", "cpu_allocatable", "memory_allocatable")
+
+    def __init__(self, name: str, ready: bool, cpu_allocatable: float = 0.0, memory_allocatable: float = 0.0):
+        self.name = _intern(name)
+        self.ready = ready
+        self.cpu_allocatable = cpu_allocatable
+        self.memory_allocatable = memory_allocatable
+
+    @classmethod
+    def from_raw(cls, obj: Dict) -> "NodeRecord":
+        """Build a record from a raw node object."""
+        status = obj.get("status", {})
+        conditions = status.get("conditions") or []
+        ready = any(c.get("type") == "Ready" and c.get("status") == "True" for c in conditions)
+        allocatable = status.get("allocatable") or {}
+        return cls(
+            obj["metadata"]["name"],
+            ready,
+            parse_quantity(allocatable.get("cpu")),
+            parse_quantity(allocatable.get("memory"))
+        )
+
+
+class PodRecord:
+    """Compact, read-only view of a pod.
+
+    Namespace, node, phase and owner strings are interned and container name
+    tuples are shared, so the per-pod cost is dominated by the pod name.
+    """
+
+    __slots__ = ("name", "namespace", "node", "phase", "reason", "owner", "containers", "restarts", "resources")
+
+    def __init__(self, name: str, namespace: str, node: str = "", phase: str = "", reason: str = "",
+                 owner: str = "", containers: Iterable[str] = (), restarts: int = 0,
+                 resources: Tuple[float, ...] = NO_RESOURCES):
+        self.name = name
+        self.namespace = _intern(namespace)
+        self.node = _intern(node)
+        self.phase = _intern(phase)
+        self.reason = _intern(reason)
+        self.owner = _intern(owner)
+        self.containers = _intern_tuple(containers)
+        self.restarts = restarts
+        # (cpu request, cpu limit, memory request, memory limit) in cores and bytes, 0 if unset
+        self.resources = resources
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the pod is running or completed without a problem reason."""
+        return self.phase in HEALTHY_PHASES and not self.reason
+
+    @classmethod
+    def from_raw(cls, obj: Dict) -> "PodRecord":
+        """Build a record from a raw pod object."""
+        metadata = obj["metadata"]
+        spec = obj.get("spec", {})
+        status = obj.get("status", {})
+        owners = metadata.get("ownerReferences") or []
+        return cls(
+            name=metadata["name"],
+            namespace=metadata.get("namespace", ""),
+            node=spec.get("nodeName", ""),
+            phase=status.get("phase", ""),
+            reason=_pod_reason(status),
+            owner=owners[0]["name"] if owners else "",
+            containers=[c["name"] for c in spec.get("containers") or []],
+            restarts=sum(cs.get("restartCount", 0) for cs in status.get("containerStatuses") or []),
+            resources=_pod_resources(spec)
+        )
+
+
+def _pod_reason(status: Dict) -> str:
+    """Get the most specific problem reason of a pod (e.g. CrashLoopBackOff)."""
+    for container_status in status.get("containerStatuses") or []:
+        state = container_status.get("state") or {}
+        if state.get("waiting"):
+            reason = state["waiting"].get("reason", "")
+            if reason != "ContainerCreating":
+                return reason
+        terminated = state.get("terminated")
+        if terminated and terminated.get("reason") not in (None, "Completed"):
+            return terminated["reason"]
+    return status.get("reason", "")
+
+
+def record_size(record: object) -> int:
+    """Estimate the memory owned by a record in bytes.
+
+    Only the record and its name are counted; the other strings, container
+    tuples and small ints are shared between records.
+    """
+    return sys.getsizeof(record) + sys.getsizeof(record.name)
+
+
+class ClusterSnapshot:
+    """Point-in-time view of the cluster built from compact records."""
+
+    def __init__(self, namespaces: Iterable[NamespaceRecord], nodes: Iterable[NodeRecord],
+                 pods: Iterable[PodRecord], events: Iterable = ()):
+        """Initialize the snapshot.
+
+        Args:
+            namespaces (Iterable[NamespaceRecord]): Namespace records
+            nodes (Iterable[NodeRecord]): Node records
+            pods (Iterable[PodRecord]): Pod records
+            events (Iterable): Aggregated event groups (``utils.k8s_events.EventGroup``), most recent first
+        """
+        self.namespaces = sorted(namespaces, key=lambda ns: ns.name)
+        self.nodes = sorted(nodes, key=lambda node: node.name)
+        self.pods = sorted(pods, key=lambda pod: (pod.namespace, pod.name))
+        self.events = list(events)
+
+    def namespace_names(self) -> List[str]:
+        """Get the names of all namespaces."""
+        return [ns.name for ns in self.namespaces]
+
+    def pods_in(self, namespace: str) -> List[PodRecord]:
+        """Get all pods in a namespace."""
+        return [pod for pod in self.pods if pod.namespace == namespace]
+
+    def not_ready_nodes(self) -> List[NodeRecord]:
+        """Get all nodes that are not Ready."""
+        return [node for node in self.nodes if not node.ready]
+
+    def phase_counts(self) -> Dict[str, int]:
+        """Count pods per phase."""
+        return dict(Counter(pod.phase for pod in self.pods))
+
+    def unhealthy_pods(self) -> List[PodRecord]:
+        """Get all pods that are not running or completed cleanly."""
+        return [pod for pod in self.pods if not pod.healthy]
+
+    def restarts_by_workload(self) -> List[Tuple[str, str, int, int]]:
+        """Sum container restarts per owning workload.
+
+        Returns:
+            List[Tuple[str, str, int, int]]: (namespace, workload, restarts, pods), most restarts first
+        """
+        totals: Dict[Tuple[str, str], List[int]] = {}
+        for pod in self.pods:
+            if pod.restarts:
+                entry = totals.setdefault((pod.namespace, pod.owner or pod.name), [0, 0])
+                entry[0] += pod.restarts
+                entry[1] += 1
+        workloads = [(ns, name, restarts, pods) for (ns, name), (restarts, pods) in totals.items()]
+        return sorted(workloads, key=lambda workload: workload[2], reverse=True)
+
+    def memory_usage(self) -> int:
+        """Estimate the memory held by this snapshot's records in bytes."""
+        records = [*self.namespaces, *self.nodes, *self.pods]
+        return (sum(record_size(record) for record in records)
+                + sum(record_size(group) + sys.getsizeof(group.message) for group in self.events))
@@ -0,0 +1,309 @@
+import json
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+import yaml
+
+from utils.context_builder import format_event_line
+from utils.k8s_cache import api_operation
+from utils.k8s_clusters import ClusterSet
+from utils.k8s_snapshot import ClusterSnapshot
+from utils.llm_tools import Tool
+from utils.metrics import K8S_API_SECONDS, timed
+
+MAX_LIST_ITEMS = 100
+MAX_LOG_LINES = 200
+MAX_MESSAGE_CHARS = 300
+
+CLUSTER_PARAMETER = {
+    "type": "string",
+    "description": "Kubeconfig context of the cluster, defaults to the current cluster"
+}
+WORKLOAD_KINDS = {
+    "deployment": "read_namespaced_deployment",
+    "deploy": "read_namespaced_deployment",
+    "statefulset": "read_namespaced_stateful_set",
+    "sts": "read_namespaced_stateful_set",
+    "daemonset": "read_namespaced_daemon_set",
+    "ds": "read_namespaced_daemon_set",
+}
+
+
+def _read_raw(read_func: Callable, *args) -> Dict:
+    """Read one object as raw JSON, skipping the model deserialization."""
+    with timed(K8S_API_SECONDS, operation=api_operation(read_func)):
+        response = read_func(*args, _preload_content=False)
+        try:
+            return json.loads(response.data)
+        finally:
+            response.release_conn()
+
+
+def _dump(data: Dict) -> str:
+    """Render a compact object as YAML, which models read well and is smaller than JSON."""
+    return yaml.safe_dump(data, sort_keys=False, default_flow_style=False, width=120).strip()
+
+
+def _short(text: Optional[str]) -> Optional[str]:
+    """Shorten a status or condition message."""
+    if not text or len(text) <= MAX_MESSAGE_CHARS:
+        return text
+    return text[:MAX_MESSAGE_CHARS] + "..."
+
+
+def _limited(lines: List[str], limit: int = MAX_LIST_ITEMS) -> str:
+    """Join lines, noting how many were left out."""
+    if not lines:
+        return "None found"
+    if len(lines) > limit:
+        return "\n".join(lines[:limit] + [f"... and {len(lines) - limit} more"])
+    return "\n".join(lines)
+
+
+def _container_resources(spec: Dict) -> Dict:
+    """The requests and limits of a container spec that are set."""
+    resources = spec.get("resources") or {}
+    return {key: resources[key] for key in ("requests", "limits") if resources.get(key)}
+
+
+def _conditions(status: Dict, healthy: str = "True") -> List[str]:
+    """Conditions that are not in their healthy state, e.g. ``Ready=False (ContainersNotReady)``."""
+    return [
+        f"{condition['type']}={condition.get('status')}"
+        + (f" ({condition['reason']})" if condition.get("reason") else "")
+        + (f": {_short(condition['message'])}" if condition.get("message") else "")
+        for condition in status.get("conditions") or []
+        if condition.get("status") != healthy
+    ]
+
+
+def _container_state(state: Dict) -> Optional[str]:
+    """Describe a container state like ``waiting: CrashLoopBackOff``."""
+    for name, details in (state or {}).items():
+        details = details or {}
+        parts = [details.get("reason")]
+        if "exitCode" in details:
+            parts.append(f"exit code {details['exitCode']}")
+        if details.get("finishedAt"):
+            parts.append(f"finished {details['finishedAt']}")
+        if details.get("message"):
+            parts.append(_short(details["message"]))
+        return f"{name}: " + ", ".join(str(part) for part in parts if part) if any(parts) else name
+    return None
+
+
+class KubernetesTools:
+    """Read-only Kubernetes lookups the model can call instead of getting the whole cluster state.
+
+    Lists and events come from the cluster caches, single objects are read
+    from the API server when asked for, and logs are tailed through the log
+    viewer. Every lookup returns compact text.
+    """
+
+    def __init__(self, cluster_set: ClusterSet, tail_logs: Callable[..., str]):
+        """Initialize the tools.
+
+        Args:
+            cluster_set (ClusterSet): Clients and caches of the kubeconfig contexts
+            tail_logs (Callable[..., str]): Log reader, e.g. ``LogViewer.tail_logs``
+        """
+        self.cluster_set = cluster_set
+        self._tail_logs = tail_logs
+
+    def tools(self) -> List[Tool]:
+        """Get the tool definitions."""
+        return [
+            Tool(
+                "list_pods",
+                "List pods with their phase or problem reason, restarts and node. "
+                "Use it to find pod names before looking at a pod.",
+                {
+                    "type": "object",
+                    "properties": {
+                        "namespace": {"type": "string", "description": "Only pods of this namespace"},
+                        "unhealthy_only": {"type": "boolean", "description": "Only pods that are not running fine"},
+                        "cluster": CLUSTER_PARAMETER,
+                    },
+                },
+                self.list_pods
+            ),
+            Tool(
+                "get_pod",
+                "Get a pod's status, container states, last termination reasons, exit codes, "
+                "restarts, images, requests and limits, and its recent warning events.",
+                {
+                    "type": "object",
+                    "properties": {
+                        "namespace": {"type": "string"},
+                        "name": {"type": "string", "description": "The pod name"},
+                        "cluster": CLUSTER_PARAMETER,
+                    },
+                    "required": ["namespace", "name"],
+                },
+                self.get_pod
+            ),
+            Tool(
+                "describe_workload",
+                "Describe a deployment, statefulset or daemonset: replicas, rollout conditions, "
+                "containers, its pods and their recent warning events.",
+                {
+                    "type": "object",
+                    "properties": {
+                        "namespace": {"type": "string"},
+                        "kind": {"type": "string", "enum": ["deployment", "statefulset", "daemonset"]},
+                        "name": {"type": "string", "description": "The workload name"},
+                        "cluster": CLUSTER_PARAMETER,
+                    },
+                    "required": ["namespace", "kind", "name"],
+                },
+                self.describe_workload
+            ),
+            Tool(
+                "tail_logs",
+                "Get the last lines of a container's log. Set previous to read the log of the "
+                "container instance that crashed before the current one.",
+                {
+                    "type": "object",
+                    "properties": {
+                        "namespace": {"type": "string"},
+                        "pod": {"type": "string"},
+                        "container": {"type": "string", "description": "Defaults to the pod's first container"},
+                        "lines": {"type": "integer", "description": f"Number of lines, at most {MAX_LOG_LINES}"},
+                        "previous": {"type": "boolean"},
+                        "cluster": CLUSTER_PARAMETER,
+                    },
+                    "required": ["namespace", "pod"],
+                },
+                self.tail_logs
+            ),
+            Tool(
+                "list_events",
+                "List recent warning events (e.g. FailedScheduling, BackOff, Unhealthy) aggregated "
+                "by object and reason, most recent first.",
+                {
+                    "type": "object",
+                    "properties": {
+                        "namespace": {"type": "string", "description": "Only events of this namespace"},
+                        "name": {"type": "string", "description": "Only events of objects whose name contains this"},
+                        "cluster": CLUSTER_PARAMETER,
+                    },
+                },
+                self.list_events
+            ),
+        ]
+
+    def _snapshot(self, cluster: str) -> ClusterSnapshot:
+        return self.cluster_set.cache(cluster or None).snapshot()
+
+    def list_pods(self, namespace: str = "", unhealthy_only: bool = False, cluster: str = "") -> str:
+        """List pods from the cluster cache."""
+        lines = [
+            f"{pod.namespace}/{pod.name}: {pod.reason or pod.phase or 'Unknown'}, "
+            f"{pod.restarts} restarts, node {pod.node or '-'}"
+            for pod in self._snapshot(cluster).pods
+            if (not namespace or pod.namespace == namespace) and not (unhealthy_only and pod.healthy)
+        ]
+        return _limited(lines)
+
+    def get_pod(self, namespace: str, name: str, cluster: str = "") -> str:
+        """Read a pod from the API server and summarize it."""
+        core_v1, _ = self.cluster_set.clients(cluster or None)
+        raw = _read_raw(core_v1.read_namespaced_pod, name, namespace)
+        metadata, spec, status = raw.get("metadata") or {}, raw.get("spec") or {}, raw.get("status") or {}
+        specs = {container["name"]: container for container in spec.get("containers") or []}
+        containers = []
+        for container_status in (status.get("initContainerStatuses") or []) + (status.get("containerStatuses") or []):
+            container = {
+                "name": container_status["name"],
+                "image": container_status.get("image"),
+                "ready": container_status.get("ready"),
+                "restarts": container_status.get("restartCount", 0),
+                "state": _container_state(container_status.get("state")),
+                "last_state": _container_state(container_status.get("lastState")),
+                **_container_resources(specs.get(container_status["name"], {})),
+            }
+            containers.append({key: value for key, value in container.items() if value not in (None, {})})
+        owners = [f"{owner['kind']}/{owner['name']}" for owner in metadata.get("ownerReferences") or []]
+        summary = {
+            "pod": f"{namespace}/{name}",
+            "owner": ", ".join(owners) or None,
+            "node": spec.get("nodeName"),
+            "phase": status.get("phase"),
+            "reason": status.get("reason"),
+            "message": _short(status.get("message")),
+            "started": status.get("startTime"),
+            "labels": metadata.get("labels"),
+            "failing_conditions": _conditions(status),
+            "containers": containers or [{"name": n, **_container_resources(c)} for n, c in specs.items()],
+            "warnings": self._events(cluster, namespace, {name}),
+        }
+        return _dump({key: value for key, value in summary.items() if value})
+
+    def describe_workload(self, namespace: str, kind: str, name: str, cluster: str = "") -> str:
+        """Read a workload from the API server and summarize it with its pods."""
+        reader = WORKLOAD_KINDS.get(kind.lower())
+        if reader is None:
+            raise ValueError(f"Unsupported workload kind: {kind}")
+        _, apps_v1 = self.cluster_set.clients(cluster or None)
+        raw = _read_raw(getattr(apps_v1, reader), name, namespace)
+        spec, status = raw.get("spec") or {}, raw.get("status") or {}
+        template = (spec.get("template") or {}).get("spec") or {}
+        # Deployment pods are owned by a ReplicaSet named <deployment>-<pod-template-hash>,
+        # a plain prefix match would also pick up sibling deployments like <deployment>-api
+        replica_set = re.compile(rf"{re.escape(name)}-[a-z0-9]{{5,10}}")
+        pods = [
+            pod for pod in self._snapshot(cluster).pods_in(namespace)
+            if pod.owner == name or (reader == "read_namespaced_deployment" and replica_set.fullmatch(pod.owner))
+        ]
+        summary = {
+            "workload": f"{kind.lower()}/{namespace}/{name}",
+            "replicas": {
+                key: value for key, value in {
+                    "desired": spec.get("replicas", status.get("desiredNumberScheduled")),
+                    "ready": status.get("readyReplicas", status.get("numberReady", 0)),
+                    "updated": status.get("updatedReplicas", status.get("updatedNumberScheduled")),
+                    "available": status.get("availableReplicas", status.get("numberAvailable")),
+                    "unavailable": status.get("unavailableReplicas", status.get("numberUnavailable")),
+                }.items() if value is not None
+            },
+            "strategy": (spec.get("strategy") or spec.get("updateStrategy") or {}).get("type"),
+            "selector": (spec.get("selector") or {}).get("matchLabels"),
+            "failing_conditions": _conditions(status),
+            "containers": [
+                {"name": container["name"], "image": container.get("image"), **_container_resources(container)}
+                for container in template.get("containers") or []
+            ],
+            "pods": [
+                f"{pod.name}: {pod.reason or pod.phase or 'Unknown'}, {pod.restarts} restarts, node {pod.node or '-'}"
+                for pod in pods[:MAX_LIST_ITEMS]
+            ],
+            "warnings": self._events(cluster, namespace, {name, *(pod.name for pod in pods)}),
+        }
+        return _dump({key: value for key, value in summary.items() if value})
+
+    def tail_logs(self, namespace: str, pod: str, container: str = "", lines: int = 50,
+                  previous: bool = False, cluster: str = "") -> str:
+        """Tail a container log through the log viewer."""
+        lines = max(1, min(int(lines), MAX_LOG_LINES))
+        logs = self._tail_logs(namespace, pod, container, lines, previous, cluster or None)
+        return logs.strip() or "The log is empty"
+
+    def list_events(self, namespace: str = "", name: str = "", cluster: str = "") -> str:
+        """List aggregated warning events from the cluster cache."""
+        now = time.time()
+        lines = [
+            format_event_line(group, now)
+            for group in self._snapshot(cluster).events
+            if (not namespace or group.namespace == namespace) and (not name or name in group.name)
+        ]
+        return _limited(lines, MAX_LIST_ITEMS // 2)
+
+    def _events(self, cluster: str, namespace: str, names) -> List[str]:
+        """Warning event lines of some objects in a namespace."""
+        now = time.time()
+        return [
+            format_event_line(group, now)
+            for group in self._snapshot(cluster).events
+            if group.namespace == namespace and group.name in names
+        ][:MAX_LIST_ITEMS // 4]
@@ -0,0 +1,523 @@
+import json
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.context_builder import estimate_tokens
+from utils.k8s_snapshot import NO_RESOURCES, ClusterSnapshot, parse_quantity
+from utils.metrics import K8S_API_SECONDS, record_error, timed
+
+DEFAULT_CAPACITY = 60
+DEFAULT_INTERVAL = 15.0
+DEFAULT_MAX_PODS = 20000
+DEFAULT_MAX_NODES = 2000
+DEFAULT_TOP = 5
+DEFAULT_FACTS_TOKENS = 200
+# Usage/limit ratio from which a pod is reported as close to its limit
+NEAR_LIMIT = 0.8
+
+METRICS_GROUP = "metrics.k8s.io"
+METRICS_VERSION = "v1beta1"
+
+UsageSample = Tuple[List[str], np.ndarray, np.ndarray]
+
+
+# Usage values repeat a lot across pods and samples ("1m", "4Mi"), so parsed quantities are memoized
+_quantity = lru_cache(maxsize=8192)(parse_quantity)
+
+
+def parse_node_metrics(data: Dict) -> UsageSample:
+    """Parse a metrics.k8s.io NodeMetricsList.
+
+    Returns:
+        UsageSample: Node names, CPU usage in cores and memory usage in bytes
+    """
+    items = data.get("items") or []
+    names = []
+    cpu = np.zeros(len(items))
+    memory = np.zeros(len(items))
+    for index, item in enumerate(items):
+        names.append(item["metadata"]["name"])
+        usage = item.get("usage") or {}
+        cpu[index] = _quantity(usage.get("cpu"))
+        memory[index] = _quantity(usage.get("memory"))
+    return names, cpu, memory
+
+
+def parse_pod_metrics(data: Dict) -> UsageSample:
+    """Parse a metrics.k8s.io PodMetricsList, summing the containers of each pod.
+
+    Returns:
+        UsageSample: ``namespace/name`` keys, CPU usage in cores and memory usage in bytes
+    """
+    items = data.get("items") or []
+    keys = []
+    cpu = np.zeros(len(items))
+    memory = np.zeros(len(items))
+    for index, item in enumerate(items):
+        metadata = item["metadata"]
+        keys.append(f"{metadata.get('namespace', '')}/{metadata['name']}")
+        for container in item.get("containers") or []:
+            usage = container.get("usage") or {}
+            cpu[index] += _quantity(usage.get("cpu"))
+            memory[index] += _quantity(usage.get("memory"))
+    return keys, cpu, memory
+
+
+def fetch_metrics(custom_objects) -> Tuple[UsageSample, UsageSample]:
+    """List node and pod usage from the metrics API.
+
+    Args:
+        custom_objects: Kubernetes CustomObjectsApi client
+
+    Returns:
+        Tuple[UsageSample, UsageSample]: Node and pod usage
+    """
+    samples = []
+    for plural in ("nodes", "pods"):
+        with timed(K8S_API_SECONDS, operation=f"list_{plural}_metrics"):
+            resp = custom_objects.list_cluster_custom_object(
+                METRICS_GROUP, METRICS_VERSION, plural, _preload_content=False
+            )
+            try:
+                data = json.loads(resp.data)
+            finally:
+                resp.release_conn()
+        samples.append(parse_node_metrics(data) if plural == "nodes" else parse_pod_metrics(data))
+    return samples[0], samples[1]
+
+
+def format_cpu(cores: float) -> str:
+    """Format CPU cores like kubectl top (``250m``, ``1.5``)."""
+    if not np.isfinite(cores):
+        return "-"
+    return f"{cores * 1000:.0f}m" if cores < 1 else f"{cores:.2f}"
+
+
+def format_memory(size: float) -> str:
+    """Format bytes in binary units (``512Mi``, ``1.5Gi``)."""
+    if not np.isfinite(size):
+        return "-"
+    for unit, factor in (("Gi", 2 ** 30), ("Mi", 2 ** 20), ("Ki", 2 ** 10)):
+        if size >= factor:
+            return f"{size / factor:.1f}{unit}" if unit == "Gi" else f"{size / factor:.0f}{unit}"
+    return f"{size:.0f}"
+
+
+def row_percentiles(values: np.ndarray, percentiles: List[float]) -> np.ndarray:
+    """Percentiles of each row ignoring NaN, with linear interpolation like ``np.percentile``.
+
+    ``np.nanpercentile`` falls back to a Python loop over the rows when any
+    value is NaN; sorting once moves the NaN to the end of every row, so all
+    rows are interpolated with array operations.
+
+    Args:
+        values (np.ndarray): 2-D array, one series per row
+        percentiles (List[float]): Percentiles between 0 and 100
+
+    Returns:
+        np.ndarray: Array of shape (len(percentiles), rows), NaN for rows without values
+    """
+    ordered = np.sort(values, axis=1)
+    counts = np.count_nonzero(~np.isnan(values), axis=1)
+    result = np.full((len(percentiles), len(values)), np.nan)
+    valid = counts > 0
+    ordered, last = ordered[valid], counts[valid] - 1
+    for index, percentile in enumerate(percentiles):
+        position = last * (percentile / 100.0)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, last)
+        low_values = np.take_along_axis(ordered, low[:, None], axis=1)[:, 0]
+        high_values = np.take_along_axis(ordered, high[:, None], axis=1)[:, 0]
+        result[index, valid] = low_values + (high_values - low_values) * (position - low)
+    return result
+
+
+def _pod_row(stats: Dict, index: int) -> Dict:
+    """Pick one pod out of the column arrays of ``UsageSampler._pod_stats``."""
+    return {name: values[index] if name == "pod" else float(values[index]) for name, values in stats.items()}
+
+
+class _Series:
+    """Ring buffers of CPU and memory usage, one row per object and one column per sample."""
+
+    def __init__(self, rows: int, capacity: int):
+        self.cpu = np.full((rows, capacity), np.nan, dtype=np.float32)
+        self.memory = np.full((rows, capacity), np.nan, dtype=np.float32)
+        self.last_sample = np.full(rows, -1, dtype=np.int64)
+        self.keys: List[Optional[str]] = [None] * rows
+        self.rows: Dict[str, int] = {}
+        self._free = list(range(rows - 1, -1, -1))
+
+    def assign(self, keys: List[str]) -> np.ndarray:
+        """Get the rows of the keys, allocating rows for new ones; -1 if the buffer is full."""
+        rows = np.empty(len(keys), dtype=np.int64)
+        for index, key in enumerate(keys):
+            row = self.rows.get(key)
+            if row is None:
+                if not self._free:
+                    rows[index] = -1
+                    continue
+                row = self._free.pop()
+                self.rows[key] = row
+                self.keys[row] = key
+            rows[index] = row
+        return rows
+
+    def write(self, column: int, sample: int, keys: List[str], cpu: np.ndarray, memory: np.ndarray) -> None:
+        """Store one sample in a column, objects missing from it get NaN."""
+        self.cpu[:, column] = np.nan
+        self.memory[:, column] = np.nan
+        rows = self.assign(keys)
+        stored = rows >= 0
+        rows = rows[stored]
+        self.cpu[rows, column] = cpu[stored]
+        self.memory[rows, column] = memory[stored]
+        self.last_sample[rows] = sample
+
+    def expire(self, oldest_sample: int) -> None:
+        """Free the rows of objects not seen since before the oldest sample in the window."""
+        for row in np.nonzero((self.last_sample >= 0) & (self.last_sample < oldest_sample))[0].tolist():
+            del self.rows[self.keys[row]]
+            self.keys[row] = None
+            self.last_sample[row] = -1
+            # A pod that gets the row later must not inherit this history
+            self.cpu[row] = np.nan
+            self.memory[row] = np.nan
+            self._free.append(row)
+
+    def used(self) -> np.ndarray:
+        """Indices of the rows holding an object."""
+        return np.nonzero(self.last_sample >= 0)[0]
+
+    def resize(self, columns: List[int], capacity: int, first_sample: int) -> None:
+        """Keep the given columns, oldest first, in buffers of a new capacity.
+
+        Args:
+            columns (List[int]): Columns of the kept samples, oldest first
+            capacity (int): New number of columns
+            first_sample (int): Number of the oldest kept sample, it becomes sample 0
+        """
+        self.expire(first_sample)
+        for name in ("cpu", "memory"):
+            values = np.full((len(self.keys), capacity), np.nan, dtype=np.float32)
+            values[:, :len(columns)] = getattr(self, name)[:, columns]
+            setattr(self, name, values)
+        used = self.used()
+        self.last_sample[used] -= first_sample
+
+
+class UsageSampler:
+    """Background sampler of node and pod usage from the metrics API.
+
+    Each sample is written as one column of fixed-size NumPy ring buffers
+    (objects x samples), so memory does not grow with uptime. Rolling
+    percentiles, usage/request and usage/limit ratios and the top-N
+    hotspots are computed with array operations across all pods at once.
+    Requests, limits and allocatable capacity come from the cluster cache.
+    """
+
+    def __init__(self, fetch: Callable[[], Tuple[UsageSample, UsageSample]],
+                 snapshot: Optional[Callable[[], ClusterSnapshot]] = None, capacity: int = DEFAULT_CAPACITY,
+                 interval: float = DEFAULT_INTERVAL, max_pods: int = DEFAULT_MAX_PODS,
+                 max_nodes: int = DEFAULT_MAX_NODES):
+        """Initialize the sampler.
+
+        Args:
+            fetch (Callable): Returns the current node and pod usage, e.g. ``fetch_metrics``
+            snapshot (Optional[Callable[[], ClusterSnapshot]]): Returns the cluster state with requests and limits
+            capacity (int): Number of samples kept per object
+            interval (float): Seconds between samples
+            max_pods (int): Maximum number of pods tracked
+            max_nodes (int): Maximum number of nodes tracked
+        """
+        self.fetch = fetch
+        self.snapshot = snapshot
+        self.capacity = capacity
+        self.interval = interval
+        self.samples = 0
+        self.last_error: Optional[str] = None
+        self.times = np.full(capacity, np.nan, dtype=np.float64)
+        self.nodes = _Series(max_nodes, capacity)
+        self.pods = _Series(max_pods, capacity)
+        # (cpu request, cpu limit, memory request, memory limit) and (cpu, memory) allocatable per row
+        self.pod_resources = np.zeros((max_pods, 4), dtype=np.float64)
+        self.node_allocatable = np.zeros((max_nodes, 2), dtype=np.float64)
+        self._hotspots: Optional[Tuple[Tuple[int, int], Dict]] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="usage-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self._stop_event.set()
+
+    def resize(self, capacity: int) -> None:
+        """Change the number of samples kept, keeping the newest ones.
+
+        Args:
+            capacity (int): Number of samples kept per object
+        """
+        with self._lock:
+            if capacity == self.capacity:
+                return
+            kept = min(self.samples, self.capacity, capacity)
+            first_sample = self.samples - kept
+            columns = [(first_sample + i) % self.capacity for i in range(kept)]
+            times = np.full(capacity, np.nan, dtype=np.float64)
+            times[:kept] = self.times[columns]
+            self.times = times
+            self.nodes.resize(columns, capacity, first_sample)
+            self.pods.resize(columns, capacity, first_sample)
+            self.capacity = capacity
+            self.samples = kept
+            self._hotspots = None
+
+    def _run(self) -> None:
+        """Sample until stopped; errors (e.g. no metrics-server) are kept and retried."""
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+                self.last_error = None
+            except Exception as e:
+                record_error("usage_sampler", e)
+                self.last_error = f"Error reading resource metrics: {str(e)}"
+            self._stop_event.wait(self.interval)
+
+    def sample(self, now: Optional[float] = None) -> None:
+        """Fetch and store one sample of node and pod usage.
+
+        Args:
+            now (Optional[float]): Epoch time of the sample, defaults to the wall clock
+        """
+        (node_names, node_cpu, node_memory), (pod_keys, pod_cpu, pod_memory) = self.fetch()
+        snapshot = self.snapshot() if self.snapshot is not None else None
+        with self._lock:
+            column = self.samples % self.capacity
+            self.times[column] = time.time() if now is None else now
+            self.nodes.write(column, self.samples, node_names, node_cpu, node_memory)
+            self.pods.write(column, self.samples, pod_keys, pod_cpu, pod_memory)
+            self.samples += 1
+            self.nodes.expire(self.samples - self.capacity)
+            self.pods.expire(self.samples - self.capacity)
+            if snapshot is not None:
+                self._update_resources(snapshot)
+
+    def _update_resources(self, snapshot: ClusterSnapshot) -> None:
+        """Copy requests, limits and allocatable capacity into row-aligned arrays. Must hold the lock."""
+        resources = {f"{pod.namespace}/{pod.name}": pod.resources for pod in snapshot.pods}
+        rows = self.pods.used()
+        self.pod_resources[rows] = [resources.get(self.pods.keys[row], NO_RESOURCES) for row in rows]
+        allocatable = {node.name: (node.cpu_allocatable, node.memory_allocatable) for node in snapshot.nodes}
+        rows = self.nodes.used()
+        self.node_allocatable[rows] = [allocatable.get(self.nodes.keys[row], (0.0, 0.0)) for row in rows]
+
+    def _pod_stats(self, rows: np.ndarray, latest: int) -> Dict:
+        """Rolling statistics and usage ratios of some pod rows. Must hold the lock."""
+        cpu, memory = self.pods.cpu[rows], self.pods.memory[rows]
+        resources = self.pod_resources[rows]
+        cpu_p50, cpu_p95 = row_percentiles(cpu, [50, 95])
+        stats = {
+            "pod": [self.pods.keys[row] for row in rows],
+            "cpu": cpu[:, latest], "cpu_p50": cpu_p50, "cpu_p95": cpu_p95,
+            "memory": memory[:, latest], "memory_p95": row_percentiles(memory, [95])[0],
+            "cpu_request": resources[:, 0], "cpu_limit": resources[:, 1],
+            "memory_request": resources[:, 2], "memory_limit": resources[:, 3],
+        }
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Unset requests and limits are 0 and give inf/NaN ratios, which are never ranked
+            stats["cpu_limit_ratio"] = stats["cpu_p95"] / stats["cpu_limit"]
+            stats["memory_limit_ratio"] = stats["memory"] / stats["memory_limit"]
+            stats["cpu_request_ratio"] = stats["cpu_p95"] / stats["cpu_request"]
+            stats["memory_request_ratio"] = stats["memory"] / stats["memory_request"]
+        return stats
+
+    def hotspots(self, top: int = DEFAULT_TOP) -> Dict:
+        """Compute rolling statistics and the top-N hotspots.
+
+        The result only changes with a new sample, so it is cached until then.
+
+        Args:
+            top (int): Number of objects per ranking
+
+        Returns:
+            Dict: Window, busiest nodes and pod rankings (top CPU, top memory, near limits, over requests)
+        """
+        with self._lock:
+            if not self.samples:
+                return {}
+            if self._hotspots is not None and self._hotspots[0] == (self.samples, top):
+                return self._hotspots[1]
+            filled = min(self.samples, self.capacity)
+            latest = (self.samples - 1) % self.capacity
+            window = float(np.nanmax(self.times) - np.nanmin(self.times)) if filled > 1 else 0.0
+            pods = self._pod_stats(self.pods.used(), latest)
+            node_rows = self.nodes.used()
+            node_cpu, node_memory = self.nodes.cpu[node_rows], self.nodes.memory[node_rows]
+            allocatable = self.node_allocatable[node_rows]
+            node_keys = [self.nodes.keys[row] for row in node_rows]
+            key = (self.samples, top)
+
+        node_cpu_p95, node_memory_p95 = row_percentiles(node_cpu, [95])[0], row_percentiles(node_memory, [95])[0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            node_cpu_ratio = node_cpu[:, latest] / allocatable[:, 0]
+            node_memory_ratio = node_memory[:, latest] / allocatable[:, 1]
+            node_cpu_p95_ratio = node_cpu_p95 / allocatable[:, 0]
+
+        def rank(values: np.ndarray, minimum: float = 0.0) -> List[int]:
+            """Indices of the largest finite values above a minimum, largest first."""
+            values = np.where(np.isfinite(values) & (values > minimum), values, -np.inf)
+            count = min(top, int(np.isfinite(values).sum()))
+            if not count:
+                return []
+            candidates = np.argpartition(-values, count - 1)[:count]
+            return candidates[np.argsort(-values[candidates])].tolist()
+
+        node_pressure = np.fmax(node_cpu_ratio, node_memory_ratio)
+        result = {
+            "samples": filled,
+            "window_seconds": window,
+            "nodes": [
+                {
+                    "node": node_keys[index],
+                    "cpu": float(node_cpu[index, latest]), "cpu_p95": float(node_cpu_p95[index]),
+                    "memory": float(node_memory[index, latest]), "memory_p95": float(node_memory_p95[index]),
+                    "cpu_ratio": float(node_cpu_ratio[index]), "cpu_p95_ratio": float(node_cpu_p95_ratio[index]),
+                    "memory_ratio": float(node_memory_ratio[index]),
+                }
+                for index in rank(node_pressure if np.isfinite(node_pressure).any() else node_cpu[:, latest])
+            ],
+            "top_cpu": [_pod_row(pods, index) for index in rank(pods["cpu"])],
+            "top_memory": [_pod_row(pods, index) for index in rank(pods["memory"])],
+            "near_memory_limit": [_pod_row(pods, index) for index in rank(pods["memory_limit_ratio"], NEAR_LIMIT)],
+            "near_cpu_limit": [_pod_row(pods, index) for index in rank(pods["cpu_limit_ratio"], NEAR_LIMIT)],
+            "over_cpu_request": [_pod_row(pods, index) for index in rank(pods["cpu_request_ratio"], 1.0)],
+        }
+        with self._lock:
+            self._hotspots = (key, result)
+        return result
+
+    def pod_usage(self, names: Set[str]) -> List[Dict]:
+        """Get the usage statistics of pods by name.
+
+        Args:
+            names (Set[str]): Pod names, without namespace
+
+        Returns:
+            List[Dict]: Statistics of the matching pods in any namespace
+        """
+        with self._lock:
+            if not self.samples or not names:
+                return []
+            rows = np.array([row for key, row in self.pods.rows.items() if key.rsplit("/", 1)[-1] in names],
+                            dtype=np.int64)
+            if not len(rows):
+                return []
+            pods = self._pod_stats(rows, (self.samples - 1) % self.capacity)
+        return [_pod_row(pods, index) for index in range(len(rows))]
+
+    def facts(self, terms: Optional[Set[str]] = None, token_budget: int = DEFAULT_FACTS_TOKENS) -> str:
+        """Render the hotspots as compact facts for the chat's system prompt.
+
+        Args:
+            terms (Optional[Set[str]]): Lowercase terms of the question; usage of pods named in it comes first
+            token_budget (int): Approximate maximum number of tokens
+
+        Returns:
+            str: One line per finding, empty if no usage has been sampled
+        """
+        stats = self.hotspots()
+        if not stats:
+            return ""
+        header = f"Resource usage (last {stats['window_seconds'] / 60:.0f}m, {stats['samples']} samples):"
+        lines = []
+        for pod in self.pod_usage(terms or set()):
+            lines.append(f"- {pod['pod']}: CPU {format_cpu(pod['cpu'])} (p95 {format_cpu(pod['cpu_p95'])}"
+                         + (f", limit {format_cpu(pod['cpu_limit'])}" if pod["cpu_limit"] else "")
+                         + f"), memory {format_memory(pod['memory'])}"
+                         + (f" of {format_memory(pod['memory_limit'])} limit" if pod["memory_limit"] else ""))
+        if stats["nodes"]:
+            lines.append("- Busiest nodes: " + "; ".join(
+                f"{node['node']} CPU {node['cpu_ratio']:.0%} (p95 {node['cpu_p95_ratio']:.0%}), "
+                f"memory {node['memory_ratio']:.0%}" if np.isfinite(node["cpu_ratio"])
+                else f"{node['node']} CPU {format_cpu(node['cpu'])}, memory {format_memory(node['memory'])}"
+                for node in stats["nodes"][:3]
+            ))
+        if stats["near_memory_limit"]:
+            lines.append("- Near memory limit (OOM risk): " + ", ".join(
+                f"{pod['pod']} {format_memory(pod['memory'])}/{format_memory(pod['memory_limit'])} "
+                f"({pod['memory_limit_ratio']:.0%})" for pod in stats["near_memory_limit"]
+            ))
+        if stats["near_cpu_limit"]:
+            lines.append("- Near CPU limit at p95 (throttling): " + ", ".join(
+                f"{pod['pod']} {format_cpu(pod['cpu_p95'])}/{format_cpu(pod['cpu_limit'])}"
+                for pod in stats["near_cpu_limit"]
+            ))
+        if stats["over_cpu_request"]:
+            lines.append("- Above CPU request at p95: " + ", ".join(
+                f"{pod['pod']} {pod['cpu_request_ratio']:.1f}x" for pod in stats["over_cpu_request"]
+            ))
+        lines.append("- Top CPU: " + ", ".join(
+            f"{pod['pod']} {format_cpu(pod['cpu'])}" for pod in stats["top_cpu"]
+        ))
+        lines.append("- Top memory: " + ", ".join(
+            f"{pod['pod']} {format_memory(pod['memory'])}" for pod in stats["top_memory"]
+        ))
+        result, used = [header], estimate_tokens(header)
+        for line in lines:
+            cost = estimate_tokens(line) + 1
+            if used + cost > token_budget:
+                break
+            result.append(line)
+            used += cost
+        return "\n".join(result) if len(result) > 1 else ""
+
+
+_usage_sampler: Optional[UsageSampler] = None
+_usage_sampler_lock = threading.Lock()
+
+
+def get_usage_sampler(capacity: Optional[int] = None, interval: Optional[float] = None) -> UsageSampler:
+    """Get the process-wide usage sampler of the current context, starting it on first use.
+
+    Args:
+        capacity (Optional[int]): Number of samples kept, applied on every call that passes it;
+            callers without a setting keep the current value
+        interval (Optional[float]): Seconds between samples, applied the same way
+
+    Returns:
+        UsageSampler: The shared sampler
+    """
+    global _usage_sampler
+    with _usage_sampler_lock:
+        if _usage_sampler is None:
+            from kubernetes import client
+            from utils.k8s_cache import get_cluster_cache
+
+            # Loads the kube config, so the client below talks to the current context
+            cache = get_cluster_cache()
+            custom_objects = client.CustomObjectsApi()
+            _usage_sampler = UsageSampler(
+                lambda: fetch_metrics(custom_objects),
+                snapshot=cache.snapshot,
+                capacity=DEFAULT_CAPACITY if capacity is None else capacity,
+                interval=DEFAULT_INTERVAL if interval is None else interval
+            )
+            _usage_sampler.start()
+        else:
+            if capacity is not None:
+                _usage_sampler.resize(capacity)
+            if interval is not None:
+                _usage_sampler.interval = interval
+        return _usage_sampler
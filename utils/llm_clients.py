@@ -0,0 +1,96 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+_clients: Dict[Tuple[str, str, Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _http_limits(max_connections: int, max_keepalive: int):
+    """Build the connection pool limits shared by all provider clients."""
+    import httpx
+
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY
+    )
+
+
+def get_async_openai_client(api_key: str, base_url: Optional[str] = None,
+                            max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                            max_keepalive: int = DEFAULT_MAX_KEEPALIVE):
+    """Get a shared async OpenAI client for an API key.
+
+    Clients are created once per key and reused across requests, so all chat
+    sessions share one pool of keep-alive HTTP connections.
+
+    Args:
+        api_key (str): The provider API key
+        base_url (Optional[str]): Base URL of an OpenAI-compatible endpoint
+        max_connections (int): Maximum number of concurrent connections in the pool
+        max_keepalive (int): Maximum number of idle keep-alive connections
+
+    Returns:
+        openai.AsyncOpenAI: The shared client
+    """
+    # Imported on first use, the SDK takes most of a second to import
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    with _clients_lock:
+        key = ("openai", api_key, base_url)
+        client = _clients.get(key)
+        if client is None:
+            http_client = DefaultAsyncHttpxClient(limits=_http_limits(max_connections, max_keepalive))
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            _clients[key] = client
+        return client
+
+
+def get_async_anthropic_client(api_key: str, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                               max_keepalive: int = DEFAULT_MAX_KEEPALIVE):
+    """Get a shared async Anthropic client for an API key.
+
+    Args:
+        api_key (str): The provider API key
+        max_connections (int): Maximum number of concurrent connections in the pool
+        max_keepalive (int): Maximum number of idle keep-alive connections
+
+    Returns:
+        anthropic.AsyncAnthropic: The shared client
+    """
+    from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient as AnthropicHttpxClient
+
+    with _clients_lock:
+        key = ("anthropic", api_key, None)
+        client = _clients.get(key)
+        if client is None:
+            http_client = AnthropicHttpxClient(limits=_http_limits(max_connections, max_keepalive))
+            client = AsyncAnthropic(api_key=api_key, http_client=http_client)
+            _clients[key] = client
+        return client
+
+
+def get_google_model(api_key: str, model: str, system_instruction: Optional[str] = None):
+    """Get a Google Generative AI model bound to an API key.
+
+    Args:
+        api_key (str): The provider API key
+        model (str): The model name
+        system_instruction (Optional[str]): System prompt for the model
+
+    Returns:
+        google.generativeai.GenerativeModel: The model
+    """
+    import google.generativeai as genai
+
+    with _clients_lock:
+        # The SDK keeps its transport globally, so only configure on key changes
+        key = ("google", "", None)
+        if _clients.get(key) != api_key:
+            genai.configure(api_key=api_key)
+            _clients[key] = api_key
+    return genai.GenerativeModel(model, system_instruction=system_instruction or None)
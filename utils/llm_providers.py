@@ -0,0 +1,396 @@
+import abc
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from utils.context_builder import CHARS_PER_TOKEN, estimate_tokens
+from utils.json_utils import AIProviderConfig
+from utils.llm_clients import get_async_anthropic_client, get_async_openai_client, get_google_model
+from utils.metrics import LLM_FIRST_TOKEN_SECONDS, LLM_REQUEST_SECONDS, LLM_TOKENS, record_error
+
+# System, user and assistant messages have a text "content". An assistant
+# message may also carry "tool_calls", answered by "tool" messages with the
+# "tool_call_id" and the result as "content".
+Message = Dict[str, Any]
+
+ANTHROPIC_MAX_TOKENS = 4096
+
+
+class ProviderError(Exception):
+    """Raised when no provider could produce a response."""
+
+
+class ToolCall:
+    """A function call requested by the model."""
+
+    __slots__ = ("id", "name", "arguments")
+
+    def __init__(self, id: str, name: str, arguments: Optional[Dict] = None):
+        """Initialize the call.
+
+        Args:
+            id (str): The provider's call ID, sent back with the result
+            name (str): The tool name
+            arguments (Optional[Dict]): The parsed arguments, None if the model sent invalid JSON
+        """
+        self.id = id
+        self.name = name
+        self.arguments = arguments
+
+    def __repr__(self) -> str:
+        return f"ToolCall({self.name}, {self.arguments})"
+
+
+def _parse_arguments(text: str) -> Optional[Dict]:
+    """Parse the JSON arguments of a tool call, None if they are invalid."""
+    try:
+        arguments = json.loads(text or "{}")
+    except ValueError:
+        return None
+    return arguments if isinstance(arguments, dict) else None
+
+
+def _split_system(messages: List[Message]) -> Tuple[str, List[Message]]:
+    """Separate system messages from the conversation for APIs that take them apart."""
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+    return system, [m for m in messages if m["role"] != "system"]
+
+
+def _openai_messages(messages: List[Message]) -> List[Dict]:
+    """Convert tool calls and results to the Chat Completions format."""
+    converted = []
+    for m in messages:
+        if m.get("tool_calls"):
+            converted.append({
+                "role": "assistant",
+                "content": m.get("content") or None,
+                "tool_calls": [
+                    {"id": call.id, "type": "function",
+                     "function": {"name": call.name, "arguments": json.dumps(call.arguments or {})}}
+                    for call in m["tool_calls"]
+                ]
+            })
+        elif m["role"] == "tool":
+            converted.append({"role": "tool", "tool_call_id": m["tool_call_id"], "content": m["content"]})
+        else:
+            converted.append({"role": m["role"], "content": m["content"]})
+    return converted
+
+
+def _anthropic_messages(messages: List[Message]) -> List[Dict]:
+    """Convert tool calls to tool_use blocks and consecutive tool results to one user turn."""
+    converted = []
+    for m in messages:
+        if m.get("tool_calls"):
+            content = [{"type": "text", "text": m["content"]}] if m.get("content") else []
+            content += [{"type": "tool_use", "id": call.id, "name": call.name, "input": call.arguments or {}}
+                        for call in m["tool_calls"]]
+            converted.append({"role": "assistant", "content": content})
+        elif m["role"] == "tool":
+            result = {"type": "tool_result", "tool_use_id": m["tool_call_id"], "content": m["content"]}
+            if converted and converted[-1]["role"] == "user" and isinstance(converted[-1]["content"], list):
+                converted[-1]["content"].append(result)
+            else:
+                converted.append({"role": "user", "content": [result]})
+        else:
+            converted.append({"role": m["role"], "content": m["content"]})
+    return converted
+
+
+class LLMProvider(abc.ABC):
+    """Base class for chat providers that stream text deltas."""
+
+    # Whether ``stream`` accepts tools and yields ``ToolCall`` objects
+    supports_tools = False
+
+    def __init__(self, name: str, api_key: str, options: Optional[Dict] = None):
+        """Initialize the provider.
+
+        Args:
+            name (str): The provider name from ai_providers.json
+            api_key (str): The provider API key
+            options (Optional[Dict]): The provider's configuration entry
+        """
+        self.name = name
+        self.api_key = api_key
+        self.options = options or {}
+
+    @abc.abstractmethod
+    def stream(self, model: str, messages: List[Message],
+               tools: Optional[List[Dict]] = None) -> AsyncIterator[Union[str, ToolCall]]:
+        """Stream the response to a conversation, implemented as an async generator.
+
+        Args:
+            model (str): The model name
+            messages (List[Message]): System, user, assistant and tool messages
+            tools (Optional[List[Dict]]): Functions the model may call, as ``name``,
+                ``description`` and JSON schema ``parameters``; only used if ``supports_tools``
+
+        Yields:
+            Union[str, ToolCall]: Text deltas of the response, then the requested tool calls
+        """
+
+
+class OpenAIProvider(LLMProvider):
+    """Provider for OpenAI and OpenAI-compatible endpoints."""
+
+    supports_tools = True
+
+    async def stream(self, model: str, messages: List[Message],
+                     tools: Optional[List[Dict]] = None) -> AsyncIterator[Union[str, ToolCall]]:
+        client = get_async_openai_client(self.api_key, base_url=self.options.get("base_url"))
+        kwargs = {}
+        if tools:
+            kwargs["tools"] = [{"type": "function", "function": tool} for tool in tools]
+        stream = await client.chat.completions.create(
+            model=model, messages=_openai_messages(messages), stream=True, **kwargs
+        )
+        # Tool calls arrive as fragments keyed by their index
+        calls: Dict[int, Dict[str, str]] = {}
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    yield delta.content
+                for fragment in getattr(delta, "tool_calls", None) or []:
+                    call = calls.setdefault(fragment.index, {"id": "", "name": "", "arguments": ""})
+                    call["id"] = fragment.id or call["id"]
+                    if fragment.function is not None:
+                        call["name"] += fragment.function.name or ""
+                        call["arguments"] += fragment.function.arguments or ""
+        finally:
+            await stream.close()
+        for index in sorted(calls):
+            call = calls[index]
+            yield ToolCall(call["id"], call["name"], _parse_arguments(call["arguments"]))
+
+
+class AnthropicProvider(LLMProvider):
+    """Provider for the Anthropic Messages API."""
+
+    supports_tools = True
+
+    async def stream(self, model: str, messages: List[Message],
+                     tools: Optional[List[Dict]] = None) -> AsyncIterator[Union[str, ToolCall]]:
+        client = get_async_anthropic_client(self.api_key)
+        system, conversation = _split_system(messages)
+        kwargs = {}
+        if tools:
+            kwargs["tools"] = [
+                {"name": tool["name"], "description": tool["description"], "input_schema": tool["parameters"]}
+                for tool in tools
+            ]
+        async with client.messages.stream(
+            model=model,
+            max_tokens=self.options.get("max_tokens", ANTHROPIC_MAX_TOKENS),
+            system=system,
+            messages=_anthropic_messages(conversation),
+            **kwargs
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+            if tools:
+                message = await stream.get_final_message()
+                for block in message.content:
+                    if block.type == "tool_use":
+                        yield ToolCall(block.id, block.name, block.input if isinstance(block.input, dict) else None)
+
+
+class GoogleProvider(LLMProvider):
+    """Provider for Google Gemini models, without tool calling."""
+
+    async def stream(self, model: str, messages: List[Message],
+                     tools: Optional[List[Dict]] = None) -> AsyncIterator[Union[str, ToolCall]]:
+        system, conversation = _split_system(messages)
+        generative_model = get_google_model(self.api_key, model, system)
+        contents = [
+            {"role": "model" if m["role"] == "assistant" else "user", "parts": [m["content"]]}
+            for m in conversation
+        ]
+        response = await generative_model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+
+
+PROVIDER_CLASSES = {
+    "openai": OpenAIProvider,
+    "anthropic": AnthropicProvider,
+    "google": GoogleProvider,
+}
+
+
+def create_provider(name: str, api_key: str, config: AIProviderConfig) -> LLMProvider:
+    """Create the native provider client for a configured provider.
+
+    Args:
+        name (str): The provider name from ai_providers.json
+        api_key (str): The provider API key
+        config (AIProviderConfig): The provider configuration
+
+    Returns:
+        LLMProvider: The provider
+
+    Raises:
+        ProviderError: If the provider's client type is not supported
+    """
+    options = config.get_provider(name)
+    provider_class = PROVIDER_CLASSES.get(options.get("client", name.lower()))
+    if provider_class is None:
+        raise ProviderError(f"Unsupported AI provider: {name}")
+    return provider_class(name, api_key, options)
+
+
+def _size(item: Union[str, ToolCall]) -> int:
+    """Characters of a streamed item, for the completion token estimate."""
+    if isinstance(item, ToolCall):
+        return len(item.name) + len(json.dumps(item.arguments or {}))
+    return len(item)
+
+
+def parse_targets(spec: str) -> List[Tuple[str, str]]:
+    """Parse a ``Provider:model,Provider:model`` fallback list.
+
+    Args:
+        spec (str): Comma separated provider/model pairs
+
+    Returns:
+        List[Tuple[str, str]]: (provider, model) pairs in order
+    """
+    targets = []
+    for item in spec.split(","):
+        provider, _, model = item.strip().partition(":")
+        if provider and model:
+            targets.append((provider.strip(), model.strip()))
+    return targets
+
+
+class ProviderRouter:
+    """Streams a response from an ordered list of provider/model targets.
+
+    If a target fails before producing its first token (errors, rate limits)
+    the next one is tried. With ``hedge_after`` set, the next target is also
+    started when the current one has not produced a token within that many
+    seconds, and whichever answers first is used.
+
+    The latency, time to first token and estimated token counts of every
+    response are recorded in the metrics, labelled with the target that
+    answered.
+    """
+
+    def __init__(self, targets: List[Tuple[LLMProvider, str]], hedge_after: Optional[float] = None):
+        """Initialize the router.
+
+        Args:
+            targets (List[Tuple[LLMProvider, str]]): (provider, model) pairs in preference order
+            hedge_after (Optional[float]): Seconds before sending a hedged request, None to disable
+        """
+        self.targets = targets
+        self.hedge_after = hedge_after
+
+    @property
+    def supports_tools(self) -> bool:
+        """Whether every target can call tools, so a fallback can continue a tool conversation."""
+        return all(provider.supports_tools for provider, _ in self.targets)
+
+    async def stream(self, messages: List[Message],
+                     tools: Optional[List[Dict]] = None) -> AsyncIterator[Union[str, ToolCall]]:
+        """Stream the response of the first target that answers.
+
+        Args:
+            messages (List[Message]): System, user, assistant and tool messages
+            tools (Optional[List[Dict]]): Functions the model may call, see ``LLMProvider.stream``
+
+        Yields:
+            Union[str, ToolCall]: Text deltas of the response, then the requested tool calls
+
+        Raises:
+            ProviderError: If every target failed
+        """
+        request_started = time.perf_counter()
+        pending = list(self.targets)
+        errors: List[str] = []
+        while pending:
+            result, started = await self._first_response(pending, messages, errors, tools)
+            if result is None:
+                pending = [target for target in pending if target not in started]
+                continue
+            iterator, first, (provider, model) = result
+            completion_chars = 0
+            try:
+                if first is not None:
+                    completion_chars += _size(first)
+                    yield first
+                async for item in iterator:
+                    completion_chars += _size(item)
+                    yield item
+            finally:
+                await iterator.aclose()
+                labels = {"provider": provider.name, "model": model}
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - request_started, **labels)
+                prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+                LLM_TOKENS.inc(prompt_tokens, kind="prompt", **labels)
+                completion_tokens = (completion_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+                LLM_TOKENS.inc(completion_tokens, kind="completion", **labels)
+            return
+        raise ProviderError("All AI providers failed: " + "; ".join(errors))
+
+    async def _start(self, target: Tuple[LLMProvider, str], messages: List[Message],
+                     tools: Optional[List[Dict]] = None) -> Tuple[AsyncIterator, Optional[Any], Tuple[LLMProvider, str]]:
+        """Start a stream and wait for its first token."""
+        provider, model = target
+        started = time.perf_counter()
+        stream = provider.stream(model, messages, tools)
+        iterator = stream.__aiter__()
+        try:
+            first = await iterator.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except BaseException:
+            # Failed or lost the race, e.g. cancelled as a hedge, release the connection now
+            await iterator.aclose()
+            raise
+        LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started, provider=provider.name, model=model)
+        return iterator, first, target
+
+    async def _first_response(self, pending: List[Tuple[LLMProvider, str]], messages: List[Message],
+                              errors: List[str], tools: Optional[List[Dict]] = None):
+        """Race the pending targets, hedging after a delay, until one produces a token.
+
+        Returns:
+            Tuple: The winning (iterator, first token, target) or None, and the targets that were started
+        """
+        started = [pending[0]]
+        tasks = {asyncio.ensure_future(self._start(pending[0], messages, tools)): pending[0]}
+        try:
+            while tasks:
+                can_hedge = self.hedge_after is not None and len(started) < len(pending)
+                done, _ = await asyncio.wait(
+                    tasks,
+                    timeout=self.hedge_after if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # The running requests are slow, send a hedged one to the next target
+                    target = pending[len(started)]
+                    started.append(target)
+                    tasks[asyncio.ensure_future(self._start(target, messages, tools))] = target
+                    continue
+                for task in done:
+                    provider, model = tasks.pop(task)
+                    if task.exception() is None:
+                        return task.result(), started
+                    record_error("llm", task.exception())
+                    errors.append(f"{provider.name} ({model}): {task.exception()}")
+            return None, started
+        finally:
+            # Cancel the losers and wait for them, so a stream that was opened
+            # anyway (e.g. it tied with the winner) is closed here and not by GC
+            for task in tasks:
+                task.cancel()
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, tuple):
+                    await result[0].aclose()
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import time
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Union
+
+from utils.llm_providers import Message, ProviderRouter, ToolCall
+from utils.metrics import LLM_TOOL_SECONDS, record_error
+from utils.response_cache import ResponseCache
+
+DEFAULT_MAX_RESULT_CHARS = 4000
+DEFAULT_TOOL_TIMEOUT = 15.0
+DEFAULT_CACHE_TTL = 30.0
+DEFAULT_MAX_ROUNDS = 4
+
+
+class Tool:
+    """A read-only function the model can call."""
+
+    def __init__(self, name: str, description: str, parameters: Dict, handler: Callable[..., str]):
+        """Initialize the tool.
+
+        Args:
+            name (str): The function name shown to the model
+            description (str): What the function returns and when to use it
+            parameters (Dict): JSON schema of the keyword arguments
+            handler (Callable[..., str]): Blocking function called with the arguments, returns text
+        """
+        self.name = name
+        self.description = description
+        self.parameters = parameters
+        self.handler = handler
+
+    def schema(self) -> Dict:
+        """The provider-neutral definition passed to ``ProviderRouter.stream``."""
+        return {"name": self.name, "description": self.description, "parameters": self.parameters}
+
+
+class ToolSet:
+    """Executes the tool calls of a model turn.
+
+    All calls of one turn run in parallel on worker threads, each with a
+    timeout. Results are cut to ``max_result_chars`` so a large object or
+    log cannot blow up the prompt, and successful results are cached for
+    ``cache_ttl`` seconds, so the same lookup in a follow-up question does
+    not hit the API server again. Errors are returned to the model as text
+    instead of failing the response.
+    """
+
+    def __init__(self, tools: Iterable[Tool], max_result_chars: int = DEFAULT_MAX_RESULT_CHARS,
+                 timeout: float = DEFAULT_TOOL_TIMEOUT, cache_ttl: float = DEFAULT_CACHE_TTL,
+                 cache_entries: int = 256):
+        """Initialize the tool set.
+
+        Args:
+            tools (Iterable[Tool]): The available tools
+            max_result_chars (int): Maximum characters of one result
+            timeout (float): Seconds a call may take
+            cache_ttl (float): Seconds a result is reused, 0 to disable caching
+            cache_entries (int): Maximum number of cached results
+        """
+        self.tools = {tool.name: tool for tool in tools}
+        self.max_result_chars = max_result_chars
+        self.timeout = timeout
+        self.cache = ResponseCache(max_entries=cache_entries, ttl=cache_ttl) if cache_ttl > 0 else None
+
+    def schemas(self) -> List[Dict]:
+        """Get the definitions of all tools."""
+        return [tool.schema() for tool in self.tools.values()]
+
+    async def execute(self, calls: List[ToolCall]) -> List[str]:
+        """Run tool calls in parallel.
+
+        Args:
+            calls (List[ToolCall]): The calls of one model turn
+
+        Returns:
+            List[str]: The result of every call, in order
+        """
+        return list(await asyncio.gather(*(self._run(call) for call in calls)))
+
+    async def _run(self, call: ToolCall) -> str:
+        """Run one call, from the cache if possible."""
+        tool = self.tools.get(call.name)
+        if tool is None:
+            return f"Error: unknown tool {call.name}"
+        if call.arguments is None:
+            return "Error: the arguments are not a valid JSON object"
+        key = json.dumps([call.name, call.arguments], sort_keys=True)
+        started = time.perf_counter()
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            LLM_TOOL_SECONDS.observe(time.perf_counter() - started, tool=call.name, cache="hit")
+            return cached
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(None, partial(tool.handler, **call.arguments)),
+                self.timeout
+            )
+        except asyncio.TimeoutError:
+            return f"Error: {call.name} did not finish within {self.timeout:g}s"
+        except Exception as e:
+            record_error("tool", e)
+            return f"Error: {str(e)}"
+        finally:
+            LLM_TOOL_SECONDS.observe(time.perf_counter() - started, tool=call.name, cache="miss")
+        result = self._truncate(result)
+        if self.cache is not None:
+            self.cache.set(key, result)
+        return result
+
+    def _truncate(self, result: str) -> str:
+        """Cut a result to the size limit, saying how much was left out."""
+        if len(result) <= self.max_result_chars:
+            return result
+        omitted = len(result) - self.max_result_chars
+        return f"{result[:self.max_result_chars]}\n... ({omitted} more characters omitted)"
+
+
+async def stream_with_tools(router: ProviderRouter, messages: List[Message], tools: ToolSet,
+                            max_rounds: int = DEFAULT_MAX_ROUNDS) -> AsyncIterator[Union[str, ToolCall]]:
+    """Stream a response, running the tools the model asks for between turns.
+
+    Every turn streams its text; when the model requests tools, the calls
+    are executed, their results appended to the conversation and the model
+    is asked again, for at most ``max_rounds`` rounds of tool calls.
+
+    Args:
+        router (ProviderRouter): The provider router, all its targets must support tools
+        messages (List[Message]): System, user and assistant messages
+        tools (ToolSet): The available tools
+        max_rounds (int): Maximum number of turns that run tools
+
+    Yields:
+        Union[str, ToolCall]: Text deltas, and every tool call before it is run
+    """
+    messages = list(messages)
+    schemas = tools.schemas()
+    rounds = 0
+    while True:
+        text, calls = "", []
+        stream = router.stream(messages, schemas)
+        try:
+            async for item in stream:
+                if isinstance(item, ToolCall):
+                    calls.append(item)
+                else:
+                    text += item
+                    yield item
+        finally:
+            await stream.aclose()
+        if not calls:
+            return
+        if rounds == max_rounds:
+            yield "\n\n(Stopped after the maximum number of tool calls.)"
+            return
+        rounds += 1
+        for call in calls:
+            yield call
+        results = await tools.execute(calls)
+        messages.append({"role": "assistant", "content": text, "tool_calls": calls})
+        messages.extend(
+            {"role": "tool", "tool_call_id": call.id, "name": call.name, "content": result}
+            for call, result in zip(calls, results)
+        )
@@ -0,0 +1,258 @@
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_SEGMENT_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 16
+BLOCK_LINES = 256
+BLOCK_FLUSH_INTERVAL = 5.0
+BLOOM_BITS = 512
+BLOOM_HASHES = 3
+
+# Index record per compressed block: offset, length, line count, first/last timestamp, token bloom filter
+INDEX_RECORD = struct.Struct(f"<QIIdd{BLOOM_BITS // 8}s")
+_TOKEN_RE = re.compile(r"[a-z0-9]{3,}")
+_UNSAFE_PATH_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+StreamKey = Tuple[str, str, str, str]
+
+
+def _tokens(text: str) -> List[str]:
+    """Split text into the lowercase word tokens used by the bloom filter."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _bloom_positions(token: str) -> Iterator[int]:
+    """Bit positions of a token in a block's bloom filter."""
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=4 * BLOOM_HASHES).digest()
+    for i in range(BLOOM_HASHES):
+        yield int.from_bytes(digest[4 * i:4 * i + 4], "little") % BLOOM_BITS
+
+
+def _bloom(tokens) -> int:
+    """Build a bloom filter bitmask from tokens."""
+    bits = 0
+    for token in tokens:
+        for position in _bloom_positions(token):
+            bits |= 1 << position
+    return bits
+
+
+def _query_tokens(text: str) -> List[str]:
+    """Tokens that every line containing ``text`` must also contain.
+
+    Words at the start or end of the query may be cut off inside a longer
+    word of the line, so only words enclosed by other characters are used.
+    """
+    lowered = text.lower()
+    return [
+        match.group() for match in _TOKEN_RE.finditer(lowered)
+        if match.start() > 0 and match.end() < len(lowered)
+    ]
+
+
+class LogArchive:
+    """Append-only on-disk archive of followed container logs.
+
+    Each cluster/namespace/pod/container stream is stored in its own directory as
+    size-rotated segments. Lines are written in zlib-compressed blocks of up
+    to ``BLOCK_LINES`` lines; every block has a fixed-size record in the
+    segment's index file with its time range and a bloom filter of its
+    words. Searches memory-map the index and only decompress blocks whose
+    time range and bloom filter can match.
+    """
+
+    def __init__(self, root: str, segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS):
+        """Initialize the archive.
+
+        Args:
+            root (str): Directory the archive is stored in
+            segment_bytes (int): Compressed size after which a new segment is started
+            max_segments (int): Segments kept per stream, older ones are deleted
+        """
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self._pending: Dict[StreamKey, List[Tuple[float, str]]] = {}
+        self._pending_since: Dict[StreamKey, float] = {}
+        self._newest: Dict[StreamKey, float] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def append(self, cluster: str, namespace: str, pod: str, container: str, line: str,
+               timestamp: Optional[float] = None) -> None:
+        """Archive a log line.
+
+        Lines with a timestamp at or before the newest one already archived
+        for the stream are dropped, so the tail replayed when a follow is
+        restarted is only archived once.
+
+        Args:
+            cluster (str): Kubeconfig context the pod runs in
+            namespace (str): Namespace of the pod
+            pod (str): The pod name
+            container (str): The container name
+            line (str): The log line
+            timestamp (Optional[float]): Epoch seconds of the line, defaults to now
+        """
+        key = (cluster, namespace, pod, container)
+        with self._lock:
+            if timestamp is not None:
+                if timestamp <= self._newest_timestamp(key):
+                    return
+                self._newest[key] = timestamp
+            pending = self._pending.setdefault(key, [])
+            if not pending:
+                self._pending_since[key] = time.monotonic()
+            pending.append((timestamp if timestamp is not None else time.time(), line))
+            if len(pending) >= BLOCK_LINES or time.monotonic() - self._pending_since[key] >= BLOCK_FLUSH_INTERVAL:
+                self._write_block(key)
+
+    def flush(self) -> None:
+        """Write all pending lines to disk."""
+        with self._lock:
+            for key in list(self._pending):
+                self._write_block(key)
+
+    def streams(self, cluster: str, namespace: str, pod: str = "", container: str = "") -> List[StreamKey]:
+        """List the archived streams of a cluster's namespace, optionally of one pod or container.
+
+        Returns:
+            List[StreamKey]: (cluster, namespace, pod, container) keys
+        """
+        keys = set()
+        namespace_dir = os.path.join(self.root, _safe(cluster), _safe(namespace))
+        for pod_dir in sorted(os.listdir(namespace_dir)) if os.path.isdir(namespace_dir) else []:
+            if pod and pod_dir != _safe(pod):
+                continue
+            for container_dir in sorted(os.listdir(os.path.join(namespace_dir, pod_dir))):
+                if not container or container_dir == _safe(container):
+                    keys.add((cluster, namespace, pod_dir, container_dir))
+        with self._lock:
+            keys.update(
+                key for key in self._pending
+                if key[:2] == (cluster, namespace) and (not pod or key[2] == pod)
+                and (not container or key[3] == container)
+            )
+        return sorted(keys)
+
+    def search(self, cluster: str, namespace: str, pod: str = "", container: str = "", text: str = "",
+               since: Optional[float] = None, until: Optional[float] = None,
+               limit: int = 1000) -> List[Tuple[float, str, str, str]]:
+        """Search archived lines by substring and time range.
+
+        Args:
+            cluster (str): Kubeconfig context to search
+            namespace (str): Namespace to search
+            pod (str): Only search this pod, empty for all pods
+            container (str): Only search this container, empty for all containers
+            text (str): Case-insensitive substring the lines must contain
+            since (Optional[float]): Only lines at or after this epoch time
+            until (Optional[float]): Only lines at or before this epoch time
+            limit (int): Maximum number of lines returned (the newest ones)
+
+        Returns:
+            List[Tuple[float, str, str, str]]: (timestamp, pod, container, line) sorted by time
+        """
+        self.flush()
+        needle = text.lower()
+        required = _bloom(_query_tokens(text))
+        low = since if since is not None else float("-inf")
+        high = until if until is not None else float("inf")
+        results = []
+        for key in self.streams(cluster, namespace, pod, container):
+            for timestamp, line in self._search_stream(key, needle, required, low, high):
+                results.append((timestamp, key[2], key[3], line))
+        results.sort(key=lambda result: result[0])
+        return results[-limit:] if limit else results
+
+    def _stream_dir(self, key: StreamKey) -> str:
+        """Directory holding a stream's segments."""
+        return os.path.join(self.root, *(_safe(part) for part in key))
+
+    def _segments(self, key: StreamKey) -> List[str]:
+        """Segment base paths of a stream, oldest first."""
+        directory = self._stream_dir(key)
+        if not os.path.isdir(directory):
+            return []
+        names = sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".seg"))
+        return [os.path.join(directory, name) for name in names]
+
+    def _newest_timestamp(self, key: StreamKey) -> float:
+        """Timestamp of a stream's newest archived line, read from its last index record. Must hold the lock."""
+        if key not in self._newest:
+            newest = float("-inf")
+            segments = self._segments(key)
+            if segments:
+                with open(segments[-1] + ".idx", "rb") as index:
+                    size = os.fstat(index.fileno()).st_size
+                    size -= size % INDEX_RECORD.size
+                    if size:
+                        index.seek(size - INDEX_RECORD.size)
+                        newest = INDEX_RECORD.unpack(index.read(INDEX_RECORD.size))[4]
+            self._newest[key] = newest
+        return self._newest[key]
+
+    def _write_block(self, key: StreamKey) -> None:
+        """Compress a stream's pending lines into a block of its current segment. Must hold the lock."""
+        lines = self._pending.pop(key, None)
+        self._pending_since.pop(key, None)
+        if not lines:
+            return
+        data = zlib.compress("\n".join(f"{ts:.6f}\t{line}" for ts, line in lines).encode("utf-8"))
+        segments = self._segments(key)
+        if not segments or os.path.getsize(segments[-1] + ".seg") + len(data) > self.segment_bytes:
+            os.makedirs(self._stream_dir(key), exist_ok=True)
+            number = int(os.path.basename(segments[-1])) + 1 if segments else 0
+            segments.append(os.path.join(self._stream_dir(key), f"{number:08d}"))
+            for expired in segments[:-self.max_segments]:
+                os.remove(expired + ".seg")
+                os.remove(expired + ".idx")
+        base = segments[-1]
+        with open(base + ".seg", "ab") as segment:
+            offset = segment.tell()
+            segment.write(data)
+        bloom = _bloom(token for _, line in lines for token in _tokens(line))
+        record = INDEX_RECORD.pack(
+            offset, len(data), len(lines), lines[0][0], lines[-1][0], bloom.to_bytes(BLOOM_BITS // 8, "little")
+        )
+        with open(base + ".idx", "ab") as index:
+            index.write(record)
+
+    def _search_stream(self, key: StreamKey, needle: str, required: int,
+                       low: float, high: float) -> Iterator[Tuple[float, str]]:
+        """Yield the matching lines of one stream."""
+        for base in self._segments(key):
+            try:
+                index_file = open(base + ".idx", "rb")
+            except FileNotFoundError:
+                continue  # Deleted by rotation while searching
+            with index_file, open(base + ".seg", "rb") as segment:
+                size = os.fstat(index_file.fileno()).st_size
+                size -= size % INDEX_RECORD.size
+                if not size:
+                    continue
+                with mmap.mmap(index_file.fileno(), size, access=mmap.ACCESS_READ) as index:
+                    for offset, length, _, first, last, bloom in INDEX_RECORD.iter_unpack(index):
+                        if last < low or first > high:
+                            continue
+                        if required and int.from_bytes(bloom, "little") & required != required:
+                            continue
+                        segment.seek(offset)
+                        for entry in zlib.decompress(segment.read(length)).decode("utf-8").split("\n"):
+                            stamp, _, line = entry.partition("\t")
+                            timestamp = float(stamp)
+                            if low <= timestamp <= high and needle in line.lower():
+                                yield timestamp, line
+
+
+def _safe(part: str) -> str:
+    """Make a cluster, namespace, pod or container name safe to use as a directory name."""
+    return _UNSAFE_PATH_RE.sub("_", part) or "_"
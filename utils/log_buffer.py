@@ -0,0 +1,88 @@
+import threading
+from collections import deque
+from typing import Iterable, Tuple
+
+DEFAULT_MAX_LINES = 2000
+
+
+class LogBuffer:
+    """Bounded ring buffer of log lines for one watch session.
+
+    Producers append lines from any thread; once ``max_lines`` is reached the
+    oldest lines are discarded and counted in ``dropped``. Consumers wait for
+    a new version and render the whole (bounded) buffer at once, so UI
+    updates can be coalesced instead of sent per line.
+    """
+
+    def __init__(self, max_lines: int = DEFAULT_MAX_LINES):
+        """Initialize the log buffer.
+
+        Args:
+            max_lines (int): Maximum number of lines kept
+        """
+        self.max_lines = max_lines
+        self.dropped = 0
+        self.version = 0
+        self._lines = deque(maxlen=max_lines)
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._lines)
+
+    def append(self, line: str) -> None:
+        """Add a line, dropping the oldest one if the buffer is full.
+
+        Args:
+            line (str): The log line
+        """
+        with self._condition:
+            if len(self._lines) == self.max_lines:
+                self.dropped += 1
+            self._lines.append(line)
+            self.version += 1
+            self._condition.notify_all()
+
+    def extend(self, lines: Iterable[str]) -> None:
+        """Add several lines at once.
+
+        Args:
+            lines (Iterable[str]): The log lines
+        """
+        with self._condition:
+            for line in lines:
+                if len(self._lines) == self.max_lines:
+                    self.dropped += 1
+                self._lines.append(line)
+            self.version += 1
+            self._condition.notify_all()
+
+    def clear(self) -> None:
+        """Remove all lines and reset the dropped counter."""
+        with self._condition:
+            self._lines.clear()
+            self.dropped = 0
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait_for_update(self, since_version: int, timeout: float) -> bool:
+        """Wait until the buffer changed after a given version.
+
+        Args:
+            since_version (int): The last version the caller has seen
+            timeout (float): Maximum number of seconds to wait
+
+        Returns:
+            bool: True if there is a newer version
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self.version != since_version, timeout)
+
+    def snapshot(self) -> Tuple[str, int, int]:
+        """Render the buffer.
+
+        Returns:
+            Tuple[str, int, int]: The joined lines, the buffer version and the dropped line count
+        """
+        with self._condition:
+            return "\n".join(self._lines), self.version, self.dropped
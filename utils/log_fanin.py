@@ -0,0 +1,301 @@
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from kubernetes.watch.watch import iter_resp_lines
+
+from utils.k8s_cache import Informer, interrupt_response
+from utils.log_archive import LogArchive
+from utils.k8s_snapshot import PodRecord
+from utils.metrics import K8S_API_SECONDS, record_error, timed
+
+DEFAULT_MAX_STREAMS = 32
+DEFAULT_REORDER_WINDOW = 0.5
+RECONCILE_INTERVAL = 1.0
+# deployment/<name> or statefulset/<name>, as opposed to a label selector like app.kubernetes.io/name
+WORKLOAD_REFERENCE_RE = re.compile(r"^(deployment|deploy|statefulset|sts)/[^/,=!\s]+$", re.IGNORECASE)
+
+
+def parse_log_timestamp(line: str) -> Tuple[Optional[float], str]:
+    """Split a ``timestamps=True`` log line into its timestamp and text.
+
+    Args:
+        line (str): Log line prefixed with an RFC3339 timestamp
+
+    Returns:
+        Tuple[Optional[float]]: Epoch seconds (None if unparseable) and the log text
+    """
+    stamp, _, text = line.partition(" ")
+    if len(stamp) < 20 or not stamp.endswith("Z"):
+        return None, line
+    try:
+        seconds = datetime.strptime(stamp[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None, line
+    fraction = stamp[20:-1] if stamp[19] == "." else ""
+    return seconds + (float(f"0.{fraction}") if fraction else 0.0), text
+
+
+def is_workload_reference(text: str) -> bool:
+    """Check whether the input is a workload reference rather than a label selector.
+
+    Args:
+        text (str): A label selector or a reference like ``deployment/web``
+
+    Returns:
+        bool: True for ``deployment/<name>``, ``statefulset/<name>`` and their short forms
+    """
+    return bool(WORKLOAD_REFERENCE_RE.match(text.strip()))
+
+
+def selector_for_workload(apps_v1, namespace: str, workload: str) -> str:
+    """Resolve ``deployment/<name>`` or ``statefulset/<name>`` to its label selector.
+
+    Args:
+        apps_v1: Kubernetes AppsV1Api client
+        namespace (str): The workload namespace
+        workload (str): Workload reference, e.g. ``deployment/web``
+
+    Returns:
+        str: Label selector matching the workload's pods, from its matchLabels and matchExpressions
+
+    Raises:
+        ValueError: If the workload kind is unsupported or its selector is empty
+    """
+    kind, _, name = workload.partition("/")
+    readers = {
+        "deployment": apps_v1.read_namespaced_deployment,
+        "deploy": apps_v1.read_namespaced_deployment,
+        "statefulset": apps_v1.read_namespaced_stateful_set,
+        "sts": apps_v1.read_namespaced_stateful_set,
+    }
+    reader = readers.get(kind.lower())
+    if reader is None or not name:
+        raise ValueError(f"Unsupported workload: {workload}")
+    selector = reader(name, namespace).spec.selector
+    requirements = [f"{key}={value}" for key, value in sorted((selector.match_labels or {}).items())]
+    for expression in selector.match_expressions or []:
+        values = ",".join(expression.values or [])
+        operator = expression.operator
+        if operator == "In":
+            requirements.append(f"{expression.key} in ({values})")
+        elif operator == "NotIn":
+            requirements.append(f"{expression.key} notin ({values})")
+        elif operator == "Exists":
+            requirements.append(expression.key)
+        elif operator == "DoesNotExist":
+            requirements.append(f"!{expression.key}")
+        else:
+            raise ValueError(f"Unsupported selector operator {operator} in {workload}")
+    if not requirements:
+        # An empty selector would follow every pod of the namespace
+        raise ValueError(f"{workload} has an empty selector")
+    return ",".join(requirements)
+
+
+class LogFanIn:
+    """Follows every container of the pods matching a label selector.
+
+    Matching pods are tracked with an informer, so followers start for pods
+    that appear and stop for pods that go away. Each container is read by
+    its own thread (up to ``max_streams``) with ``timestamps=True``; lines
+    are held for ``reorder_window`` seconds in a heap and released in
+    timestamp order, prefixed with ``pod/container``.
+    """
+
+    def __init__(self, core_v1, namespace: str, label_selector: str, emit: Callable[[str], None],
+                 max_streams: int = DEFAULT_MAX_STREAMS, reorder_window: float = DEFAULT_REORDER_WINDOW,
+                 tail_lines: int = 100, archive: Optional[LogArchive] = None, cluster: str = ""):
+        """Initialize the fan-in.
+
+        Args:
+            core_v1: Kubernetes CoreV1Api client
+            namespace (str): Namespace of the pods
+            label_selector (str): Label selector of the pods
+            emit (Callable[[str], None]): Called with every merged log line
+            max_streams (int): Maximum number of containers followed at once
+            reorder_window (float): Seconds lines are held back to restore timestamp order
+            tail_lines (int): Number of past lines fetched when a container is first followed
+            archive (Optional[LogArchive]): Archive every followed line is also written to
+            cluster (str): Kubeconfig context of the pods, archived lines are stored under it
+        """
+        self.core_v1 = core_v1
+        self.namespace = namespace
+        self.emit = emit
+        self.max_streams = max_streams
+        self.reorder_window = reorder_window
+        self.tail_lines = tail_lines
+        self.archive = archive
+        self.cluster = cluster
+        self.pods = Informer(
+            partial(core_v1.list_namespaced_pod, namespace, label_selector=label_selector),
+            transform=PodRecord.from_raw
+        )
+        self._followers: Dict[Tuple[str, str], Tuple[threading.Thread, threading.Event]] = {}
+        self._responses: Dict[Tuple[str, str], object] = {}
+        self._heap: List[Tuple[float, int, float, str]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        # Keys already reported as skipped or failing, so retries do not repeat the message
+        self._notified: set = set()
+        # Timestamp of the newest line read per container, where a restarted follower resumes
+        self._last_seen: Dict[Tuple[str, str], float] = {}
+
+    @property
+    def active_streams(self) -> int:
+        """Number of containers currently followed."""
+        with self._lock:
+            return len(self._followers)
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """Follow the matching pods until stopped.
+
+        Args:
+            stop_event (Optional[threading.Event]): External event that also stops the fan-in
+        """
+        self.pods.start()
+        reported_error = None
+        try:
+            while not self._stop_event.is_set() and not (stop_event and stop_event.is_set()):
+                if self.pods.wait_for_sync(0):
+                    self._reconcile()
+                elif self.pods.last_error and self.pods.last_error != reported_error:
+                    reported_error = self.pods.last_error
+                    self.emit(f"Error listing pods: {reported_error}")
+                self._flush(time.monotonic() - self.reorder_window)
+                self._stop_event.wait(min(RECONCILE_INTERVAL, self.reorder_window))
+        finally:
+            self.stop()
+            self._flush(float("inf"))
+
+    def stop(self) -> None:
+        """Stop the informer and every follower."""
+        self._stop_event.set()
+        self.pods.stop()
+        with self._lock:
+            followers = list(self._followers.items())
+        for key, (_, stopped) in followers:
+            self._stop_follower(key, stopped)
+
+    def _reconcile(self) -> None:
+        """Start followers for new containers and stop those of removed pods."""
+        wanted = {
+            (pod.name, container)
+            for pod in self.pods.list() if pod.phase == "Running"
+            for container in pod.containers
+        }
+        with self._lock:
+            current = dict(self._followers)
+        for key, (thread, stopped) in current.items():
+            if key not in wanted:
+                self._stop_follower(key, stopped)
+            elif not thread.is_alive():
+                # The stream ended (e.g. container restart), follow again from the last line read
+                with self._lock:
+                    self._followers.pop(key, None)
+        for key in sorted(wanted):
+            with self._lock:
+                if key in self._followers:
+                    continue
+                if len(self._followers) >= self.max_streams:
+                    if key not in self._notified:
+                        self._notified.add(key)
+                        self.emit(f"Not following {key[0]}/{key[1]}: limit of {self.max_streams} streams reached")
+                    continue
+                stopped = threading.Event()
+                thread = threading.Thread(
+                    target=self._follow,
+                    args=(key, stopped, self.tail_lines, self._last_seen.get(key)),
+                    daemon=True
+                )
+                self._followers[key] = (thread, stopped)
+            thread.start()
+
+    def _stop_follower(self, key: Tuple[str, str], stopped: threading.Event) -> None:
+        """Stop a follower and close its HTTP stream."""
+        stopped.set()
+        with self._lock:
+            self._followers.pop(key, None)
+            self._last_seen.pop(key, None)
+            response = self._responses.pop(key, None)
+        if response is not None:
+            interrupt_response(response)
+
+    def _follow(self, key: Tuple[str, str], stopped: threading.Event, tail_lines: int,
+                since: Optional[float] = None) -> None:
+        """Read one container's log stream into the merge heap.
+
+        Args:
+            key (Tuple[str, str]): Pod and container name
+            stopped (threading.Event): Set when the follower should stop
+            tail_lines (int): Number of past lines to fetch on the first follow
+            since (Optional[float]): Timestamp of the last line already read, set when following again
+        """
+        pod, container = key
+        prefix = f"[{pod}/{container}] "
+        if since is None:
+            start = {"tail_lines": tail_lines}
+        else:
+            # The client has no sinceTime, ask a bit further back and drop what was already read
+            start = {"since_seconds": max(1, math.ceil(time.time() - since) + 1)}
+        try:
+            with timed(K8S_API_SECONDS, operation="read_namespaced_pod_log"):
+                response = self.core_v1.read_namespaced_pod_log(
+                    name=pod,
+                    namespace=self.namespace,
+                    container=container,
+                    follow=True,
+                    timestamps=True,
+                    _preload_content=False,
+                    **start
+                )
+            with self._lock:
+                self._responses[key] = response
+            for line in iter_resp_lines(response):
+                if stopped.is_set():
+                    break
+                timestamp, text = parse_log_timestamp(line)
+                if since is not None and timestamp is not None and timestamp <= since:
+                    continue
+                if self.archive is not None:
+                    self.archive.append(self.cluster, self.namespace, pod, container, text, timestamp)
+                now = time.monotonic()
+                with self._lock:
+                    if timestamp is not None and not stopped.is_set():
+                        self._last_seen[key] = timestamp
+                    heapq.heappush(self._heap, (
+                        timestamp if timestamp is not None else time.time(),
+                        next(self._sequence),
+                        now,
+                        prefix + text
+                    ))
+        except Exception as e:
+            if not stopped.is_set():
+                record_error("log_watch", e)
+                # Followers fail concurrently and _reconcile updates the set too
+                with self._lock:
+                    first_report = key not in self._notified
+                    self._notified.add(key)
+                if first_report:
+                    self.emit(f"{prefix}Error watching logs: {str(e)}")
+        finally:
+            with self._lock:
+                response = self._responses.pop(key, None)
+            if response is not None:
+                response.release_conn()
+
+    def _flush(self, arrived_before: float) -> None:
+        """Emit, in timestamp order, the held lines that arrived before a deadline."""
+        ready = []
+        with self._lock:
+            while self._heap and self._heap[0][2] <= arrived_before:
+                ready.append(heapq.heappop(self._heap)[3])
+        for line in ready:
+            self.emit(line)
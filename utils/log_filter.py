@@ -0,0 +1,78 @@
+import re
+from typing import Iterable, Optional
+
+# Spellings of each level commonly found in application and klog output
+LEVEL_ALIASES = {
+    "ERROR": ("ERROR", "ERR", "FATAL", "CRITICAL", "PANIC"),
+    "WARN": ("WARN", "WARNING"),
+    "INFO": ("INFO",),
+    "DEBUG": ("DEBUG", "TRACE"),
+}
+LOG_LEVELS = list(LEVEL_ALIASES)
+
+_REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+
+
+def _literal(pattern: str) -> Optional[str]:
+    """Return the pattern if it is a plain string without regex syntax."""
+    if pattern and not _REGEX_METACHARACTERS.intersection(pattern):
+        return pattern
+    return None
+
+
+class LogFilter:
+    """Include/exclude/level filter for log lines, compiled into one regex.
+
+    The three conditions are combined into a single anchored pattern, so each
+    line is checked with one ``re.match`` call. When the include pattern is
+    a plain string, a substring test runs first and rejects most lines of a
+    noisy stream without touching the regex engine.
+    """
+
+    def __init__(self, include: str = "", exclude: str = "", levels: Iterable[str] = ()):
+        """Compile the filter.
+
+        Args:
+            include (str): Regex a line must contain, empty to keep all lines
+            exclude (str): Regex a line must not contain, empty to drop none
+            levels (Iterable[str]): Log levels to keep (see ``LOG_LEVELS``), empty for all
+
+        Raises:
+            re.error: If a pattern is not a valid regular expression
+        """
+        self.include = include or ""
+        self.exclude = exclude or ""
+        self.levels = [level.upper() for level in levels or ()]
+        self.dropped = 0
+        self._prefilter = _literal(self.include)
+
+        parts = []
+        if self.exclude:
+            parts.append(f"(?!.*?(?:{self.exclude}))")
+        if self.levels:
+            aliases = "|".join(alias for level in self.levels for alias in LEVEL_ALIASES.get(level, (level,)))
+            parts.append(rf"(?=.*?(?i:\b(?:{aliases})\b))")
+        if self.include:
+            parts.append(f"(?=.*?(?:{self.include}))")
+        self._pattern = re.compile("".join(parts)) if parts else None
+
+    @property
+    def active(self) -> bool:
+        """Whether the filter drops any lines at all."""
+        return self._pattern is not None
+
+    def __call__(self, line: str) -> bool:
+        """Check whether a line passes the filter.
+
+        Args:
+            line (str): The log line
+
+        Returns:
+            bool: True if the line should be shown
+        """
+        if self._pattern is None:
+            return True
+        if (self._prefilter is not None and self._prefilter not in line) or not self._pattern.match(line):
+            self.dropped += 1
+            return False
+        return True
@@ -0,0 +1,331 @@
+import threading
+from typing import Dict, Optional, Sequence
+
+from kubernetes.watch.watch import iter_resp_lines
+
+from utils.k8s_cache import interrupt_response
+from utils.log_archive import LogArchive
+from utils.log_buffer import DEFAULT_MAX_LINES, LogBuffer
+from utils.log_fanin import LogFanIn, is_workload_reference, parse_log_timestamp, selector_for_workload
+from utils.log_filter import LogFilter
+from utils.log_stats import DEFAULT_FIELDS, LogStats
+from utils.log_templates import TemplateMiner
+from utils.metrics import K8S_API_SECONDS, LOG_LINES, LOG_QUEUE_DEPTH, LOG_STREAMS, LOG_WATCHES, record_error, timed
+
+DEFAULT_MAX_SESSIONS = 20
+JOIN_TIMEOUT = 5.0
+
+
+class SessionLimitError(Exception):
+    """Raised when the maximum number of concurrent log watches is reached."""
+
+
+class LogWatchSession:
+    """One browser session's log watch: its buffer, reader thread and HTTP stream.
+
+    The watch runs in a single thread. Stopping it sets the stop event and
+    shuts down the underlying HTTP stream, so a reader blocked on a quiet
+    stream returns immediately instead of waiting for the next line.
+    """
+
+    def __init__(self, session_id: str, core_v1, apps_v1, max_lines: int = DEFAULT_MAX_LINES,
+                 archive: Optional[LogArchive] = None, stats_fields: Sequence[str] = DEFAULT_FIELDS,
+                 cluster: str = ""):
+        """Initialize the session.
+
+        Args:
+            session_id (str): The Gradio session hash
+            core_v1: Kubernetes CoreV1Api client
+            apps_v1: Kubernetes AppsV1Api client
+            max_lines (int): Maximum number of log lines kept
+            archive (Optional[LogArchive]): Archive every followed line is also written to
+            stats_fields (Sequence[str]): Structured log fields whose top values are tracked
+            cluster (str): Kubeconfig context the clients talk to, archived lines are stored under it
+        """
+        self.session_id = session_id
+        self.core_v1 = core_v1
+        self.apps_v1 = apps_v1
+        self.archive = archive
+        self.cluster = cluster
+        self.buffer = LogBuffer(max_lines)
+        self.stop_event = threading.Event()
+        self.log_filter = LogFilter()
+        self.stats = LogStats(fields=stats_fields)
+        self.templates = TemplateMiner()
+        self._thread: Optional[threading.Thread] = None
+        self._response = None
+        self._fan_in: Optional[LogFanIn] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Whether the watch thread is still running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def running(self) -> bool:
+        """Whether the watch counts towards the concurrency limit (not stopped, not exited)."""
+        return not self.stop_event.is_set() and not self.finished
+
+    @property
+    def finished(self) -> bool:
+        """Whether the watch was started and its thread has exited."""
+        return self._thread is not None and not self._thread.is_alive()
+
+    @property
+    def active_streams(self) -> int:
+        """Number of HTTP log streams this session currently holds open."""
+        with self._lock:
+            if self._fan_in is not None:
+                return self._fan_in.active_streams
+            return 1 if self._response is not None else 0
+
+    def follow_container(self, namespace: str, pod: str, container: str,
+                         log_filter: Optional[LogFilter] = None) -> None:
+        """Start following one container's logs.
+
+        Args:
+            namespace (str): Namespace of the pod
+            pod (str): The pod name
+            container (str): The container name
+            log_filter (Optional[LogFilter]): Filter applied before lines reach the buffer
+        """
+        self._start(self._run_container, log_filter, namespace, pod, container)
+
+    def follow_selector(self, namespace: str, selector: str, log_filter: Optional[LogFilter] = None) -> None:
+        """Start following every pod matching a label selector or workload.
+
+        Args:
+            namespace (str): Namespace of the pods
+            selector (str): Label selector (``app=web``) or workload (``deployment/web``)
+            log_filter (Optional[LogFilter]): Filter applied before lines reach the buffer
+        """
+        self._start(self._run_selector, log_filter, namespace, selector)
+
+    def stop(self, timeout: float = JOIN_TIMEOUT) -> None:
+        """Stop the watch, close its stream and wait for the thread to exit.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait for the thread
+        """
+        self.stop_event.set()
+        with self._lock:
+            response, fan_in = self._response, self._fan_in
+        if response is not None:
+            interrupt_response(response)
+        if fan_in is not None:
+            fan_in.stop()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _start(self, target, log_filter: Optional[LogFilter], *args) -> None:
+        """Run a watch function in the session's thread."""
+        if log_filter is not None:
+            self.log_filter = log_filter
+        self._thread = threading.Thread(target=target, args=args, daemon=True)
+        self._thread.start()
+
+    def _emit(self, line: str) -> None:
+        """Feed a line to the stats and template miner and, if it passes the filter, the buffer."""
+        self.stats.append(line)
+        self.templates.add(line)
+        if self.log_filter(line):
+            self.buffer.append(line)
+
+    def _run_container(self, namespace: str, pod: str, container: str) -> None:
+        """Read one container's log stream into the buffer."""
+        try:
+            with timed(K8S_API_SECONDS, operation="read_namespaced_pod_log"):
+                response = self.core_v1.read_namespaced_pod_log(
+                    name=pod,
+                    namespace=namespace,
+                    container=container,
+                    follow=True,
+                    timestamps=True,
+                    tail_lines=100,
+                    _preload_content=False
+                )
+            with self._lock:
+                self._response = response
+            if self.stop_event.is_set():
+                return
+            for line in iter_resp_lines(response):
+                if self.stop_event.is_set():
+                    break
+                timestamp, text = parse_log_timestamp(line)
+                if self.archive is not None:
+                    self.archive.append(self.cluster, namespace, pod, container, text, timestamp)
+                self._emit(text)
+        except Exception as e:
+            if not self.stop_event.is_set():
+                record_error("log_watch", e)
+                self.buffer.append(f"Error watching logs: {str(e)}")
+        finally:
+            with self._lock:
+                response, self._response = self._response, None
+            if response is not None:
+                response.release_conn()
+            if self.archive is not None:
+                self.archive.flush()
+
+    def _run_selector(self, namespace: str, selector: str) -> None:
+        """Merge the logs of all matching pods into the buffer."""
+        try:
+            if is_workload_reference(selector):
+                selector = selector_for_workload(self.apps_v1, namespace, selector.strip())
+            fan_in = LogFanIn(
+                self.core_v1, namespace, selector, self._emit, archive=self.archive, cluster=self.cluster
+            )
+            with self._lock:
+                self._fan_in = fan_in
+            fan_in.run(self.stop_event)
+        except Exception as e:
+            if not self.stop_event.is_set():
+                record_error("log_watch", e)
+                self.buffer.append(f"Error watching logs: {str(e)}")
+        finally:
+            with self._lock:
+                self._fan_in = None
+            if self.archive is not None:
+                self.archive.flush()
+
+
+class LogSessionManager:
+    """Gives every browser session its own log watch.
+
+    Starting a watch replaces the session's previous one, so a session never
+    holds more than one reader thread. The number of running watches is
+    capped at ``max_sessions``. A stopped watch keeps its buffer, stats and
+    templates until it is replaced or the browser disconnects.
+    """
+
+    def __init__(self, core_v1, apps_v1, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 max_lines: int = DEFAULT_MAX_LINES, archive: Optional[LogArchive] = None,
+                 stats_fields: Sequence[str] = DEFAULT_FIELDS):
+        """Initialize the session manager.
+
+        Args:
+            core_v1: Kubernetes CoreV1Api client
+            apps_v1: Kubernetes AppsV1Api client
+            max_sessions (int): Maximum number of concurrent watches
+            max_lines (int): Maximum number of log lines kept per session
+            archive (Optional[LogArchive]): Archive all followed lines are written to
+            stats_fields (Sequence[str]): Structured log fields whose top values are tracked
+        """
+        self.core_v1 = core_v1
+        self.apps_v1 = apps_v1
+        self.max_sessions = max_sessions
+        self.max_lines = max_lines
+        self.archive = archive
+        self.stats_fields = stats_fields
+        self._sessions: Dict[str, LogWatchSession] = {}
+        self._lock = threading.Lock()
+
+    def start(self, session_id: str, core_v1=None, apps_v1=None, cluster: str = "") -> LogWatchSession:
+        """Create a fresh watch session, stopping the session's previous watch.
+
+        Args:
+            session_id (str): The Gradio session hash
+            core_v1: CoreV1Api client of the cluster to watch, defaults to the manager's
+            apps_v1: AppsV1Api client of the cluster to watch, defaults to the manager's
+            cluster (str): Kubeconfig context of the cluster to watch, used to key the archive
+
+        Returns:
+            LogWatchSession: The new session, not yet following anything
+
+        Raises:
+            SessionLimitError: If the maximum number of concurrent watches is reached
+        """
+        previous = self.get(session_id)
+        if previous is not None:
+            previous.stop()
+        with self._lock:
+            running = sum(1 for other in self._sessions.values() if other.running)
+            if running >= self.max_sessions:
+                raise SessionLimitError(
+                    f"Too many log watches in progress ({self.max_sessions}), please try again later"
+                )
+            session = LogWatchSession(
+                session_id,
+                core_v1 or self.core_v1,
+                apps_v1 or self.apps_v1,
+                self.max_lines,
+                self.archive,
+                self.stats_fields,
+                cluster
+            )
+            self._sessions[session_id] = session
+            return session
+
+    def get(self, session_id: str) -> Optional[LogWatchSession]:
+        """Get the current watch of a session, if any."""
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def stop(self, session_id: str, session: Optional[LogWatchSession] = None) -> None:
+        """Stop a session's watch, keeping its collected logs.
+
+        Args:
+            session_id (str): The Gradio session hash
+            session (Optional[LogWatchSession]): Only stop if this is still the session's current watch
+        """
+        current = self.get(session_id)
+        if current is not None and (session is None or current is session):
+            current.stop()
+
+    def close(self, session_id: str) -> None:
+        """Stop a session's watch and forget it, e.g. when the browser disconnects.
+
+        Args:
+            session_id (str): The Gradio session hash
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.stop()
+
+    def stop_all(self) -> None:
+        """Stop and forget every watch."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.stop()
+
+    def register_metrics(self) -> None:
+        """Report the line counts and queue depths of every watch on the metrics endpoint.
+
+        Values are read from the sessions when the endpoint is scraped, so
+        following a stream costs nothing extra. Watches are labelled with
+        the start of their session hash.
+        """
+        def sessions():
+            with self._lock:
+                return list(self._sessions.values())
+
+        LOG_LINES.set_function(lambda: {
+            (session.session_id[:8],): session.stats.received for session in sessions()
+        })
+        LOG_QUEUE_DEPTH.set_function(lambda: {
+            key: value
+            for session in sessions()
+            for key, value in (
+                ((session.session_id[:8], "stats"), session.stats.pending),
+                ((session.session_id[:8], "buffer"), len(session.buffer)),
+            )
+        })
+        LOG_WATCHES.set_function(lambda: {(): self.active_sessions})
+        LOG_STREAMS.set_function(lambda: {(): self.active_streams})
+
+    @property
+    def active_sessions(self) -> int:
+        """Number of sessions with a running watch."""
+        with self._lock:
+            return sum(1 for session in self._sessions.values() if session.running)
+
+    @property
+    def active_streams(self) -> int:
+        """Number of HTTP log streams held open across all sessions."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return sum(session.active_streams for session in sessions)
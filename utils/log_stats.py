@@ -0,0 +1,239 @@
+import json
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.log_filter import LEVEL_ALIASES, LOG_LEVELS
+
+DEFAULT_CAPACITY = 10000
+DEFAULT_MAX_PENDING = 50000
+DEFAULT_FIELDS = ("status", "method", "path", "error", "logger")
+RATE_WINDOW = 60
+TOP_VALUES = 5
+MAX_VALUE_CHARS = 80
+
+LEVEL_NAMES = LOG_LEVELS + ["OTHER"]
+OTHER_LEVEL = len(LOG_LEVELS)
+ERROR_LEVEL = LOG_LEVELS.index("ERROR")
+_LEVEL_CODES = {alias: code for code, level in enumerate(LOG_LEVELS) for alias in LEVEL_ALIASES[level]}
+
+LEVEL_KEYS = ("level", "lvl", "severity", "loglevel")
+MESSAGE_KEYS = ("msg", "message")
+TIME_KEYS = ("ts", "time", "timestamp", "@timestamp")
+
+_LOGFMT_RE = re.compile(r'([\w.@-]+)=("(?:[^"\\]|\\.)*"|\S*)')
+# Prefix added by the multi-pod fan-in, e.g. "[web-1/app] "
+_SOURCE_PREFIX_RE = re.compile(r"^\[[^\]\s/]+/[^\]\s]+\] ")
+
+
+def parse_structured(line: str) -> Optional[Dict]:
+    """Parse a JSON or logfmt log line.
+
+    Args:
+        line (str): The log line, optionally prefixed with ``[pod/container]``
+
+    Returns:
+        Optional[Dict]: The parsed fields, or None if the line is not structured
+    """
+    text = _SOURCE_PREFIX_RE.sub("", line, count=1).strip()
+    if text.startswith("{"):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    pairs = _LOGFMT_RE.findall(text)
+    fields = {key: value[1:-1].replace('\\"', '"') if value.startswith('"') else value for key, value in pairs}
+    if len(fields) < 2 or not any(key in fields for key in LEVEL_KEYS + MESSAGE_KEYS):
+        return None
+    return fields
+
+
+def _first(fields: Dict, keys: Sequence[str]):
+    """Get the value of the first key present in the fields."""
+    for key in keys:
+        if key in fields:
+            return fields[key]
+    return None
+
+
+def _parse_time(value, default: float) -> float:
+    """Convert an epoch (seconds or milliseconds) or ISO 8601 time to epoch seconds."""
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            try:
+                return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+            except ValueError:
+                return default
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value / 1000 if value > 1e11 else float(value)
+    return default
+
+
+class LogStats:
+    """Columnar aggregates over the structured lines of a log stream.
+
+    Lines are queued by ``append`` and parsed in batches by ``update``; at
+    most ``max_pending`` lines wait, older ones are dropped and counted.
+    Timestamps, levels, messages and the selected fields are kept in
+    fixed-size ring columns; the level histogram, the per-second level
+    counts and the field value counts are adjusted for each batch (and for
+    the lines it evicts) instead of being recomputed from the whole buffer.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, fields: Sequence[str] = DEFAULT_FIELDS,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        """Initialize the aggregates.
+
+        Args:
+            capacity (int): Number of structured lines kept
+            fields (Sequence[str]): Fields whose most common values are tracked
+            max_pending (int): Number of lines queued until the next update, e.g. while no viewer asks for a summary
+        """
+        self.capacity = capacity
+        self.fields = list(fields)
+        self.parsed = 0
+        self.unparsed = 0
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.levels = np.zeros(capacity, dtype=np.int8)
+        self.messages = np.empty(capacity, dtype=object)
+        self.field_values = {field: np.empty(capacity, dtype=object) for field in self.fields}
+        self.level_counts = np.zeros(len(LEVEL_NAMES), dtype=np.int64)
+        self.value_counts = {field: Counter() for field in self.fields}
+        self._filled = np.zeros(capacity, dtype=bool)
+        self._next = 0
+        self._second_ids = np.full(RATE_WINDOW, -1, dtype=np.int64)
+        self._second_counts = np.zeros((RATE_WINDOW, len(LEVEL_NAMES)), dtype=np.int64)
+        self._pending: Deque[str] = deque(maxlen=max_pending)
+        self._received = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of lines queued for the next update."""
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def received(self) -> int:
+        """Number of lines appended so far, parsed or not."""
+        with self._lock:
+            return self._received
+
+    def append(self, line: str) -> None:
+        """Queue a log line for the next update.
+
+        Args:
+            line (str): The log line
+        """
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(line)
+            self._received += 1
+
+    def update(self) -> int:
+        """Parse the queued lines and fold them into the aggregates.
+
+        Returns:
+            int: Number of structured lines added
+        """
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+        now = time.time()
+        timestamps, levels, messages = [], [], []
+        values = {field: [] for field in self.fields}
+        for line in lines:
+            fields = parse_structured(line)
+            if fields is None:
+                self.unparsed += 1
+                continue
+            level = _first(fields, LEVEL_KEYS)
+            timestamps.append(_parse_time(_first(fields, TIME_KEYS), now))
+            levels.append(_LEVEL_CODES.get(str(level).upper(), OTHER_LEVEL) if level is not None else OTHER_LEVEL)
+            messages.append(str(_first(fields, MESSAGE_KEYS) or ""))
+            for field in self.fields:
+                value = fields.get(field)
+                values[field].append(str(value)[:MAX_VALUE_CHARS] if value is not None else None)
+        if timestamps:
+            self._add(np.array(timestamps), np.array(levels, dtype=np.int8), messages, values)
+        return len(timestamps)
+
+    def summary(self, now: Optional[float] = None) -> Dict:
+        """Compute the current aggregates.
+
+        Args:
+            now (Optional[float]): Current epoch time, defaults to the wall clock
+
+        Returns:
+            Dict: Parsed/unparsed/dropped counts, level histogram, error rate and top field values
+        """
+        self.update()
+        now = time.time() if now is None else now
+        current = int(now)
+        recent = (self._second_ids > current - RATE_WINDOW) & (self._second_ids <= current)
+        errors_per_second = np.zeros(RATE_WINDOW, dtype=np.int64)
+        ages = current - self._second_ids[recent]
+        errors_per_second[RATE_WINDOW - 1 - ages] = self._second_counts[recent, ERROR_LEVEL]
+        return {
+            "parsed": self.parsed,
+            "unparsed": self.unparsed,
+            "dropped": self.dropped,
+            "levels": dict(zip(LEVEL_NAMES, self.level_counts.tolist())),
+            "errors_per_second": errors_per_second.tolist(),
+            "error_rate": float(errors_per_second.mean()),
+            "lines_per_second": float(self._second_counts[recent].sum() / RATE_WINDOW),
+            "top_fields": {
+                field: counts.most_common(TOP_VALUES)
+                for field, counts in self.value_counts.items() if counts
+            },
+        }
+
+    def _add(self, timestamps: np.ndarray, levels: np.ndarray, messages: List[str],
+             values: Dict[str, List[Optional[str]]]) -> None:
+        """Write a parsed batch into the ring columns and adjust the aggregates."""
+        self.parsed += len(timestamps)
+        self._count_seconds(timestamps, levels)
+        skip = max(0, len(timestamps) - self.capacity)
+        if skip:
+            # Lines that would be overwritten within the same batch only count towards the totals above
+            timestamps, levels, messages = timestamps[skip:], levels[skip:], messages[skip:]
+            values = {field: column[skip:] for field, column in values.items()}
+        slots = (self._next + np.arange(len(timestamps))) % self.capacity
+        evicted = slots[self._filled[slots]]
+        if evicted.size:
+            self.level_counts -= np.bincount(self.levels[evicted], minlength=len(LEVEL_NAMES))
+            for field, counts in self.value_counts.items():
+                counts.subtract(value for value in self.field_values[field][evicted] if value is not None)
+                for value in [value for value, count in counts.items() if count <= 0]:
+                    del counts[value]
+        self.timestamps[slots] = timestamps
+        self.levels[slots] = levels
+        self.messages[slots] = messages
+        for field, column in values.items():
+            self.field_values[field][slots] = column
+            self.value_counts[field].update(value for value in column if value is not None)
+        self.level_counts += np.bincount(levels, minlength=len(LEVEL_NAMES))
+        self._filled[slots] = True
+        self._next = int(slots[-1] + 1) % self.capacity
+
+    def _count_seconds(self, timestamps: np.ndarray, levels: np.ndarray) -> None:
+        """Add a batch to the per-second level counts of the rate window."""
+        seconds = np.floor(timestamps).astype(np.int64)
+        slots = seconds % RATE_WINDOW
+        # Reset slots that still hold an older second, ignore lines older than their slot
+        for slot, second in zip(*np.unique(np.stack([slots, seconds]), axis=1)):
+            if second > self._second_ids[slot]:
+                self._second_ids[slot] = second
+                self._second_counts[slot] = 0
+        current = self._second_ids[slots] == seconds
+        np.add.at(self._second_counts, (slots[current], levels[current]), 1)
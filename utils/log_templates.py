@@ -0,0 +1,185 @@
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from utils.context_builder import OMITTED_NOTE_TOKENS, estimate_tokens
+
+WILDCARD = "<*>"
+DEFAULT_SIMILARITY = 0.5
+DEFAULT_MAX_CLUSTERS = 1000
+DEFAULT_SUMMARY_TOKENS = 600
+MAX_SAMPLES = 3
+MAX_TOKENS_PER_LINE = 64
+
+# Values that vary between otherwise identical lines, masked before clustering
+_MASKS = [
+    re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE),
+    re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"),
+    re.compile(r"\b0x[0-9a-f]+\b|\b[0-9a-f]{12,}\b", re.IGNORECASE),
+    re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"),
+    re.compile(r"(?<![A-Za-z])[-+]?\d+(?:\.\d+)?(?:ms|s|m|h|%|[KMG]i?B?)?(?![A-Za-z])"),
+]
+
+
+class LogTemplate:
+    """A cluster of log lines sharing one template."""
+
+    __slots__ = ("tokens", "count", "first_seen", "last_seen", "samples")
+
+    def __init__(self, tokens: List[str], timestamp: float):
+        self.tokens = tokens
+        self.count = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.samples: List[str] = []
+
+    @property
+    def template(self) -> str:
+        """The template text, with ``<*>`` for the variable parts."""
+        return " ".join(self.tokens)
+
+
+def mask_line(line: str) -> List[str]:
+    """Tokenize a log line, replacing IDs, addresses, times and numbers with ``<*>``.
+
+    Args:
+        line (str): The log line
+
+    Returns:
+        List[str]: The masked tokens
+    """
+    for mask in _MASKS:
+        line = mask.sub(WILDCARD, line)
+    return line.split()[:MAX_TOKENS_PER_LINE]
+
+
+class TemplateMiner:
+    """Streaming Drain-style log template miner.
+
+    Masked lines are routed by token count and first token to a small list
+    of candidate clusters. A line joins the most similar candidate if at
+    least ``similarity`` of its tokens match, turning differing tokens of
+    the template into ``<*>``; otherwise it starts a new cluster. Each line
+    costs a dictionary lookup and a comparison against a few templates, so
+    mining keeps up with a followed stream.
+    """
+
+    def __init__(self, similarity: float = DEFAULT_SIMILARITY, max_clusters: int = DEFAULT_MAX_CLUSTERS):
+        """Initialize the miner.
+
+        Args:
+            similarity (float): Fraction of matching tokens for a line to join a cluster
+            max_clusters (int): Maximum number of templates, the least recently seen are dropped
+        """
+        self.similarity = similarity
+        self.max_clusters = max_clusters
+        self.lines = 0
+        self._groups: Dict[Tuple[int, str], List[LogTemplate]] = {}
+        self._clusters = 0
+        self._lock = threading.Lock()
+
+    def add(self, line: str, timestamp: Optional[float] = None) -> Optional[LogTemplate]:
+        """Add a log line to its template.
+
+        Args:
+            line (str): The log line
+            timestamp (Optional[float]): Epoch seconds of the line, defaults to now
+
+        Returns:
+            Optional[LogTemplate]: The template the line was assigned to, None for empty lines
+        """
+        tokens = mask_line(line)
+        if not tokens:
+            return None
+        timestamp = time.time() if timestamp is None else timestamp
+        # Lines starting with a variable are grouped under the wildcard
+        first = tokens[0] if not any(c.isdigit() for c in tokens[0]) else WILDCARD
+        with self._lock:
+            self.lines += 1
+            group = self._groups.setdefault((len(tokens), first), [])
+            cluster = self._best_match(group, tokens)
+            if cluster is None:
+                cluster = LogTemplate(tokens, timestamp)
+                group.append(cluster)
+                self._clusters += 1
+                if self._clusters > self.max_clusters:
+                    self._evict()
+            else:
+                cluster.tokens = [
+                    token if token == other else WILDCARD for token, other in zip(cluster.tokens, tokens)
+                ]
+            cluster.count += 1
+            cluster.first_seen = min(cluster.first_seen, timestamp)
+            cluster.last_seen = max(cluster.last_seen, timestamp)
+            if len(cluster.samples) < MAX_SAMPLES and line not in cluster.samples:
+                cluster.samples.append(line)
+            return cluster
+
+    def templates(self) -> List[LogTemplate]:
+        """Get all templates, most frequent first."""
+        with self._lock:
+            clusters = [cluster for group in self._groups.values() for cluster in group]
+        return sorted(clusters, key=lambda cluster: (-cluster.count, cluster.first_seen))
+
+    def clear(self) -> None:
+        """Forget all templates."""
+        with self._lock:
+            self._groups.clear()
+            self._clusters = 0
+            self.lines = 0
+
+    def summarize(self, token_budget: int = DEFAULT_SUMMARY_TOKENS) -> str:
+        """Render the templates as compact text for the chat context.
+
+        Args:
+            token_budget (int): Approximate maximum number of tokens of the summary
+
+        Returns:
+            str: One entry per template with its count, time range and a sample line
+        """
+        templates = self.templates()
+        header = f"Log summary: {self.lines} lines reduced to {len(templates)} templates (<*> marks variable parts)"
+        lines = [header]
+        used = estimate_tokens(header)
+        for index, cluster in enumerate(templates):
+            entry = (
+                f"- {cluster.count}x [{_format_time(cluster.first_seen)} - {_format_time(cluster.last_seen)}] "
+                f"{cluster.template}"
+            )
+            if WILDCARD in cluster.tokens and cluster.samples:
+                entry += f"\n  e.g. {cluster.samples[0]}"
+            cost = estimate_tokens(entry)
+            if used + cost > token_budget - OMITTED_NOTE_TOKENS:
+                lines.append(f"({len(templates) - index} less frequent templates omitted)")
+                break
+            lines.append(entry)
+            used += cost
+        return "\n".join(lines)
+
+    def _best_match(self, group: List[LogTemplate], tokens: List[str]) -> Optional[LogTemplate]:
+        """Find the most similar cluster of a group, if it is similar enough."""
+        best, best_score = None, -1.0
+        for cluster in group:
+            matches = sum(1 for token, other in zip(cluster.tokens, tokens) if token == other or token == WILDCARD)
+            score = matches / len(tokens)
+            if score > best_score:
+                best, best_score = cluster, score
+        return best if best_score >= self.similarity else None
+
+    def _evict(self) -> None:
+        """Drop the least recently seen cluster. Must hold the lock."""
+        key, oldest = min(
+            ((key, cluster) for key, group in self._groups.items() for cluster in group),
+            key=lambda item: item[1].last_seen
+        )
+        self._groups[key].remove(oldest)
+        if not self._groups[key]:
+            del self._groups[key]
+        self._clusters -= 1
+
+
+def _format_time(timestamp: float) -> str:
+    """Format an epoch time for the summary."""
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
@@ -0,0 +1,416 @@
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache lookups to long LLM answers
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value, using Prometheus' spelling of infinity."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on the metrics endpoint."""
+
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> None:
+        """Add a metric.
+
+        Raises:
+            ValueError: If a metric with the same name is already registered
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: HELP, TYPE and sample lines of every metric
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text
+                             else f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Metric:
+    """Base class of metrics with a fixed set of label names.
+
+    Values are kept per label combination. Instead of being updated in
+    place, a metric can also be computed at scrape time by a function set
+    with ``set_function``, which suits values another object already tracks.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[MetricsRegistry] = None):
+        """Initialize the metric and register it.
+
+        Args:
+            name (str): The metric name
+            documentation (str): Help text shown on the metrics endpoint
+            labelnames (Sequence[str]): Names of the labels every sample has
+            registry (Optional[MetricsRegistry]): Registry to add the metric to, defaults to ``REGISTRY``
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, object] = {}
+        self._function: Optional[Callable[[], Dict[LabelValues, float]]] = None
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        """Turn label keyword arguments into the key of a label combination."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {list(self.labelnames)}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function: Optional[Callable[[], Dict[LabelValues, float]]]) -> None:
+        """Compute the samples at scrape time.
+
+        Args:
+            function (Optional[Callable]): Returns values by label value tuple, None to stop
+        """
+        self._function = function
+
+    def remove(self, **labels) -> None:
+        """Forget the value of a label combination, e.g. of a closed session."""
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+    def samples(self) -> List[Sample]:
+        """Get the current samples as (name, labels, value) triples."""
+        if self._function is not None:
+            values = self._function()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in sorted(values.items())]
+
+
+class Counter(Metric):
+    """Monotonically increasing count, e.g. of requests or errors."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increase the count of a label combination.
+
+        Raises:
+            ValueError: If the amount is negative
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Get the count of a label combination."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Value that goes up and down, e.g. a queue depth."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        """Set the value of a label combination."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increase the value of a label combination."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        """Decrease the value of a label combination."""
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        """Get the value of a label combination."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    """Distribution of observed values, e.g. latencies, in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[MetricsRegistry] = None):
+        """Initialize the histogram and register it.
+
+        Args:
+            name (str): The metric name
+            documentation (str): Help text shown on the metrics endpoint
+            labelnames (Sequence[str]): Names of the labels every sample has
+            buckets (Sequence[float]): Upper bounds of the buckets, ``+Inf`` is added
+            registry (Optional[MetricsRegistry]): Registry to add the metric to, defaults to ``REGISTRY``
+        """
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def set_function(self, function) -> None:
+        raise TypeError("Histograms can not be computed at scrape time")
+
+    def observe(self, value: float, **labels) -> None:
+        """Record an observation for a label combination."""
+        key = self._key(labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = _HistogramValue(len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram.buckets[index] += 1
+                    break
+            histogram.count += 1
+            histogram.sum += value
+
+    def count(self, **labels) -> int:
+        """Get the number of observations of a label combination."""
+        with self._lock:
+            histogram = self._values.get(self._key(labels))
+            return histogram.count if histogram is not None else 0
+
+    def sum(self, **labels) -> float:
+        """Get the sum of the observations of a label combination."""
+        with self._lock:
+            histogram = self._values.get(self._key(labels))
+            return histogram.sum if histogram is not None else 0.0
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = [(key, list(h.buckets), h.count, h.sum) for key, h in sorted(self._values.items())]
+        samples = []
+        for key, buckets, count, total in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, observations in zip(self.buckets, buckets):
+                cumulative += observations
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+REGISTRY = MetricsRegistry()
+
+ERRORS = Counter("k8s_buddy_errors_total", "Errors by source and exception type", ["source", "error"])
+K8S_API_SECONDS = Histogram(
+    "k8s_buddy_k8s_api_request_seconds", "Kubernetes API request latency", ["operation"]
+)
+K8S_CONTEXT_SECONDS = Histogram(
+    "k8s_buddy_k8s_context_seconds", "Time to build the cluster context of a chat message"
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "k8s_buddy_llm_request_seconds", "Duration of streamed LLM responses", ["provider", "model"]
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "k8s_buddy_llm_first_token_seconds", "Time to the first token of an LLM response", ["provider", "model"]
+)
+LLM_TOKENS = Counter(
+    "k8s_buddy_llm_tokens_total", "Estimated prompt and completion tokens", ["provider", "model", "kind"]
+)
+LLM_TOOL_SECONDS = Histogram(
+    "k8s_buddy_llm_tool_seconds", "Latency of tool calls requested by the model", ["tool", "cache"]
+)
+CHAT_RESPONSE_SECONDS = Histogram(
+    "k8s_buddy_chat_response_seconds", "Duration of chat responses, including cached ones", ["cache"]
+)
+CONFIG_IO_SECONDS = Histogram(
+    "k8s_buddy_config_io_seconds", "Latency of configuration file reads and writes", ["file", "operation"]
+)
+LOG_LINES = Counter("k8s_buddy_log_lines_total", "Log lines received per watch", ["watch"])
+LOG_QUEUE_DEPTH = Gauge(
+    "k8s_buddy_log_queue_depth", "Lines waiting in a watch's queues (stats parsing, UI buffer)", ["watch", "queue"]
+)
+LOG_WATCHES = Gauge("k8s_buddy_log_watches", "Running log watches")
+LOG_STREAMS = Gauge("k8s_buddy_log_streams", "Open Kubernetes log streams")
+
+
+def record_error(source: str, error: BaseException) -> None:
+    """Count an error by where it happened and its exception type.
+
+    Args:
+        source (str): The component or operation that failed
+        error (BaseException): The exception
+    """
+    ERRORS.inc(source=source, error=type(error).__name__)
+
+
+class Timer:
+    """Context manager and decorator observing the duration of a block.
+
+    Exceptions are counted in ``ERRORS`` under the histogram's name and
+    re-raised; the duration is observed either way.
+    """
+
+    def __init__(self, histogram: Histogram, **labels):
+        """Initialize the timer.
+
+        Args:
+            histogram (Histogram): The histogram the duration is observed in
+            **labels: Label values of the observation
+        """
+        self.histogram = histogram
+        self.labels = labels
+        self.seconds: Optional[float] = None
+        self._started = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.seconds = time.perf_counter() - self._started
+        self.histogram.observe(self.seconds, **self.labels)
+        if exc is not None and isinstance(exc, Exception):
+            record_error(self.histogram.name, exc)
+        return False
+
+    def __call__(self, function: Callable) -> Callable:
+        # Every call gets its own timer so concurrent calls do not share a start time
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with Timer(self.histogram, **self.labels):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Timer(self.histogram, **self.labels):
+                return function(*args, **kwargs)
+        return wrapper
+
+
+def timed(histogram: Histogram, **labels) -> Timer:
+    """Time a block or function into a histogram.
+
+    Args:
+        histogram (Histogram): The histogram the duration is observed in
+        **labels: Label values of the observation
+
+    Returns:
+        Timer: Usable as ``with timed(...)`` or ``@timed(...)``
+    """
+    return Timer(histogram, **labels)
+
+
+class RequestTrace:
+    """Timeline of the steps of a single request, for optional trace output.
+
+    A disabled trace records nothing, so call sites do not need to check
+    whether tracing is on.
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        """Initialize the trace and start its clock.
+
+        Args:
+            name (str): The request name
+            enabled (bool): Whether spans are recorded
+        """
+        self.name = name
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+
+    @contextmanager
+    def span(self, name: str):
+        """Record a step with its start offset, duration and error.
+
+        Args:
+            name (str): The step name
+        """
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.spans.append({
+                "name": name,
+                "offset": started - self.started,
+                "seconds": time.perf_counter() - started,
+                "error": error
+            })
+
+    def mark(self, name: str) -> None:
+        """Record a point in time, e.g. the first token of a response.
+
+        Args:
+            name (str): The event name
+        """
+        if self.enabled:
+            self.spans.append({"name": name, "offset": time.perf_counter() - self.started,
+                               "seconds": 0.0, "error": None})
+
+    def render(self) -> str:
+        """Render the trace as a single line.
+
+        Returns:
+            str: Total duration and every step as ``name +offset duration``
+        """
+        parts = [
+            f"{span['name']} +{span['offset'] * 1000:.1f}ms"
+            + (f" {span['seconds'] * 1000:.1f}ms" if span["seconds"] else "")
+            + (f" ({span['error']})" if span["error"] else "")
+            for span in self.spans
+        ]
+        return f"Trace {self.name} {(time.perf_counter() - self.started) * 1000:.1f}ms: " + ", ".join(parts)
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+def _normalize(text: str) -> str:
+    """Collapse whitespace so trivially different messages share a key."""
+    return " ".join((text or "").split())
+
+
+class ResponseCache:
+    """LRU + TTL cache for LLM responses with an optional SQLite store.
+
+    Entries are evicted when they are older than ``ttl`` seconds, or in
+    least-recently-used order once ``max_entries`` or ``max_bytes`` is
+    exceeded. When ``cache_file`` is set, entries are also written to disk
+    and looked up there on a memory miss, so they survive restarts.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 8 * 1024 * 1024,
+                 ttl: float = 3600.0, cache_file: Optional[str] = None):
+        """Initialize the response cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory and on disk
+            max_bytes (int): Maximum total size of the cached responses in memory
+            ttl (float): Seconds after which an entry expires
+            cache_file (Optional[str]): Path of the SQLite file for the disk store
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if cache_file:
+            self._db = sqlite3.connect(cache_file, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, created REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - ttl,))
+            self._db.commit()
+
+    @staticmethod
+    def make_key(provider: str, model: str, messages: List[Dict[str, str]], context: str = "") -> str:
+        """Build a cache key for a chat request.
+
+        Args:
+            provider (str): The AI provider name
+            model (str): The model name
+            messages (List[Dict[str, str]]): The conversation, including the new user message
+            context (str): Cluster and user context the answer depends on
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        payload = {
+            "provider": provider,
+            "model": model,
+            "messages": [[m.get("role", ""), _normalize(m.get("content", ""))] for m in messages],
+            "context": hashlib.sha256(context.encode("utf-8")).hexdigest()
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, value FROM responses WHERE key = ? AND created >= ?",
+                    (key, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._store(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str) -> None:
+        """Cache a response.
+
+        Args:
+            key (str): The cache key
+            value (str): The response to cache
+        """
+        entry = (time.time(), value)
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, created, value) VALUES (?, ?, ?)",
+                    (key, entry[0], value)
+                )
+                # Keep only the newest max_entries rows on disk
+                self._db.execute(
+                    "DELETE FROM responses WHERE key NOT IN "
+                    "(SELECT key FROM responses ORDER BY created DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+                self._db.commit()
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Get a cached response without blocking the event loop on the disk store.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss
+        """
+        if self._db is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """Cache a response, writing the disk store on a worker thread.
+
+        Args:
+            key (str): The cache key
+            value (str): The response to cache
+        """
+        if self._db is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def clear(self) -> None:
+        """Remove every entry from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters.
+
+        Returns:
+            Dict[str, int]: Hits, misses, entries and bytes held in memory
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes
+            }
+
+    def _store(self, key: str, entry: Tuple[float, str]) -> None:
+        """Insert an entry in memory and evict until the limits hold."""
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += len(entry[1].encode("utf-8"))
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry from memory."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1].encode("utf-8"))
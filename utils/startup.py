@@ -0,0 +1,103 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+WarmupTask = Tuple[str, Callable[[], object]]
+
+
+class StartupReport:
+    """Records how long each startup and warmup phase took.
+
+    Times are measured from the creation of the report, so it should be
+    created before the heavy imports of the application.
+    """
+
+    def __init__(self):
+        """Initialize the report and start the clock."""
+        self.started = time.perf_counter()
+        self.phases: List[Dict] = []
+        self.serving_after: Optional[float] = None
+        self.ready_after: Optional[float] = None
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        """Seconds since the report was created."""
+        return time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a phase, recording whether it failed.
+
+        Args:
+            name (str): The phase name
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            with self._lock:
+                self.phases.append({
+                    "name": name,
+                    "seconds": time.perf_counter() - started,
+                    "error": error
+                })
+
+    def mark_serving(self) -> None:
+        """Record that the UI is built and about to serve requests."""
+        self.serving_after = self.elapsed()
+
+    def mark_ready(self) -> None:
+        """Record that all warmup tasks have finished."""
+        self.ready_after = self.elapsed()
+        self.ready.set()
+
+    def summary(self) -> str:
+        """Render the report as a single line.
+
+        Returns:
+            str: Time to serve, time to ready and the duration of each phase
+        """
+        with self._lock:
+            phases = list(self.phases)
+        parts = [f"{p['name']} {p['seconds']:.2f}s" + (f" (failed: {p['error']})" if p["error"] else "")
+                 for p in phases]
+        serving = f"{self.serving_after:.2f}s" if self.serving_after is not None else "-"
+        ready = f"{self.ready_after:.2f}s" if self.ready_after is not None else "warming up"
+        return f"Startup: serving after {serving}, ready after {ready}; " + ", ".join(parts)
+
+
+def start_warmup(tasks: Sequence[WarmupTask], report: StartupReport,
+                 on_ready: Optional[Callable[[StartupReport], None]] = None) -> threading.Thread:
+    """Run warmup tasks in a background thread.
+
+    Tasks run in order; a failing task is recorded in the report and does
+    not stop the others, so the app keeps serving without a cluster.
+
+    Args:
+        tasks (Sequence[WarmupTask]): (name, function) pairs
+        report (StartupReport): The report the task durations are recorded in
+        on_ready (Optional[Callable[[StartupReport], None]]): Called when all tasks are done
+
+    Returns:
+        threading.Thread: The warmup thread
+    """
+    def run():
+        for name, task in tasks:
+            try:
+                with report.phase(name):
+                    task()
+            except Exception:
+                pass  # Recorded in the report, the feature retries on first use
+        report.mark_ready()
+        if on_ready is not None:
+            on_ready(report)
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread